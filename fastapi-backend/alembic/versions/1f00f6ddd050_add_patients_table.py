@@ -0,0 +1,96 @@
+"""add_patients_table
+
+Revision ID: 1f00f6ddd050
+Revises: 807e2b4ad090
+Create Date: 2026-10-18 23:12:40.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f00f6ddd050'
+down_revision = '807e2b4ad090'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('patients',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('assigning_authority', sa.String(length=100), nullable=False),
+    sa.Column('identifier', sa.String(length=50), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=True),
+    sa.Column('last_name', sa.String(length=100), nullable=True),
+    sa.Column('date_of_birth', sa.DateTime(), nullable=True),
+    sa.Column('gender', sa.String(length=1), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('identifier', 'assigning_authority', name='uq_patients_identifier_authority')
+    )
+    op.add_column('hl7_messages', sa.Column('patient_ref_id', sa.UUID(), nullable=True))
+    op.create_foreign_key('fk_hl7_messages_patient_ref_id', 'hl7_messages', 'patients', ['patient_ref_id'], ['id'])
+    op.create_index('ix_hl7_messages_patient_id', 'hl7_messages', ['patient_id'])
+    op.create_index('ix_hl7_messages_patient_ref_processed_at',
+                    'hl7_messages',
+                    ['patient_ref_id', 'processed_at', 'id'])
+
+    # Backfill from existing messages. The assigning authority is read from
+    # PID-3.4 of the raw message (default delimiters); demographics come from
+    # the most recently processed message of each patient; processed_at
+    # stands in for the message timestamp, which has no column.
+    op.execute("""
+        WITH identities AS (
+            SELECT
+                id,
+                patient_id,
+                patient_first_name,
+                patient_last_name,
+                patient_dob,
+                patient_gender,
+                processed_at,
+                left(coalesce(split_part(split_part(split_part(
+                    substring(raw_hl7_content from '(?:^|[\\r\\n])PID\\|[^|\\r\\n]*\\|[^|\\r\\n]*\\|([^|\\r\\n]*)'),
+                    '~', 1), '^', 4), '&', 1), ''), 100) AS assigning_authority
+            FROM hl7_messages
+            WHERE patient_id IS NOT NULL AND patient_id <> ''
+        ),
+        latest AS (
+            SELECT DISTINCT ON (assigning_authority, patient_id) *
+            FROM identities
+            ORDER BY assigning_authority, patient_id, processed_at DESC
+        ),
+        counts AS (
+            SELECT assigning_authority, patient_id, count(*) AS message_count,
+                   min(processed_at) AS first_seen_at, max(processed_at) AS last_seen_at
+            FROM identities
+            GROUP BY assigning_authority, patient_id
+        ),
+        inserted AS (
+            INSERT INTO patients (id, assigning_authority, identifier, first_name, last_name, date_of_birth,
+                                  gender, message_count, first_seen_at, last_seen_at, created_at, updated_at)
+            SELECT gen_random_uuid(), l.assigning_authority, l.patient_id, l.patient_first_name, l.patient_last_name,
+                   l.patient_dob, l.patient_gender, c.message_count, c.first_seen_at, c.last_seen_at, now(), now()
+            FROM latest l
+            JOIN counts c USING (assigning_authority, patient_id)
+            RETURNING id, assigning_authority, identifier
+        )
+        UPDATE hl7_messages m
+        SET patient_ref_id = inserted.id
+        FROM identities i
+        JOIN inserted ON inserted.assigning_authority = i.assigning_authority AND inserted.identifier = i.patient_id
+        WHERE m.id = i.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_hl7_messages_patient_ref_processed_at', table_name='hl7_messages')
+    op.drop_index('ix_hl7_messages_patient_id', table_name='hl7_messages')
+    op.drop_constraint('fk_hl7_messages_patient_ref_id', 'hl7_messages', type_='foreignkey')
+    op.drop_column('hl7_messages', 'patient_ref_id')
+    op.drop_table('patients')
@@ -0,0 +1,53 @@
+"""add_observation_patient_ref_id
+
+Revision ID: 5c2e9b7d4a18
+Revises: f04e25c1c417
+Create Date: 2026-10-18 23:40:12.615204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e9b7d4a18'
+down_revision = 'f04e25c1c417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('observations', sa.Column('patient_ref_id', sa.UUID(), nullable=True))
+    op.create_foreign_key('fk_observations_patient_ref_id', 'observations', 'patients', ['patient_ref_id'], ['id'])
+
+    # Link existing observations to the patient of their message
+    op.execute("""
+        UPDATE observations o
+        SET patient_ref_id = m.patient_ref_id
+        FROM hl7_messages m
+        WHERE m.id = o.message_id AND m.patient_ref_id IS NOT NULL
+    """)
+
+    op.drop_index('ix_observations_patient_abnormal', table_name='observations')
+    op.drop_index('ix_observations_patient_code_observed_at', table_name='observations')
+    op.create_index('ix_observations_patient_ref_code_observed_at',
+                    'observations',
+                    ['patient_ref_id', 'code', 'observed_at'])
+    op.create_index('ix_observations_patient_ref_abnormal',
+                    'observations',
+                    ['patient_ref_id', 'observed_at'],
+                    postgresql_where=sa.text("abnormal_flag IS NOT NULL AND abnormal_flag <> 'N'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_observations_patient_ref_abnormal', table_name='observations')
+    op.drop_index('ix_observations_patient_ref_code_observed_at', table_name='observations')
+    op.create_index('ix_observations_patient_code_observed_at',
+                    'observations',
+                    ['patient_id', 'code', 'observed_at'])
+    op.create_index('ix_observations_patient_abnormal',
+                    'observations',
+                    ['patient_id', 'observed_at'],
+                    postgresql_where=sa.text("abnormal_flag IS NOT NULL AND abnormal_flag <> 'N'"))
+    op.drop_constraint('fk_observations_patient_ref_id', 'observations', type_='foreignkey')
+    op.drop_column('observations', 'patient_ref_id')
@@ -0,0 +1,51 @@
+"""add_observations_table
+
+Revision ID: 807e2b4ad090
+Revises: 0475981f085b
+Create Date: 2026-10-18 22:55:02.114873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '807e2b4ad090'
+down_revision = '0475981f085b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('observations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('message_id', sa.UUID(), nullable=False),
+    sa.Column('patient_id', sa.String(length=50), nullable=True),
+    sa.Column('set_id', sa.Integer(), nullable=True),
+    sa.Column('value_type', sa.String(length=10), nullable=True),
+    sa.Column('code', sa.String(length=100), nullable=True),
+    sa.Column('code_text', sa.Text(), nullable=True),
+    sa.Column('value', sa.Text(), nullable=True),
+    sa.Column('numeric_value', sa.Float(), nullable=True),
+    sa.Column('units', sa.String(length=50), nullable=True),
+    sa.Column('reference_range', sa.Text(), nullable=True),
+    sa.Column('abnormal_flag', sa.String(length=20), nullable=True),
+    sa.Column('observed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['message_id'], ['hl7_messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_observations_message_id', 'observations', ['message_id'])
+    op.create_index('ix_observations_patient_code_observed_at',
+                    'observations',
+                    ['patient_id', 'code', 'observed_at'])
+    op.create_index('ix_observations_patient_abnormal',
+                    'observations',
+                    ['patient_id', 'observed_at'],
+                    postgresql_where=sa.text("abnormal_flag IS NOT NULL AND abnormal_flag <> 'N'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_observations_patient_abnormal', table_name='observations')
+    op.drop_index('ix_observations_patient_code_observed_at', table_name='observations')
+    op.drop_index('ix_observations_message_id', table_name='observations')
+    op.drop_table('observations')
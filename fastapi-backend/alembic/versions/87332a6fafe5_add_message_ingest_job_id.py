@@ -0,0 +1,28 @@
+"""add_message_ingest_job_id
+
+Revision ID: 87332a6fafe5
+Revises: 9817d60ec099
+Create Date: 2026-10-18 23:58:31.640219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '87332a6fafe5'
+down_revision = '9817d60ec099'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('hl7_messages', sa.Column('ingest_job_id', sa.UUID(), nullable=True))
+    op.create_index('ix_hl7_messages_ingest_job_status_updated_at',
+                    'hl7_messages',
+                    ['ingest_job_id', 'status_updated_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_hl7_messages_ingest_job_status_updated_at', table_name='hl7_messages')
+    op.drop_column('hl7_messages', 'ingest_job_id')
@@ -0,0 +1,33 @@
+"""add_message_progress_columns
+
+Revision ID: 9817d60ec099
+Revises: 1f00f6ddd050
+Create Date: 2026-10-18 23:41:07.215904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9817d60ec099'
+down_revision = '1f00f6ddd050'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('hl7_messages', sa.Column('progress', sa.SmallInteger(), server_default=sa.text('0'), nullable=False))
+    op.add_column('hl7_messages', sa.Column('current_step', sa.String(length=100), nullable=True))
+    op.add_column('hl7_messages', sa.Column('error_message', sa.Text(), nullable=True))
+    op.add_column('hl7_messages', sa.Column('status_updated_at', sa.DateTime(), nullable=True))
+
+    # Ingest time is the best record of when existing rows last changed status
+    op.execute("UPDATE hl7_messages SET status_updated_at = processed_at")
+
+
+def downgrade() -> None:
+    op.drop_column('hl7_messages', 'status_updated_at')
+    op.drop_column('hl7_messages', 'error_message')
+    op.drop_column('hl7_messages', 'current_step')
+    op.drop_column('hl7_messages', 'progress')
@@ -0,0 +1,26 @@
+"""add_processing_log_duration_ms
+
+Revision ID: f04e25c1c417
+Revises: 87332a6fafe5
+Create Date: 2026-10-18 23:21:07.418236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f04e25c1c417'
+down_revision = '87332a6fafe5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_logs', sa.Column('duration_ms', sa.Float(), nullable=True))
+    op.create_index('ix_processing_logs_message_id_started_at', 'processing_logs', ['message_id', 'started_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_processing_logs_message_id_started_at', table_name='processing_logs')
+    op.drop_column('processing_logs', 'duration_ms')
@@ -3,7 +3,7 @@ Configuration settings for HL7 LiteBoard FastAPI backend
 """
 
 import os
-from typing import List
+from typing import Any, Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -27,20 +27,63 @@ class Settings(BaseSettings):
     
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_BATCH_FILES: int = 2000  # Files accepted by a single batch upload
+    MAX_ARCHIVE_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes read from an upload at a time
     UPLOAD_DIR: str = "uploads"
     SAMPLE_FILES_DIR: str = "sample_files"
     
     # AI/Mastra Configuration
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     MASTRA_ENDPOINT: str = "http://localhost:3001"  # Mastra service endpoint
+    MASTRA_RETRY_MAX_ATTEMPTS: int = 3  # Attempts per call on connect errors, timeouts, 5xx and 429
+    MASTRA_RETRY_BASE_DELAY: float = 0.5  # Seconds before the first retry; doubles per retry, with full jitter
+    MASTRA_RETRY_MAX_DELAY: float = 8.0
+    MASTRA_RETRY_BUDGET_RATIO: float = 0.1  # Retries and hedged requests allowed per call, on average
+    MASTRA_RETRY_POLICIES: Dict[str, Dict[str, Any]] = {}  # Per-kind overrides, e.g. {"json": {"hedge": false}}
     
     # Processing
     MAX_CONCURRENT_PROCESSES: int = 5
     PROCESS_TIMEOUT: int = 300  # 5 minutes
+    STATUS_STREAM_MAX_IDS: int = 200  # Messages followed by one SSE status stream (IDs travel in the URL)
+    STATUS_WS_MAX_IDS: int = 5000  # Messages followed by one status WebSocket
+    STATUS_STREAM_HEARTBEAT: float = 15.0  # Seconds between keep-alives on idle status streams
+    STATUS_BULK_MAX_IDS: int = 5000  # Message IDs per bulk status query, and statuses per page
+    STATUS_BULK_SINCE_OVERLAP: float = 5.0  # Seconds as_of trails the clock so changes committed late are not missed
+    PROCESSING_SPANS_ENABLED: bool = True  # Record per-stage timings in processing_logs
+    PROCESSING_SPAN_BATCH_SIZE: int = 1000  # Span rows per COPY
+    PROCESSING_SPAN_FLUSH_INTERVAL: float = 2.0  # Seconds between span writes
+    PROCESSING_SPAN_BUFFER_MAX: int = 100000  # Buffered spans; the oldest are dropped beyond this
+    PROCESSING_SPAN_MAX_DEFERRALS: int = 5  # Flushes a span waits for its message row to be committed
+    
+    # Bulk operations
+    BULK_SAVE_CHUNK_SIZE: int = 500  # Rows per INSERT ... ON CONFLICT statement
+    BULK_INSERT_CHUNK_SIZE: int = 1000  # HL7 message rows per multi-row INSERT; capped at 32767 bind parameters per statement
+    ARCHIVE_COPY_CHUNK_SIZE: int = 5000  # HL7 message rows per COPY during archive imports
+    
+    # Triage
+    TRIAGE_MAX_MESSAGES: int = 10000  # Messages accepted per triage request
+    MASTRA_TRIAGE_MAX_MESSAGES: int = 50  # Larger batches skip the AI service and use rule-based triage
+    MASTRA_TRIAGE_CHUNK_SIZE: int = 10  # Messages per Mastra triage request
+    MASTRA_TRIAGE_TIMEOUT: float = 120.0  # Seconds per Mastra triage request; not retried, the chunk falls back to rules
+    TRIAGE_MAX_WORKERS: int = 0  # Rule-based triage worker processes (0 = one per CPU)
+    TRIAGE_CHUNK_SIZE: int = 250  # Messages per worker task
+    TRIAGE_INLINE_MAX: int = 50  # Batches up to this size are triaged in-process
+    TRIAGE_STREAM_CHUNK_SIZE: int = 10  # Messages per chunk when streaming triage results
+    TRIAGE_RULES_FILE: str = ""  # Scoring rules JSON (empty = bundled app/services/triage_rules.json)
     
     # Logging
     LOG_LEVEL: str = "INFO"
     
+    # Metrics
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics at /metrics and record them; False turns all instrumentation off
+    
+    # Profiling
+    PROFILING_ENABLED: bool = False  # Serve /admin/profiling; also requires ADMIN_TOKEN
+    ADMIN_TOKEN: str = ""  # Sent as X-Admin-Token by admin endpoints
+    PROFILING_MAX_SECONDS: float = 300.0  # Longest CPU profile
+    PROFILING_SAMPLE_INTERVAL: float = 0.005  # Seconds between stack samples
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
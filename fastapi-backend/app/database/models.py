@@ -4,23 +4,63 @@ SQLAlchemy database models for HL7 LiteBoard
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, LargeBinary, Integer, ForeignKey, Index, text
+from sqlalchemy import Column, String, Text, DateTime, LargeBinary, Integer, SmallInteger, Float, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+class Patient(Base):
+    """Table for patient identities (PID.3), upserted as messages are ingested"""
+    __tablename__ = "patients"
+    __table_args__ = (
+        UniqueConstraint('identifier', 'assigning_authority', name='uq_patients_identifier_authority'),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    # PID.3 - identifier (CX.1) and assigning authority (CX.4); "" when the authority is absent
+    assigning_authority = Column(String(100), nullable=False, default="")
+    identifier = Column(String(50), nullable=False)
+    
+    # Latest demographics, from the most recent message that carried them
+    first_name = Column(String(100))
+    last_name = Column(String(100))
+    date_of_birth = Column(DateTime)
+    gender = Column(String(1))
+    
+    # Message statistics (seen times are message timestamps, MSH.7)
+    message_count = Column(Integer, nullable=False, default=0)
+    first_seen_at = Column(DateTime)
+    last_seen_at = Column(DateTime)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    messages = relationship("HL7Message", back_populates="patient")
+    
+    def __repr__(self):
+        return f"<Patient(id={self.id}, identifier='{self.identifier}', authority='{self.assigning_authority}')>"
+
 class HL7Message(Base):
     """Table for storing processed HL7 messages"""
     __tablename__ = "hl7_messages"
+    __table_args__ = (
+        # Keyset pagination of a patient's timeline
+        Index('ix_hl7_messages_patient_ref_processed_at', 'patient_ref_id', 'processed_at', 'id'),
+        # Bulk status polls of one upload batch or ingest job, paged by last change
+        Index('ix_hl7_messages_ingest_job_status_updated_at', 'ingest_job_id', 'status_updated_at', 'id'),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     original_filename = Column(String(255), nullable=False)
     raw_hl7_content = Column(Text, nullable=False)
     message_type = Column(String(10), nullable=False)  # ADT, ORU, ORM, etc.
     trigger_event = Column(String(10))  # A01, A02, R01, etc.
-    patient_id = Column(String(50))
+    patient_id = Column(String(50), index=True)
+    patient_ref_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"))  # patients row for PID.3
     
     # Processed formats
     xml_content = Column(Text)
@@ -30,6 +70,11 @@ class HL7Message(Base):
     # Processing metadata
     processing_status = Column(String(20), default="pending")  # pending, processing, completed, failed, partial
     processed_at = Column(DateTime, default=datetime.utcnow)
+    progress = Column(SmallInteger, nullable=False, default=0, server_default=text("0"))  # Percent through the processing steps
+    current_step = Column(String(100))  # NULL for rows written before steps were recorded
+    error_message = Column(Text)
+    status_updated_at = Column(DateTime, default=datetime.utcnow)
+    ingest_job_id = Column(UUID(as_uuid=True))  # Archive import job or batch upload that created the row
     
     # Parsed data (structured)
     parsed_data = Column(JSONB)
@@ -46,7 +91,9 @@ class HL7Message(Base):
     discharge_date = Column(DateTime)
     
     # Relationships
+    patient = relationship("Patient", back_populates="messages")
     processing_logs = relationship("ProcessingLog", back_populates="message", cascade="all, delete-orphan")
+    observations = relationship("Observation", back_populates="message", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<HL7Message(id={self.id}, filename='{self.original_filename}', type='{self.message_type}')>"
@@ -54,6 +101,10 @@ class HL7Message(Base):
 class ProcessingLog(Base):
     """Table for storing processing logs and errors"""
     __tablename__ = "processing_logs"
+    __table_args__ = (
+        # A message's logs and stage spans in pipeline order
+        Index('ix_processing_logs_message_id_started_at', 'message_id', 'started_at'),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     message_id = Column(UUID(as_uuid=True), ForeignKey("hl7_messages.id"), nullable=False)
@@ -71,6 +122,7 @@ class ProcessingLog(Base):
     started_at = Column(DateTime)
     completed_at = Column(DateTime)
     duration_seconds = Column(Integer)
+    duration_ms = Column(Float)  # Stage spans; duration_seconds is too coarse for them
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -81,6 +133,49 @@ class ProcessingLog(Base):
         return f"<ProcessingLog(id={self.id}, message_id={self.message_id}, status='{self.status}')>"
 
 
+class Observation(Base):
+    """Table for OBX results, normalized for per-patient trend and abnormal-flag queries"""
+    __tablename__ = "observations"
+    __table_args__ = (
+        # Per-patient time series for one code, e.g. WBC over the last year
+        Index('ix_observations_patient_ref_code_observed_at', 'patient_ref_id', 'code', 'observed_at'),
+        # Abnormal results only; normal ("N") and unflagged rows are the bulk of the table
+        Index(
+            'ix_observations_patient_ref_abnormal',
+            'patient_ref_id', 'observed_at',
+            postgresql_where=text("abnormal_flag IS NOT NULL AND abnormal_flag <> 'N'")
+        ),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    message_id = Column(UUID(as_uuid=True), ForeignKey("hl7_messages.id", ondelete="CASCADE"), nullable=False, index=True)
+    patient_id = Column(String(50))
+    # Patient identity (PID.3 scoped by assigning authority), as on the message
+    patient_ref_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"))
+    
+    # OBX.1 / OBX.2 / OBX.3
+    set_id = Column(Integer)
+    value_type = Column(String(10))
+    code = Column(String(100))
+    code_text = Column(Text)
+    
+    # OBX.5 - OBX.8
+    value = Column(Text)
+    numeric_value = Column(Float)  # OBX.5 when it is a plain number
+    units = Column(String(50))
+    reference_range = Column(Text)
+    abnormal_flag = Column(String(20))
+    
+    # OBX.14, falling back to the message timestamp (MSH.7)
+    observed_at = Column(DateTime)
+    
+    # Relationships
+    message = relationship("HL7Message", back_populates="observations")
+    
+    def __repr__(self):
+        return f"<Observation(id={self.id}, patient_id='{self.patient_id}', code='{self.code}')>"
+
+
 class SavedConversion(Base):
     """Table for storing user-saved conversion results"""
     __tablename__ = "saved_conversions"
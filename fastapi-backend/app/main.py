@@ -6,12 +6,18 @@ Main application entry point
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import logging
 
 from app.config import settings
-from app.routers import upload, formats, browse, samples, mastra, conversions
+from app.database.database import async_engine
+from app.routers import upload, formats, browse, samples, mastra, conversions, observations, patients, admin
+from app.services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, instrument_engine, render_metrics
+from app.services.processing_spans import span_recorder
+from app.services.profiler import profiler
+from app.services.status_events import status_broadcaster
+from app.services.triage_engine import triage_engine
 
 # Configure logging
 logging.basicConfig(
@@ -43,6 +49,11 @@ app.add_middleware(
     allowed_hosts=settings.ALLOWED_HOSTS
 )
 
+if settings.METRICS_ENABLED:
+    # Outermost, so the latency includes the other middleware
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(async_engine)
+
 # Include routers
 app.include_router(upload.router, prefix="/api/v1", tags=["upload"])
 app.include_router(formats.router, prefix="/api/v1", tags=["formats"])
@@ -50,6 +61,24 @@ app.include_router(browse.router, prefix="/api/v1", tags=["browse"])
 app.include_router(samples.router, prefix="/api/v1", tags=["samples"])
 app.include_router(mastra.router, prefix="/api/v1", tags=["mastra"])
 app.include_router(conversions.router, prefix="/api/v1", tags=["conversions"])
+app.include_router(observations.router, prefix="/api/v1", tags=["observations"])
+app.include_router(patients.router, prefix="/api/v1", tags=["patients"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
+
+@app.on_event("startup")
+async def start_workers():
+    """Start writing buffered processing spans in the background"""
+    span_recorder.start()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop the triage worker processes and any profile, write remaining processing spans and close pooled connections"""
+    triage_engine.shutdown()
+    await profiler.shutdown()
+    for router_module in (mastra, samples, upload):
+        await router_module.mastra_service.aclose()
+    await status_broadcaster.close()
+    await span_recorder.close()
 
 @app.get("/")
 async def root():
@@ -70,6 +99,13 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
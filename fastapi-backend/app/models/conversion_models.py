@@ -3,7 +3,7 @@ Pydantic models for conversion saving functionality
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 import uuid
 
@@ -144,4 +144,39 @@ class JsonContentResponse(BaseModel):
                 "description": "ADT message for patient admission",
                 "updated_at": "2023-01-01T12:00:00"
             }
-        }
\ No newline at end of file
+        }
+
+class BulkSaveItemResult(BaseModel):
+    """Per-item result of a bulk save operation"""
+    index: int = Field(..., description="Position of the item in the submitted payload")
+    status: str = Field(..., description="created, updated, duplicate, invalid or failed")
+    conversion_id: Optional[str] = Field(None, description="UUID of the saved conversion, if any")
+    message: Optional[str] = Field(None, description="Details for invalid or failed items")
+
+class BulkSaveConversionResponse(BaseModel):
+    """Response model for bulk save conversion operation"""
+    success: bool = Field(..., description="Whether every item was saved or skipped as a duplicate")
+    total: int = Field(..., description="Number of items received")
+    created: int = Field(0, description="Number of newly inserted conversions")
+    updated: int = Field(0, description="Number of existing conversions overwritten")
+    duplicates: int = Field(0, description="Number of items skipped because the HL7 content already exists")
+    invalid: int = Field(0, description="Number of items rejected by validation")
+    failed: int = Field(0, description="Number of items in chunks that failed to write")
+    results: List[BulkSaveItemResult] = Field(default_factory=list, description="Per-item results in submission order")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "success": True,
+                "total": 2,
+                "created": 1,
+                "updated": 0,
+                "duplicates": 1,
+                "invalid": 0,
+                "failed": 0,
+                "results": [
+                    {"index": 0, "status": "created", "conversion_id": "123e4567-e89b-12d3-a456-426614174000"},
+                    {"index": 1, "status": "duplicate", "conversion_id": None}
+                ]
+            }
+        }
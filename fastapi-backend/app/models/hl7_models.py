@@ -44,6 +44,7 @@ class ProcessSampleRequest(BaseModel):
 class PatientInfo(BaseModel):
     """Patient demographic information from PID segment"""
     patient_id: Optional[str] = None
+    assigning_authority: Optional[str] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     middle_name: Optional[str] = None
@@ -73,6 +74,7 @@ class ObservationResult(BaseModel):
     observation_id: Optional[str] = None
     value_type: Optional[str] = None
     observation_identifier: Optional[str] = None
+    observation_text: Optional[str] = None
     observation_value: Optional[str] = None
     units: Optional[str] = None
     reference_range: Optional[str] = None
@@ -81,6 +83,7 @@ class ObservationResult(BaseModel):
 
 class ParsedHL7Data(BaseModel):
     """Complete parsed HL7 message data"""
+    parse_version: Optional[int] = None
     message_type: MessageType
     trigger_event: Optional[str] = None
     sending_application: Optional[str] = None
@@ -131,6 +134,33 @@ class ProcessingStatusResponse(BaseModel):
     progress: int = Field(..., ge=0, le=100, description="Progress percentage")
     current_step: Optional[str] = None
     error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class BulkStatusRequest(BaseModel):
+    """Statuses to fetch: explicit message IDs or every message of an upload batch / ingest job"""
+    message_ids: Optional[List[UUID]] = Field(None, description="Message IDs; mutually exclusive with job_id")
+    job_id: Optional[UUID] = Field(None, description="X-Batch-ID of a batch upload or job_id of an archive import")
+    since: Optional[datetime] = Field(None, description="Only statuses changed at or after this time (as_of of the previous poll)")
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page")
+
+class BulkStatusResponse(BaseModel):
+    """Statuses of many messages, ordered by last change"""
+    statuses: List[ProcessingStatusResponse]
+    not_found: List[UUID] = Field(default_factory=list, description="Requested IDs with no message; only reported without since")
+    as_of: datetime = Field(..., description="Pass as since on the next poll to receive only changes")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page; null on the last page")
+
+class IngestJobResponse(BaseModel):
+    """Progress of a bulk ingestion job"""
+    job_id: UUID
+    filename: str
+    status: ProcessingStatus
+    entries_processed: int = Field(0, description="Archive entries read so far")
+    messages_imported: int = Field(0, description="HL7 messages written to the database")
+    messages_failed: int = Field(0, description="Entries rejected or failed to import")
+    errors: List[str] = Field(default_factory=list, description="First errors encountered")
+    created_at: datetime
+    completed_at: Optional[datetime] = None
 
 class FormatResponse(BaseModel):
     """Response for format retrieval"""
@@ -159,6 +189,61 @@ class BrowseResponse(BaseModel):
     page_size: int
     has_next: bool
 
+class ObservationPoint(BaseModel):
+    """One OBX result in a patient's time series"""
+    observed_at: Optional[datetime] = None
+    value: Optional[str] = None
+    numeric_value: Optional[float] = None
+    units: Optional[str] = None
+    reference_range: Optional[str] = None
+    abnormal_flag: Optional[str] = None
+    message_id: UUID
+
+class ObservationSeries(BaseModel):
+    """Results for one observation code, oldest first"""
+    code: Optional[str] = None
+    code_text: Optional[str] = None
+    points: List[ObservationPoint] = []
+
+class ObservationTimeSeriesResponse(BaseModel):
+    """Per-patient observation time series"""
+    patient_ref_id: UUID
+    patient_id: str
+    series: List[ObservationSeries]
+    total_points: int
+    truncated: bool = Field(False, description="True when the point limit was reached")
+
+class PatientSummary(BaseModel):
+    """Patient identity with latest demographics"""
+    id: UUID
+    identifier: str
+    assigning_authority: str = ""
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    date_of_birth: Optional[datetime] = None
+    gender: Optional[str] = None
+    message_count: int = 0
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+
+class PatientTimelineEntry(BaseModel):
+    """One message in a patient's timeline"""
+    id: UUID
+    original_filename: str
+    message_type: str
+    trigger_event: Optional[str] = None
+    visit_number: Optional[str] = None
+    admission_date: Optional[datetime] = None
+    discharge_date: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+    status: Optional[str] = None
+
+class PatientTimelineResponse(BaseModel):
+    """Page of a patient's messages, newest first"""
+    patient: PatientSummary
+    messages: List[PatientTimelineEntry]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page; null on the last page")
+
 class SampleFileInfo(BaseModel):
     """Information about sample HL7 files"""
     filename: str
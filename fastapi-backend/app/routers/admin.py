@@ -0,0 +1,131 @@
+"""
+Admin Router
+Handles on-demand CPU and allocation profiling of the serving worker
+"""
+
+import secrets
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.services.profiler import CPROFILE, SAMPLING, profiler
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Allow the request only when profiling is enabled and the admin token matches
+    """
+    if not settings.PROFILING_ENABLED or not settings.ADMIN_TOKEN:
+        # Disabled endpoints look like missing ones
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/admin/profiling/cpu", status_code=202)
+async def start_cpu_profile(
+    seconds: float = Query(30.0, gt=0, description="Stop automatically after this many seconds"),
+    mode: str = Query(SAMPLING, pattern=f"^({SAMPLING}|{CPROFILE})$", description="Stack sampler, or cProfile on the event loop thread"),
+    interval: Optional[float] = Query(None, ge=0.001, le=1.0, description="Seconds between stack samples")
+):
+    """
+    Start a CPU profile of this worker process
+
+    The sampler sees every thread (event loop and threadpool) at a small fixed
+    cost; cProfile counts every call on the event loop thread but slows it
+    down while running. Only one profile runs at a time.
+    """
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum profile length is {settings.PROFILING_MAX_SECONDS} seconds"
+        )
+
+    try:
+        return profiler.start_cpu(seconds, mode, interval or settings.PROFILING_SAMPLE_INTERVAL)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/admin/profiling/cpu/stop")
+async def stop_cpu_profile():
+    """
+    Stop the running CPU profile early
+    """
+    status = await profiler.stop_cpu()
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="No CPU profile has been started")
+
+    return status
+
+@router.get("/admin/profiling/cpu")
+async def get_cpu_profile(
+    limit: int = Query(50, ge=1, le=1000, description="Functions to return"),
+    sort: str = Query("cumulative", pattern="^(cumulative|self)$", description="cProfile ordering")
+):
+    """
+    Get the status and top functions of the last CPU profile
+
+    Sampling profiles rank functions by samples on top of the stack.
+    """
+    if profiler.cpu is None:
+        raise HTTPException(status_code=404, detail="No CPU profile has been started")
+
+    return {
+        **profiler.cpu,
+        "top_functions": [] if profiler.cpu_running else profiler.top_functions(limit, sort)
+    }
+
+@router.get("/admin/profiling/cpu/collapsed", response_class=PlainTextResponse)
+async def get_collapsed_stacks():
+    """
+    Download the last sampling profile as collapsed stacks ("frame;frame;frame count" lines)
+
+    Feed the file to flamegraph.pl or open it in speedscope.
+    """
+    if profiler.cpu is None or profiler.cpu_running:
+        raise HTTPException(status_code=409, detail="No completed CPU profile")
+
+    collapsed = profiler.collapsed_stacks()
+    if collapsed is None:
+        raise HTTPException(status_code=400, detail="Collapsed stacks are only recorded by sampling profiles")
+
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profiler.cpu["pid"]}.collapsed"'}
+    )
+
+@router.post("/admin/profiling/memory")
+async def start_memory_trace(
+    frames: int = Query(1, ge=1, le=50, description="Traceback frames kept per allocation")
+):
+    """
+    Start tracing allocations with tracemalloc
+
+    Tracing slows allocation and uses memory while active; stop it when done.
+    """
+    profiler.start_memory(frames)
+    return {"status": "tracing", "frames": frames}
+
+@router.get("/admin/profiling/memory")
+async def get_memory_snapshot(
+    limit: int = Query(25, ge=1, le=500, description="Allocation sites to return"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """
+    Snapshot the top allocation sites since tracing started
+    """
+    try:
+        return profiler.memory_snapshot(limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/admin/profiling/memory")
+async def stop_memory_trace():
+    """
+    Stop tracing allocations
+    """
+    profiler.stop_memory()
+    return {"status": "stopped"}
@@ -13,6 +13,7 @@ from sqlalchemy.orm import selectinload
 
 from app.database.database import get_db
 from app.database.models import HL7Message, ProcessingLog
+from app.services.hl7_processor import HL7Processor
 from app.models.hl7_models import (
     BrowseResponse,
     MessageSummary,
@@ -22,6 +23,7 @@ from app.models.hl7_models import (
 )
 
 router = APIRouter()
+hl7_processor = HL7Processor()
 
 @router.get("/browse/messages", response_model=BrowseResponse)
 async def browse_messages(
@@ -54,7 +56,7 @@ async def browse_messages(
             filters.append(HL7Message.processing_status == status)
         
         if patient_id:
-            filters.append(HL7Message.patient_id.ilike(f"%{patient_id}%"))
+            filters.append(HL7Message.patient_id == patient_id)
         
         if date_from:
             filters.append(HL7Message.processed_at >= date_from)
@@ -167,7 +169,14 @@ async def get_message_details(
         if message.pdf_content:
             available_formats.append("pdf")
         
-        # Get processing logs
+        # Structured parse stored at ingest (re-parsed if missing or outdated)
+        parsed_data = await hl7_processor.get_parsed_data(db, message)
+        
+        # Get processing logs and stage spans in pipeline order
+        logs = sorted(
+            message.processing_logs,
+            key=lambda log: log.started_at or log.created_at or datetime.min
+        )
         processing_logs = [
             {
                 "id": str(log.id),
@@ -175,12 +184,21 @@ async def get_message_details(
                 "processing_step": log.processing_step,
                 "status": log.status,
                 "error_message": log.error_message,
+                "error_details": log.error_details,
                 "created_at": log.created_at.isoformat() if log.created_at else None,
-                "duration_seconds": log.duration_seconds
+                "started_at": log.started_at.isoformat() if log.started_at else None,
+                "duration_seconds": log.duration_seconds,
+                "duration_ms": log.duration_ms
             }
-            for log in message.processing_logs
+            for log in logs
         ]
         
+        # Where the time went: total milliseconds per stage, in the order stages first ran
+        stage_timings = {}
+        for log in logs:
+            if log.duration_ms is not None:
+                stage_timings[log.processing_step] = round(stage_timings.get(log.processing_step, 0.0) + log.duration_ms, 3)
+        
         return {
             "id": str(message.id),
             "original_filename": message.original_filename,
@@ -197,8 +215,9 @@ async def get_message_details(
             "processing_status": message.processing_status,
             "processed_at": message.processed_at.isoformat() if message.processed_at else None,
             "available_formats": available_formats,
-            "parsed_data": message.parsed_data,
+            "parsed_data": parsed_data,
             "processing_logs": processing_logs,
+            "stage_timings_ms": stage_timings,
             "raw_hl7_size": len(message.raw_hl7_content) if message.raw_hl7_content else 0
         }
         
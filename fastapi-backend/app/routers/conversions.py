@@ -2,14 +2,21 @@
 Conversions router for saving and managing converted HL7 data
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, update, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Optional, Any, Dict, List
+import hashlib
+import json
 import logging
 import uuid
 
+from app.config import settings
 from app.database.database import get_db
 from app.database.models import SavedConversion
 from app.models.conversion_models import (
@@ -18,13 +25,43 @@ from app.models.conversion_models import (
     SavedConversionResponse,
     SavedConversionListResponse,
     UpdateJsonContentRequest,
-    JsonContentResponse
+    JsonContentResponse,
+    BulkSaveItemResult,
+    BulkSaveConversionResponse
 )
+from app.utils.jsonb_patch import build_patched_document, JsonPatchError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/conversions", tags=["Saved Conversions"])
 
+# Columns written by the bulk upsert, in SaveConversionRequest field order
+_BULK_CONTENT_COLUMNS = (
+    "json_content",
+    "xml_content",
+    "plain_english",
+    "latex_content",
+    "html_content",
+    "pdf_base64",
+    "patient_name",
+    "conversion_metadata",
+    "title",
+    "description",
+    "user_id",
+)
+
+def _validate_save_request(request: SaveConversionRequest) -> Optional[str]:
+    """Return a validation error message for a save request, or None if it is valid"""
+    # Validate that we have at least the HL7 content
+    if not request.hl7_content or not request.hl7_content.strip():
+        return "HL7 content is required"
+    
+    # Validate that we have at least one converted format
+    if not request.json_content and not request.xml_content and not request.pdf_base64 and not request.plain_english:
+        return "At least one converted format (JSON, XML, PDF, or Plain text) is required"
+    
+    return None
+
 @router.post("/save", response_model=SaveConversionResponse)
 async def save_conversion(
     request: SaveConversionRequest,
@@ -34,13 +71,9 @@ async def save_conversion(
     Save a converted HL7 message with JSON and XML data to the database
     """
     try:
-        # Validate that we have at least the HL7 content
-        if not request.hl7_content or not request.hl7_content.strip():
-            raise HTTPException(status_code=400, detail="HL7 content is required")
-        
-        # Validate that we have at least one converted format
-        if not request.json_content and not request.xml_content and not request.pdf_base64 and not request.plain_english:
-            raise HTTPException(status_code=400, detail="At least one converted format (JSON, XML, PDF, or Plain text) is required")
+        validation_error = _validate_save_request(request)
+        if validation_error:
+            raise HTTPException(status_code=400, detail=validation_error)
         
         # Create new SavedConversion record
         saved_conversion = SavedConversion(
@@ -90,6 +123,217 @@ async def save_conversion(
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save conversion: {str(e)}")
 
+@router.post("/bulk", response_model=BulkSaveConversionResponse)
+async def bulk_save_conversions(
+    request: Request,
+    on_conflict: str = Query("skip", pattern="^(skip|update)$", description="Skip or overwrite conversions whose HL7 content already exists"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Save many converted HL7 messages in one request
+    
+    Accepts a JSON array or NDJSON (one save request object per line). Items are
+    written with multi-row INSERT ... ON CONFLICT statements keyed on the HL7
+    content hash, one transaction per chunk, and a result is returned per item.
+    """
+    body = await request.body()
+    items = _parse_bulk_payload(body, request.headers.get("content-type", ""))
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one conversion is required")
+    
+    results: List[Optional[BulkSaveItemResult]] = [None] * len(items)
+    pending = []  # (index, request, content_hash) for items that passed validation
+    first_index_by_hash: Dict[str, int] = {}
+    payload_duplicates = []  # (index, content_hash) repeated within this payload
+    
+    for index, item in enumerate(items):
+        if isinstance(item, ValueError):
+            results[index] = BulkSaveItemResult(index=index, status="invalid", message=f"Invalid JSON: {item}")
+            continue
+        
+        try:
+            conversion = SaveConversionRequest.model_validate(item)
+        except ValidationError as e:
+            details = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            results[index] = BulkSaveItemResult(index=index, status="invalid", message=details)
+            continue
+        
+        validation_error = _validate_save_request(conversion)
+        if validation_error:
+            results[index] = BulkSaveItemResult(index=index, status="invalid", message=validation_error)
+            continue
+        
+        # Same digest as the MD5(original_hl7_content) unique index
+        content_hash = hashlib.md5(conversion.hl7_content.encode("utf-8")).hexdigest()
+        if content_hash in first_index_by_hash:
+            payload_duplicates.append((index, content_hash))
+            continue
+        
+        first_index_by_hash[content_hash] = index
+        pending.append((index, conversion, content_hash))
+    
+    conversion_id_by_hash: Dict[str, str] = {}
+    chunk_size = max(1, settings.BULK_SAVE_CHUNK_SIZE)
+    
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            chunk_results = await _upsert_conversion_chunk(db, chunk, on_conflict)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error bulk saving conversions {start}-{start + len(chunk) - 1}: {e}")
+            for index, _, _ in chunk:
+                results[index] = BulkSaveItemResult(
+                    index=index,
+                    status="failed",
+                    message=f"Failed to save conversion: {str(e)}"
+                )
+            continue
+        
+        for item_result, (_, _, content_hash) in zip(chunk_results, chunk):
+            results[item_result.index] = item_result
+            if item_result.conversion_id:
+                conversion_id_by_hash[content_hash] = item_result.conversion_id
+    
+    for index, content_hash in payload_duplicates:
+        results[index] = BulkSaveItemResult(
+            index=index,
+            status="duplicate",
+            conversion_id=conversion_id_by_hash.get(content_hash),
+            message=f"Same HL7 content as item {first_index_by_hash[content_hash]}"
+        )
+    
+    counts = {"created": 0, "updated": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+    for item_result in results:
+        counts[item_result.status] += 1
+    
+    logger.info(
+        f"Bulk saved conversions: {counts['created']} created, {counts['updated']} updated, "
+        f"{counts['duplicate']} duplicates, {counts['invalid']} invalid, {counts['failed']} failed"
+    )
+    
+    return BulkSaveConversionResponse(
+        success=counts["invalid"] == 0 and counts["failed"] == 0,
+        total=len(items),
+        created=counts["created"],
+        updated=counts["updated"],
+        duplicates=counts["duplicate"],
+        invalid=counts["invalid"],
+        failed=counts["failed"],
+        results=results
+    )
+
+def _parse_bulk_payload(body: bytes, content_type: str) -> List[Any]:
+    """
+    Parse a bulk request body as a JSON array or NDJSON
+    
+    Unparseable NDJSON lines are returned as ValueError instances so they can be
+    reported per item instead of rejecting the whole payload.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be UTF-8 encoded")
+    
+    stripped = text.lstrip()
+    if stripped.startswith("[") and "ndjson" not in content_type:
+        try:
+            items = json.loads(stripped)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {str(e)}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+        return items
+    
+    items = []
+    # NDJSON records end at "\n" only; str.splitlines() would also split on U+2028,
+    # U+0085 and similar characters that JSON strings may contain unescaped
+    for line in text.split("\n"):
+        line = line.removesuffix("\r")
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            items.append(e)
+    return items
+
+async def _upsert_conversion_chunk(
+    db: AsyncSession,
+    chunk: List[tuple],
+    on_conflict: str
+) -> List[BulkSaveItemResult]:
+    """
+    Write one chunk of validated conversions with a single INSERT ... ON CONFLICT
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "original_hl7_content": conversion.hl7_content,
+            **{column: getattr(conversion, column) for column in _BULK_CONTENT_COLUMNS},
+            "created_at": now,
+            "updated_at": now
+        }
+        for _, conversion, _ in chunk
+    ]
+    
+    content_hash = func.md5(SavedConversion.original_hl7_content)
+    stmt = pg_insert(SavedConversion).values(rows)
+    if on_conflict == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[content_hash],
+            set_={
+                **{column: stmt.excluded[column] for column in _BULK_CONTENT_COLUMNS},
+                "updated_at": stmt.excluded.updated_at
+            }
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[content_hash])
+    
+    # xmax is 0 only for freshly inserted tuples, which separates inserts from updates
+    stmt = stmt.returning(
+        SavedConversion.id,
+        content_hash.label("content_hash"),
+        literal_column("xmax = 0").label("inserted")
+    )
+    result = await db.execute(stmt)
+    written = {row.content_hash: row for row in result}
+    
+    # Rows skipped by DO NOTHING already exist; look up their IDs through the hash index
+    existing = {}
+    skipped_hashes = [h for _, _, h in chunk if h not in written]
+    if skipped_hashes:
+        existing_result = await db.execute(
+            select(SavedConversion.id, content_hash.label("content_hash"))
+            .where(content_hash.in_(skipped_hashes))
+        )
+        existing = {row.content_hash: row.id for row in existing_result}
+    
+    chunk_results = []
+    for index, _, h in chunk:
+        if h in written:
+            row = written[h]
+            chunk_results.append(BulkSaveItemResult(
+                index=index,
+                status="created" if row.inserted else "updated",
+                conversion_id=str(row.id)
+            ))
+        else:
+            existing_id = existing.get(h)
+            chunk_results.append(BulkSaveItemResult(
+                index=index,
+                status="duplicate",
+                conversion_id=str(existing_id) if existing_id else None,
+                message="This HL7 message has already been saved"
+            ))
+    
+    return chunk_results
+
 @router.get("/list", response_model=SavedConversionListResponse)
 async def list_saved_conversions(
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
@@ -404,4 +648,119 @@ async def update_json_content(
     except Exception as e:
         logger.error(f"Error updating JSON content: {e}")
         await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to update JSON content: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to update JSON content: {str(e)}")
+
+@router.patch("/{conversion_id}/json", response_model=JsonContentResponse)
+async def patch_json_content(
+    conversion_id: str,
+    request: Request,
+    expected_updated_at: Optional[datetime] = Query(None, description="Reject the patch if the conversion was modified after this timestamp"),
+    include_document: bool = Query(True, description="Return the patched JSON document in the response"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply a JSON Patch (RFC 6902) or JSON Merge Patch (RFC 7396) to the JSON content
+    
+    The patch is applied inside PostgreSQL with jsonb_set / || in a single
+    UPDATE ... RETURNING, so only the edits travel over the wire. Pass the
+    updated_at value from a previous read as expected_updated_at to prevent
+    lost updates from concurrent editors.
+    """
+    try:
+        # Validate UUID format
+        try:
+            uuid.UUID(conversion_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid conversion ID format")
+        
+        try:
+            patch = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid patch document: {str(e)}")
+        
+        content_type = request.headers.get("content-type", "")
+        if "merge-patch" in content_type:
+            patch_format = "merge"
+        elif "json-patch" in content_type:
+            patch_format = "json"
+        else:
+            # Plain application/json: an array is a JSON Patch, anything else a merge patch
+            patch_format = "json" if isinstance(patch, list) else "merge"
+        
+        # Lock the row while the patch chain reads it
+        source = (
+            select(func.coalesce(SavedConversion.json_content, literal({}, type_=JSONB)).label("doc"))
+            .where(SavedConversion.id == conversion_id)
+            .with_for_update()
+            .cte("patch_source")
+        )
+        try:
+            patched = build_patched_document(source, patch_format, patch)
+        except JsonPatchError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid patch document: {str(e)}")
+        
+        stmt = (
+            update(SavedConversion)
+            .where(SavedConversion.id == conversion_id)
+            .where(select(patched.c.ok).scalar_subquery())
+            .values(
+                json_content=select(patched.c.doc).scalar_subquery(),
+                updated_at=datetime.utcnow()
+            )
+        )
+        if expected_updated_at is not None:
+            if expected_updated_at.tzinfo is not None:
+                expected_updated_at = expected_updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+            stmt = stmt.where(SavedConversion.updated_at == expected_updated_at)
+        
+        returning = [
+            SavedConversion.id,
+            SavedConversion.title,
+            SavedConversion.description,
+            SavedConversion.updated_at
+        ]
+        if include_document:
+            returning.append(SavedConversion.json_content)
+        
+        result = await db.execute(stmt.returning(*returning))
+        row = result.first()
+        
+        if not row:
+            await db.rollback()
+            # Work out why nothing was updated; this only runs on the failure path
+            current_result = await db.execute(
+                select(SavedConversion.id, SavedConversion.updated_at).where(SavedConversion.id == conversion_id)
+            )
+            current = current_result.first()
+            
+            if not current:
+                raise HTTPException(status_code=404, detail="Conversion not found")
+            if expected_updated_at is not None and current.updated_at != expected_updated_at:
+                modified_at = current.updated_at.isoformat() if current.updated_at else None
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Conversion was modified at {modified_at}; reload it and retry the patch"
+                )
+            raise HTTPException(
+                status_code=422,
+                detail="Patch could not be applied: a test failed, a target path does not exist or the result is not a JSON object"
+            )
+        
+        await db.commit()
+        
+        logger.info(f"Patched JSON content for conversion ID: {conversion_id}")
+        
+        return JsonContentResponse(
+            id=str(row.id),
+            json_content=row.json_content if include_document else None,
+            title=row.title,
+            description=row.description,
+            updated_at=row.updated_at
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error patching JSON content: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to patch JSON content: {str(e)}")
\ No newline at end of file
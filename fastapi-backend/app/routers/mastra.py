@@ -2,18 +2,19 @@
 Mastra-specific endpoints for HL7 conversion using Gemini AI
 """
 
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Optional, Tuple
+import json
 import logging
 
 from app.services.mastra_service import MastraService, MockMastraService
 from app.utils.file_handler import file_handler
+from app.services.triage_engine import triage_engine
+from app.config import settings
 from app.models.hl7_models import ConversionRequest, ConversionResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List
-import re
-import hashlib
 
 logger = logging.getLogger(__name__)
 
@@ -287,7 +288,14 @@ async def convert_hl7_to_medical_document(request: MedicalDocumentRequest):
         raise HTTPException(status_code=500, detail=f"Medical document generation failed: {str(e)}")
 
 @router.post("/triage-analysis")
-async def analyze_triage(request: TriageAnalysisRequest):
+async def analyze_triage(
+    request: TriageAnalysisRequest,
+    stream: Optional[str] = Query(
+        None,
+        pattern="^(ndjson|sse)$",
+        description="Stream each patient's result as it is ready (NDJSON or Server-Sent Events), then the ranked summary"
+    )
+):
     """
     Analyze multiple HL7 messages for medical triage severity assessment using Gemini AI
     """
@@ -295,26 +303,35 @@ async def analyze_triage(request: TriageAnalysisRequest):
         if not request.hl7_messages:
             raise HTTPException(status_code=400, detail="At least one HL7 message is required")
         
-        if len(request.hl7_messages) > 50:  # Reasonable limit to prevent overload
-            raise HTTPException(status_code=400, detail="Maximum 50 patients can be analyzed at once")
+        if len(request.hl7_messages) > settings.TRIAGE_MAX_MESSAGES:  # Reasonable limit to prevent overload
+            raise HTTPException(
+                status_code=400,
+                detail=f"Maximum {settings.TRIAGE_MAX_MESSAGES} patients can be analyzed at once"
+            )
         
         logger.info(f"Processing triage analysis for {len(request.hl7_messages)} patients")
         
-        # Call the Mastra service for triage analysis
-        try:
-            result = await mastra_service.analyze_triage(request.hl7_messages)
-        except Exception as e:
-            logger.warning(f"Primary Mastra service failed for triage analysis: {e}")
-            logger.info("Falling back to enhanced parsing without AI for triage analysis")
-            # Fall back to enhanced parsing instead of mock service
+        if stream:
+            return StreamingResponse(
+                _stream_triage_events(request.hl7_messages, stream),
+                media_type="text/event-stream" if stream == "sse" else "application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        if len(request.hl7_messages) > settings.MASTRA_TRIAGE_MAX_MESSAGES:
+            # Too many for the AI service; rule-based triage fans out across worker processes
             result = await _fallback_triage_analysis(request.hl7_messages)
+        else:
+            # Call the Mastra service for triage analysis
+            try:
+                result = await mastra_service.analyze_triage(request.hl7_messages)
+            except Exception as e:
+                logger.warning(f"Primary Mastra service failed for triage analysis: {e}")
+                logger.info("Falling back to enhanced parsing without AI for triage analysis")
+                # Fall back to enhanced parsing instead of mock service
+                result = await _fallback_triage_analysis(request.hl7_messages)
         
-        return {
-            "success": result.get("success", True),
-            "message": f"Triage analysis completed for {len(request.hl7_messages)} patients",
-            "data": result.get("data", []),
-            "metadata": result.get("metadata", {})
-        }
+        return _triage_response(result, len(request.hl7_messages))
         
     except HTTPException:
         raise
@@ -322,6 +339,58 @@ async def analyze_triage(request: TriageAnalysisRequest):
         logger.error(f"Error in triage analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Triage analysis failed: {str(e)}")
 
+def _triage_response(result: Dict[str, Any], patient_count: int) -> Dict[str, Any]:
+    return {
+        "success": result.get("success", True),
+        "message": f"Triage analysis completed for {patient_count} patients",
+        "data": result.get("data", []),
+        "metadata": result.get("metadata", {})
+    }
+
+async def _triage_events(hl7_messages: List[str]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield ("result", triage result) per patient as soon as it is ready, then
+    ("summary", ranked response) with every result ordered by severity
+    
+    Results arrive in completion order, so each carries "index", the
+    0-based position of its message in the request.
+    """
+    if len(hl7_messages) <= settings.MASTRA_TRIAGE_MAX_MESSAGES:
+        # Mastra chunks arrive as they complete; failed chunks are already triaged by local rules
+        chunks = []
+        async for chunk in mastra_service.iter_triage(hl7_messages):
+            chunks.append(chunk)
+            for index, item in chunk[0]:
+                yield "result", {"index": index, **item}
+        yield "summary", _triage_response(mastra_service.merge_triage(chunks), len(hl7_messages))
+        return
+    
+    # Small chunks so the first results leave after a few messages, not the whole batch
+    indexed = []
+    async for chunk in triage_engine.iter_results(hl7_messages, chunk_size=settings.TRIAGE_STREAM_CHUNK_SIZE):
+        indexed.extend(chunk)
+        for index, item in chunk:
+            yield "result", {"index": index, **item}
+    yield "summary", _triage_response(triage_engine.build_response(indexed), len(hl7_messages))
+
+async def _stream_triage_events(hl7_messages: List[str], stream: str) -> AsyncIterator[str]:
+    """
+    Encode triage events as SSE frames or NDJSON lines ({"event": ..., "data": ...})
+    
+    Failures after the response has started are sent as a final "error" event.
+    """
+    def encode(event: str, payload: Dict[str, Any]) -> str:
+        if stream == "sse":
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"event": event, "data": payload}) + "\n"
+    
+    try:
+        async for event, payload in _triage_events(hl7_messages):
+            yield encode(event, payload)
+    except Exception as e:
+        logger.error(f"Error in streaming triage analysis: {e}")
+        yield encode("error", {"detail": f"Triage analysis failed: {str(e)}"})
+
 @router.get("/agent/status/{agent_name}")
 async def get_agent_status(agent_name: str):
     """
@@ -343,285 +412,4 @@ async def _fallback_triage_analysis(hl7_messages: List[str]) -> Dict[str, Any]:
     Fallback triage analysis that extracts real patient information from HL7 messages
     without relying on AI services. Uses rule-based parsing and scoring.
     """
-    results = []
-    
-    for i, hl7_content in enumerate(hl7_messages):
-        try:
-            # Parse HL7 segments
-            lines = [line.strip() for line in hl7_content.split('\n') if line.strip()]
-            
-            # Initialize patient data
-            patient_info = _parse_patient_info(lines)
-            clinical_info = _parse_clinical_info(lines)
-            
-            # Calculate basic severity score based on available data
-            severity_score = _calculate_severity_score(clinical_info, patient_info)
-            priority_level = _get_priority_level(severity_score)
-            timeline = _get_recommended_timeline(severity_score)
-            
-            # Create triage result with real patient data
-            triage_result = {
-                "patient_id": patient_info.get("id", f"UNKNOWN_{i+1}"),
-                "patient_name": patient_info.get("name", f"Patient {i+1}"),
-                "severity_score": severity_score,
-                "priority_level": priority_level,
-                "clinical_summary": _generate_clinical_summary(clinical_info, patient_info),
-                "key_findings": _extract_key_findings(clinical_info),
-                "recommended_timeline": timeline,
-                "reasoning": f"Score based on parsed HL7 data: {_get_scoring_reasoning(clinical_info, patient_info)}"
-            }
-            
-            results.append(triage_result)
-            
-        except Exception as e:
-            logger.warning(f"Error parsing HL7 message {i+1}: {e}")
-            # Create a basic result for unparseable messages
-            results.append({
-                "patient_id": f"PARSE_ERROR_{i+1}",
-                "patient_name": f"Patient {i+1} (Parse Error)",
-                "severity_score": 50,  # Default middle score
-                "priority_level": "Non-urgent",
-                "clinical_summary": "Unable to parse HL7 message for detailed analysis",
-                "key_findings": ["HL7 parsing error"],
-                "recommended_timeline": "Routine",
-                "reasoning": "Default score due to HL7 parsing error"
-            })
-    
-    # Sort by severity score (highest first)
-    results.sort(key=lambda x: x["severity_score"], reverse=True)
-    
-    return {
-        "success": True,
-        "data": results,
-        "metadata": {
-            "patientsAnalyzed": len(results),
-            "timestamp": "2024-12-01T12:00:00Z",
-            "triageProtocols": ["Rule-based parsing", "HL7 direct analysis"],
-            "fallback_mode": True
-        }
-    }
-
-
-def _parse_patient_info(lines: List[str]) -> Dict[str, str]:
-    """Extract patient information from HL7 PID segment"""
-    patient_info = {"id": "", "name": "", "dob": "", "gender": ""}
-    
-    for line in lines:
-        if line.startswith('PID'):
-            segments = line.split('|')
-            if len(segments) >= 6:
-                # Extract patient ID from PID.3
-                if len(segments) > 3 and segments[3]:
-                    id_parts = segments[3].split('^')
-                    patient_info["id"] = id_parts[0] if id_parts else segments[3]
-                
-                # Extract patient name from PID.5  
-                if len(segments) > 5 and segments[5]:
-                    name_parts = segments[5].split('^')
-                    if len(name_parts) >= 2:
-                        # Format: LAST^FIRST^MIDDLE
-                        first_name = name_parts[1] if len(name_parts) > 1 else ""
-                        last_name = name_parts[0] if len(name_parts) > 0 else ""
-                        patient_info["name"] = f"{first_name} {last_name}".strip()
-                    else:
-                        patient_info["name"] = segments[5]
-                
-                # Extract DOB from PID.7
-                if len(segments) > 7 and segments[7]:
-                    patient_info["dob"] = segments[7]
-                
-                # Extract gender from PID.8  
-                if len(segments) > 8 and segments[8]:
-                    patient_info["gender"] = segments[8]
-            break
-    
-    return patient_info
-
-
-def _parse_clinical_info(lines: List[str]) -> Dict[str, Any]:
-    """Extract clinical information from various HL7 segments"""
-    clinical_info = {
-        "message_type": "",
-        "chief_complaint": "",
-        "observations": [],
-        "vital_signs": {},
-        "admit_type": "",
-        "location": ""
-    }
-    
-    for line in lines:
-        # Parse MSH segment for message type
-        if line.startswith('MSH'):
-            segments = line.split('|')
-            if len(segments) >= 9:
-                msg_type_field = segments[8]
-                if '^' in msg_type_field:
-                    clinical_info["message_type"] = msg_type_field.split('^')[0]
-                else:
-                    clinical_info["message_type"] = msg_type_field
-        
-        # Parse PV1 segment for visit information
-        elif line.startswith('PV1'):
-            segments = line.split('|')
-            if len(segments) > 2:
-                clinical_info["admit_type"] = segments[2] if len(segments) > 2 else ""
-                clinical_info["location"] = segments[3] if len(segments) > 3 else ""
-        
-        # Parse OBX segments for observations
-        elif line.startswith('OBX'):
-            segments = line.split('|')
-            if len(segments) >= 6:
-                obs_type = segments[3] if len(segments) > 3 else ""
-                obs_value = segments[5] if len(segments) > 5 else ""
-                
-                if "CHIEF_COMPLAINT" in obs_type.upper():
-                    clinical_info["chief_complaint"] = obs_value
-                elif any(vital in obs_type.upper() for vital in ["TEMP", "BP", "PULSE", "RESP", "O2"]):
-                    clinical_info["vital_signs"][obs_type] = obs_value
-                else:
-                    clinical_info["observations"].append(f"{obs_type}: {obs_value}")
-    
-    return clinical_info
-
-
-def _calculate_severity_score(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> int:
-    """Calculate severity score based on parsed HL7 data"""
-    base_score = 50  # Default baseline
-    
-    # Adjust based on message type
-    msg_type = clinical_info.get("message_type", "").upper()
-    if msg_type in ["ADT"]:
-        base_score += 10  # Admission typically indicates moderate concern
-    
-    # Adjust based on admit type  
-    admit_type = clinical_info.get("admit_type", "").upper()
-    if "E" in admit_type or "EMERGENCY" in admit_type:
-        base_score += 20
-    elif "U" in admit_type or "URGENT" in admit_type:
-        base_score += 15
-    elif "I" in admit_type or "INPATIENT" in admit_type:
-        base_score += 10
-    
-    # Adjust based on chief complaint keywords
-    complaint = clinical_info.get("chief_complaint", "").lower()
-    high_risk_keywords = ["chest pain", "difficulty breathing", "unconscious", "severe", "critical"]
-    moderate_risk_keywords = ["pain", "discomfort", "nausea", "fever"]
-    
-    for keyword in high_risk_keywords:
-        if keyword in complaint:
-            base_score += 25
-            break
-    else:
-        for keyword in moderate_risk_keywords:
-            if keyword in complaint:
-                base_score += 10
-                break
-    
-    # Adjust based on location  
-    location = clinical_info.get("location", "").upper()
-    if "ICU" in location or "CCU" in location:
-        base_score += 30
-    elif "ED" in location or "EMERGENCY" in location:
-        base_score += 20
-    
-    # Keep score within valid range
-    return max(1, min(100, base_score))
-
-
-def _get_priority_level(severity_score: int) -> str:
-    """Get priority level based on severity score"""
-    if severity_score >= 90:
-        return "Immediate"
-    elif severity_score >= 80:
-        return "Emergent"
-    elif severity_score >= 70:
-        return "Urgent"
-    elif severity_score >= 60:
-        return "Less Urgent"
-    elif severity_score >= 50:
-        return "Non-urgent"
-    else:
-        return "Delayed"
-
-
-def _get_recommended_timeline(severity_score: int) -> str:
-    """Get recommended timeline based on severity score"""
-    if severity_score >= 90:
-        return "Immediate"
-    elif severity_score >= 80:
-        return "Within 15 minutes"
-    elif severity_score >= 70:
-        return "Within 1 hour"
-    elif severity_score >= 60:
-        return "Within 2-4 hours"
-    else:
-        return "Routine"
-
-
-def _generate_clinical_summary(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> str:
-    """Generate a clinical summary from parsed data"""
-    summary_parts = []
-    
-    if clinical_info.get("message_type"):
-        summary_parts.append(f"Message type: {clinical_info['message_type']}")
-    
-    if clinical_info.get("chief_complaint"):
-        summary_parts.append(f"Chief complaint: {clinical_info['chief_complaint']}")
-    
-    if clinical_info.get("admit_type"):
-        summary_parts.append(f"Admission type: {clinical_info['admit_type']}")
-    
-    if clinical_info.get("location"):
-        summary_parts.append(f"Location: {clinical_info['location']}")
-    
-    if not summary_parts:
-        summary_parts.append("Clinical assessment based on available HL7 data")
-    
-    return ". ".join(summary_parts)
-
-
-def _extract_key_findings(clinical_info: Dict[str, Any]) -> List[str]:
-    """Extract key findings from clinical data"""
-    findings = []
-    
-    if clinical_info.get("chief_complaint"):
-        findings.append(f"Chief complaint: {clinical_info['chief_complaint']}")
-    
-    if clinical_info.get("vital_signs"):
-        findings.append("Vital signs recorded")
-    
-    if clinical_info.get("observations"):
-        findings.extend(clinical_info["observations"][:3])  # Limit to first 3
-    
-    if clinical_info.get("location"):
-        findings.append(f"Location: {clinical_info['location']}")
-    
-    if not findings:
-        findings.append("HL7 message processed")
-    
-    return findings
-
-
-def _get_scoring_reasoning(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> str:
-    """Provide reasoning for the calculated score"""
-    factors = []
-    
-    msg_type = clinical_info.get("message_type", "")
-    if msg_type:
-        factors.append(f"message type ({msg_type})")
-    
-    admit_type = clinical_info.get("admit_type", "")
-    if admit_type:
-        factors.append(f"admission type ({admit_type})")
-    
-    if clinical_info.get("chief_complaint"):
-        factors.append("chief complaint analysis")
-    
-    location = clinical_info.get("location", "")
-    if location:
-        factors.append(f"location ({location})")
-    
-    if factors:
-        return ", ".join(factors)
-    else:
-        return "baseline HL7 data analysis"
\ No newline at end of file
+    return await triage_engine.analyze(hl7_messages)
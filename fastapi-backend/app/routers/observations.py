@@ -0,0 +1,119 @@
+"""
+Observations Router
+Handles per-patient OBX result time series
+"""
+
+import uuid
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, literal_column
+
+from app.database.database import get_db
+from app.database.models import Observation, Patient
+from app.models.hl7_models import (
+    ObservationPoint,
+    ObservationSeries,
+    ObservationTimeSeriesResponse
+)
+
+router = APIRouter()
+
+@router.get("/patients/{patient_ref_id}/observations", response_model=ObservationTimeSeriesResponse)
+async def get_patient_observations(
+    patient_ref_id: uuid.UUID,
+    code: Optional[List[str]] = Query(None, description="Observation codes (OBX.3) to include; all when omitted"),
+    date_from: Optional[datetime] = Query(None, description="Observed at or after"),
+    date_to: Optional[datetime] = Query(None, description="Observed at or before"),
+    abnormal_only: bool = Query(False, description="Only results with an abnormal flag other than N"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum points returned"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a patient's observation results grouped into one time series per code
+    
+    The patient is the patients row (PID.3 scoped by assigning authority),
+    as for the timeline. Served from the observations table by its
+    (patient_ref_id, code, observed_at) index, so no message content is
+    read or parsed.
+    """
+    try:
+        patient = await db.get(Patient, patient_ref_id)
+        if not patient:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Patient with ID {patient_ref_id} not found"
+            )
+        
+        filters = [Observation.patient_ref_id == patient_ref_id]
+        
+        if code:
+            filters.append(Observation.code.in_(code))
+        
+        if date_from:
+            filters.append(Observation.observed_at >= date_from)
+        
+        if date_to:
+            filters.append(Observation.observed_at <= date_to)
+        
+        if abnormal_only:
+            # Same predicate as the partial index ix_observations_patient_abnormal; the
+            # literal (not a bind parameter) lets the planner match it under prepared statements
+            filters.append(and_(Observation.abnormal_flag.isnot(None), Observation.abnormal_flag != literal_column("'N'")))
+        
+        query = (
+            select(
+                Observation.code,
+                Observation.code_text,
+                Observation.observed_at,
+                Observation.value,
+                Observation.numeric_value,
+                Observation.units,
+                Observation.reference_range,
+                Observation.abnormal_flag,
+                Observation.message_id
+            )
+            .where(and_(*filters))
+            .order_by(Observation.code, Observation.observed_at)
+            .limit(limit + 1)
+        )
+        
+        result = await db.execute(query)
+        rows = result.all()
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+        
+        # Rows arrive ordered by code, so each series is a contiguous run
+        series: List[ObservationSeries] = []
+        for row in rows:
+            if not series or series[-1].code != row.code:
+                series.append(ObservationSeries(code=row.code, code_text=row.code_text))
+            elif not series[-1].code_text:
+                series[-1].code_text = row.code_text
+            
+            series[-1].points.append(ObservationPoint(
+                observed_at=row.observed_at,
+                value=row.value,
+                numeric_value=row.numeric_value,
+                units=row.units,
+                reference_range=row.reference_range,
+                abnormal_flag=row.abnormal_flag,
+                message_id=row.message_id
+            ))
+        
+        return ObservationTimeSeriesResponse(
+            patient_ref_id=patient_ref_id,
+            patient_id=patient.identifier,
+            series=series,
+            total_points=len(rows),
+            truncated=truncated
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving observations: {str(e)}"
+        )
@@ -0,0 +1,144 @@
+"""
+Patients Router
+Handles patient lookups and per-patient message timelines
+"""
+
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc, tuple_
+
+from app.database.database import get_db
+from app.database.models import HL7Message, Patient
+from app.models.hl7_models import (
+    PatientSummary,
+    PatientTimelineEntry,
+    PatientTimelineResponse
+)
+from app.utils.keyset_cursor import decode_cursor, encode_cursor
+
+router = APIRouter()
+
+def _patient_summary(patient: Patient) -> PatientSummary:
+    return PatientSummary(
+        id=patient.id,
+        identifier=patient.identifier,
+        assigning_authority=patient.assigning_authority,
+        first_name=patient.first_name,
+        last_name=patient.last_name,
+        date_of_birth=patient.date_of_birth,
+        gender=patient.gender,
+        message_count=patient.message_count,
+        first_seen_at=patient.first_seen_at,
+        last_seen_at=patient.last_seen_at
+    )
+
+@router.get("/patients", response_model=List[PatientSummary])
+async def find_patients(
+    identifier: str = Query(..., description="Patient identifier (PID.3.1)"),
+    assigning_authority: Optional[str] = Query(None, description="Assigning authority (PID.3.4); any when omitted"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Look up patients by identifier, optionally narrowed to one assigning authority
+    
+    Exact matches served by the (identifier, assigning_authority) unique index.
+    """
+    try:
+        query = select(Patient).where(Patient.identifier == identifier)
+        if assigning_authority is not None:
+            query = query.where(Patient.assigning_authority == assigning_authority)
+        
+        result = await db.execute(query.order_by(Patient.assigning_authority))
+        return [_patient_summary(patient) for patient in result.scalars().all()]
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error looking up patients: {str(e)}"
+        )
+
+@router.get("/patients/{patient_ref_id}/timeline", response_model=PatientTimelineResponse)
+async def get_patient_timeline(
+    patient_ref_id: uuid.UUID,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500, description="Messages per page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a patient's messages, newest first, paged by keyset
+    
+    Each page continues strictly after the (processed_at, id) of the previous
+    page's last row, so deep pages cost the same as the first and rows
+    ingested meanwhile are neither skipped nor repeated.
+    """
+    try:
+        patient = await db.get(Patient, patient_ref_id)
+        if not patient:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Patient with ID {patient_ref_id} not found"
+            )
+        
+        query = (
+            select(
+                HL7Message.id,
+                HL7Message.original_filename,
+                HL7Message.message_type,
+                HL7Message.trigger_event,
+                HL7Message.visit_number,
+                HL7Message.admission_date,
+                HL7Message.discharge_date,
+                HL7Message.processed_at,
+                HL7Message.processing_status
+            )
+            .where(HL7Message.patient_ref_id == patient_ref_id)
+        )
+        
+        if cursor:
+            try:
+                processed_at, message_id = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.where(tuple_(HL7Message.processed_at, HL7Message.id) < tuple_(processed_at, message_id))
+        
+        query = query.order_by(desc(HL7Message.processed_at), desc(HL7Message.id)).limit(limit + 1)
+        
+        result = await db.execute(query)
+        rows = result.all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        
+        messages = [
+            PatientTimelineEntry(
+                id=row.id,
+                original_filename=row.original_filename,
+                message_type=row.message_type,
+                trigger_event=row.trigger_event,
+                visit_number=row.visit_number,
+                admission_date=row.admission_date,
+                discharge_date=row.discharge_date,
+                processed_at=row.processed_at,
+                status=row.processing_status
+            )
+            for row in rows
+        ]
+        
+        next_cursor = None
+        if has_next and rows[-1].processed_at:
+            next_cursor = encode_cursor(rows[-1].processed_at, rows[-1].id)
+        
+        return PatientTimelineResponse(
+            patient=_patient_summary(patient),
+            messages=messages,
+            next_cursor=next_cursor
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving patient timeline: {str(e)}"
+        )
@@ -17,6 +17,8 @@ from app.models.hl7_models import (
 )
 from app.services.hl7_processor import HL7Processor
 from app.services.mastra_service import MastraService
+from app.services.processing_spans import message_context, span_recorder
+from app.services.status_events import CONVERTING_STEP, SAVING_STEP
 from app.utils.file_handler import file_handler
 
 router = APIRouter()
@@ -140,42 +142,13 @@ async def process_all_sample_files(
     try:
         sample_files = file_handler.list_sample_files()
         responses = []
+        loaded = []
         
         for file_info in sample_files:
             try:
                 # Read sample file
                 filename, hl7_content = await file_handler.read_sample_file(file_info["filename"])
-                
-                # Generate message ID
-                message_id = uuid.uuid4()
-                
-                # Extract basic info from HL7
-                message_info = hl7_processor.extract_basic_info(hl7_content)
-                
-                # Save to database
-                await hl7_processor.save_message_to_db(
-                    db=db,
-                    message_id=message_id,
-                    filename=f"sample_{filename}",
-                    content=hl7_content,
-                    message_type=message_info.get('message_type', 'Unknown'),
-                    patient_id=message_info.get('patient_id')
-                )
-                
-                # Schedule processing
-                background_tasks.add_task(
-                    process_sample_hl7_message,
-                    message_id=message_id,
-                    hl7_content=hl7_content,
-                    db_session=db
-                )
-                
-                responses.append(HL7UploadResponse(
-                    message_id=message_id,
-                    filename=f"sample_{filename}",
-                    status=ProcessingStatus.PENDING,
-                    message=f"Sample file '{filename}' queued for processing"
-                ))
+                loaded.append((f"sample_{filename}", hl7_content))
                 
             except Exception as e:
                 responses.append(HL7UploadResponse(
@@ -185,6 +158,45 @@ async def process_all_sample_files(
                     message=f"Error processing sample file: {str(e)}"
                 ))
         
+        if not loaded:
+            return responses
+        
+        # Extract headers for all samples at once and save them in one transaction
+        records = hl7_processor.build_message_records(
+            message_ids=[uuid.uuid4() for _ in loaded],
+            filenames=[filename for filename, _ in loaded],
+            contents=[hl7_content for _, hl7_content in loaded]
+        )
+        
+        try:
+            await hl7_processor.save_messages_bulk(db, records)
+        except Exception as e:
+            return responses + [
+                HL7UploadResponse(
+                    message_id=record["id"],
+                    filename=record["original_filename"],
+                    status=ProcessingStatus.FAILED,
+                    message=f"Error processing sample file: {str(e)}"
+                )
+                for record in records
+            ]
+        
+        for record in records:
+            # Schedule processing
+            background_tasks.add_task(
+                process_sample_hl7_message,
+                message_id=record["id"],
+                hl7_content=record["raw_hl7_content"],
+                db_session=db
+            )
+            
+            responses.append(HL7UploadResponse(
+                message_id=record["id"],
+                filename=record["original_filename"],
+                status=ProcessingStatus.PENDING,
+                message=f"Sample file '{record['original_filename'][len('sample_'):]}' queued for processing"
+            ))
+        
         return responses
         
     except Exception as e:
@@ -240,13 +252,17 @@ async def process_sample_hl7_message(
     try:
         # Update status to processing
         await hl7_processor.update_processing_status(
-            db_session, message_id, ProcessingStatus.PROCESSING
+            db_session, message_id, ProcessingStatus.PROCESSING, *CONVERTING_STEP
         )
         
         # Process with Mastra agents
-        results = await mastra_service.process_hl7_message(hl7_content)
+        with message_context(message_id), span_recorder.span(message_id, "convert", agent_name="Mastra"):
+            results = await mastra_service.process_hl7_message(hl7_content)
         
         # Save results to database
+        await hl7_processor.update_processing_status(
+            db_session, message_id, ProcessingStatus.PROCESSING, *SAVING_STEP
+        )
         await hl7_processor.save_processed_formats(
             db_session,
             message_id,
@@ -266,5 +282,5 @@ async def process_sample_hl7_message(
             db_session, message_id, str(e)
         )
         await hl7_processor.update_processing_status(
-            db_session, message_id, ProcessingStatus.FAILED
+            db_session, message_id, ProcessingStatus.FAILED, error_message=str(e)
         )
\ No newline at end of file
@@ -3,24 +3,54 @@ HL7 File Upload Router
 Handles file uploads and processing initiation
 """
 
+import asyncio
+import itertools
+import json
+import logging
+import tempfile
+import time
 import uuid
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Set, Tuple, Iterator, BinaryIO, Union
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Request, Response, Query, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
+from app.database.database import AsyncSessionLocal, get_db
 from app.models.hl7_models import (
     HL7UploadResponse, 
     ProcessingStatusResponse, 
+    BulkStatusRequest,
+    BulkStatusResponse,
     ProcessingStatus,
-    MessageType
+    MessageType,
+    IngestJobResponse
 )
 from app.services.hl7_processor import HL7Processor
 from app.services.mastra_service import MastraService
+from app.services.ingest_jobs import ingest_jobs
+from app.services.processing_spans import message_context, span_recorder
+from app.services.status_events import (
+    CONVERTING_STEP,
+    SAVING_STEP,
+    TERMINAL_STATUSES,
+    StatusSubscription,
+    status_broadcaster
+)
 from app.utils.file_handler import file_handler
+from app.utils.hl7_bytes import split_raw_messages
+from app.utils.hl7_stream import iter_upload_messages, split_hl7_messages
+from app.utils.keyset_cursor import decode_cursor, encode_cursor
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# (filename, decoded content, raw header fields already located from bytes or None)
+PreparedMessage = Tuple[str, str, Optional[Dict[str, Optional[str]]]]
+
 router = APIRouter()
 hl7_processor = HL7Processor()
 mastra_service = MastraService()
@@ -45,24 +75,32 @@ async def upload_hl7_file(
         )
     
     try:
-        # Read file content
-        content = await file.read()
+        # Generate message ID
+        message_id = uuid.uuid4()
         
-        # Decode content
-        try:
-            hl7_content = content.decode('utf-8')
-        except UnicodeDecodeError:
-            hl7_content = content.decode('latin-1')
+        # Read the file in chunks, unwrapping any batch envelope
+        messages = []
+        with span_recorder.span(message_id, "decode"):
+            async for message in iter_upload_messages(file):
+                messages.append(message)
+                if len(messages) > 1:
+                    break
         
         # Validate HL7 format
-        if not file_handler.is_valid_hl7_file(hl7_content):
+        with span_recorder.span(message_id, "validate"):
+            valid = bool(messages) and file_handler.is_valid_hl7_file(messages[0])
+        if not valid:
             raise HTTPException(
                 status_code=400, 
                 detail="Invalid HL7 file format. File must start with MSH segment."
             )
         
-        # Generate message ID
-        message_id = uuid.uuid4()
+        hl7_content = messages[0]
+        result_message = f"File '{file.filename}' uploaded successfully. Processing started."
+        if len(messages) > 1:
+            # Only the first message is stored; /upload/hl7/messages stores each one
+            logger.warning(f"File {file.filename} contains multiple HL7 messages; only the first was stored")
+            result_message += " The file contains multiple HL7 messages and only the first was stored; upload it to /upload/hl7/messages to store all of them."
         
         # Extract basic info from HL7
         message_info = hl7_processor.extract_basic_info(hl7_content)
@@ -89,9 +127,11 @@ async def upload_hl7_file(
             message_id=message_id,
             filename=file.filename,
             status=ProcessingStatus.PENDING,
-            message=f"File '{file.filename}' uploaded successfully. Processing started."
+            message=result_message
         )
         
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=400,
@@ -103,6 +143,126 @@ async def upload_hl7_file(
             detail=f"Error processing upload: {str(e)}"
         )
 
+@router.post("/upload/hl7/messages", response_model=List[HL7UploadResponse])
+async def upload_hl7_batch_file(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="HL7 batch file (FHS/BHS envelope) or concatenated messages"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a file containing many HL7 messages
+    
+    The file is read in chunks and split on batch envelopes and MSH segments;
+    each message is stored as its own row. Rows are inserted in chunks and
+    only the IDs of saved messages are kept, so message content is not held
+    for the whole file; processing loads it back in chunks. The response
+    still lists every message. The X-Batch-ID response header can be passed
+    as job_id to /upload/status/bulk. If a chunk cannot be saved, the chunks
+    already committed are still processed and the response lists the
+    unsaved messages as failed.
+    """
+    filename = file.filename or "batch_file.hl7"
+    batch_id = uuid.uuid4()
+    responses = []
+    pending = []
+    queued = []
+    # Time spent reading, splitting and validating the messages in pending
+    decode_started_at = datetime.utcnow()
+    decode_elapsed = 0.0
+    
+    async def flush():
+        nonlocal decode_started_at, decode_elapsed
+        span_recorder.record([message_id for message_id, _, _ in pending], "decode_validate", decode_started_at, decode_elapsed)
+        decode_started_at = datetime.utcnow()
+        decode_elapsed = 0.0
+        records = await run_in_threadpool(
+            hl7_processor.build_message_records,
+            message_ids=[message_id for message_id, _, _ in pending],
+            filenames=[message_filename for _, message_filename, _ in pending],
+            contents=[message for _, _, message in pending],
+            ingest_job_id=batch_id
+        )
+        await hl7_processor.save_messages_bulk(db, records)
+        queued.extend(record["id"] for record in records)
+        pending.clear()
+    
+    finished_reading = False
+    try:
+        index = 0
+        mark = time.perf_counter()
+        async for message in iter_upload_messages(file):
+            index += 1
+            message_filename = f"{filename}#{index}"
+            
+            if not file_handler.is_valid_hl7_file(message):
+                responses.append(HL7UploadResponse(
+                    message_id=uuid.uuid4(),
+                    filename=message_filename,
+                    status=ProcessingStatus.FAILED,
+                    message=f"Invalid HL7 message #{index} in file {filename}"
+                ))
+                continue
+            
+            message_id = uuid.uuid4()
+            pending.append((message_id, message_filename, message))
+            responses.append(HL7UploadResponse(
+                message_id=message_id,
+                filename=message_filename,
+                status=ProcessingStatus.PENDING,
+                message="Message queued for processing"
+            ))
+            decode_elapsed += time.perf_counter() - mark
+            
+            if len(pending) >= settings.BULK_INSERT_CHUNK_SIZE:
+                await flush()
+            mark = time.perf_counter()
+        finished_reading = True
+        
+        await flush()
+        
+    except Exception as e:
+        if not queued:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error processing batch file: {str(e)}"
+            )
+        
+        # Earlier chunks are committed: queue them and report the rest as failed instead of a 500
+        logger.error(f"Error processing batch file {filename} after {len(queued)} saved messages: {e}")
+        unsaved = {message_id for message_id, _, _ in pending}
+        pending.clear()
+        responses = [
+            HL7UploadResponse(
+                message_id=entry.message_id,
+                filename=entry.filename,
+                status=ProcessingStatus.FAILED,
+                message=f"Message not saved: {str(e)}"
+            ) if entry.message_id in unsaved else entry
+            for entry in responses
+        ]
+        if not finished_reading:
+            responses.append(HL7UploadResponse(
+                message_id=uuid.uuid4(),
+                filename=f"{filename}#{index + 1}",
+                status=ProcessingStatus.FAILED,
+                message=f"Stopped reading {filename} after message #{index}; later messages were not saved"
+            ))
+    
+    if not responses:
+        raise HTTPException(status_code=400, detail="No HL7 messages found in file")
+    
+    response.headers["X-Batch-ID"] = str(batch_id)
+    
+    if queued:
+        background_tasks.add_task(
+            process_stored_hl7_messages,
+            message_ids=queued,
+            db_session=db
+        )
+    
+    return responses
+
 @router.post("/upload/hl7/text", response_model=HL7UploadResponse)
 async def upload_hl7_text(
     background_tasks: BackgroundTasks,
@@ -113,17 +273,30 @@ async def upload_hl7_text(
     """
     Upload HL7 content as text
     """
+    # Generate message ID
+    message_id = uuid.uuid4()
+    
+    # Unwrap any batch envelope
+    with span_recorder.span(message_id, "decode"):
+        messages = split_hl7_messages(hl7_content)
+    
     # Validate HL7 format
-    if not file_handler.is_valid_hl7_file(hl7_content):
+    with span_recorder.span(message_id, "validate"):
+        valid = bool(messages) and file_handler.is_valid_hl7_file(messages[0])
+    if not valid:
         raise HTTPException(
             status_code=400,
             detail="Invalid HL7 format. Content must start with MSH segment."
         )
     
+    hl7_content = messages[0]
+    result_message = "HL7 content uploaded successfully. Processing started."
+    if len(messages) > 1:
+        # Only the first message is stored; /upload/hl7/messages stores each one
+        logger.warning(f"Content {filename} contains multiple HL7 messages; only the first was stored")
+        result_message += " The content contains multiple HL7 messages and only the first was stored; upload it to /upload/hl7/messages to store all of them."
+    
     try:
-        # Generate message ID
-        message_id = uuid.uuid4()
-        
         # Extract basic info from HL7
         message_info = hl7_processor.extract_basic_info(hl7_content)
         
@@ -149,7 +322,7 @@ async def upload_hl7_text(
             message_id=message_id,
             filename=filename,
             status=ProcessingStatus.PENDING,
-            message="HL7 content uploaded successfully. Processing started."
+            message=result_message
         )
         
     except Exception as e:
@@ -158,6 +331,232 @@ async def upload_hl7_text(
             detail=f"Error processing HL7 text: {str(e)}"
         )
 
+async def _current_statuses(message_ids: Set[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, Any]]:
+    """JSON-ready current statuses, read on a short-lived session"""
+    async with AsyncSessionLocal() as db:
+        statuses = await hl7_processor.get_processing_statuses(db, list(message_ids))
+    return {message_id: jsonable_encoder(status) for message_id, status in statuses.items()}
+
+async def _status_event_stream(message_ids: Set[uuid.UUID]):
+    """
+    SSE frames: current status of each message, then every change until all have finished
+    """
+    def frame(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    pending = set(message_ids)
+    try:
+        # Subscribe before reading current statuses so no change slips in between
+        async with status_broadcaster.subscribe(pending) as subscription:
+            statuses = await _current_statuses(pending)
+            for message_id in pending - statuses.keys():
+                yield frame("not_found", {"message_id": str(message_id)})
+            pending &= statuses.keys()
+            events = list(statuses.values())
+            
+            while True:
+                for event in events:
+                    message_id = uuid.UUID(event["message_id"])
+                    if message_id not in pending:
+                        continue
+                    yield frame("status", event)
+                    if event["status"] in TERMINAL_STATUSES:
+                        pending.discard(message_id)
+                        subscription.remove([message_id])
+                
+                if not pending:
+                    break
+                
+                try:
+                    event = await subscription.get(settings.STATUS_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    events = []
+                    continue
+                
+                if event is None:
+                    # Listener reconnected or the queue overflowed; changes may have been missed
+                    await status_broadcaster.reconnect()
+                    events = list((await _current_statuses(pending)).values())
+                else:
+                    events = [event]
+            
+            yield frame("done", {})
+    
+    except Exception as e:
+        logger.error(f"Error streaming processing status: {e}")
+        yield frame("error", {"detail": f"Error streaming status: {str(e)}"})
+
+@router.get("/upload/status/stream")
+async def stream_processing_status(
+    message_ids: List[uuid.UUID] = Query(..., description="Messages to follow (repeat the parameter)")
+):
+    """
+    Stream processing status for many messages as Server-Sent Events
+    
+    Sends a "status" event with the current state of each message, then one
+    per committed change (pushed through Postgres LISTEN/NOTIFY, no polling),
+    "not_found" for unknown IDs and "done" once every message has finished.
+    """
+    if len(message_ids) > settings.STATUS_STREAM_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {settings.STATUS_STREAM_MAX_IDS} messages per stream; use the status WebSocket for more"
+        )
+    
+    return StreamingResponse(
+        _status_event_stream(set(message_ids)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/upload/status/bulk", response_model=BulkStatusResponse)
+async def get_processing_statuses_bulk(
+    request: BulkStatusRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get processing status for many messages with one query
+    
+    Select messages by message_ids or by job_id (the X-Batch-ID of a batch
+    upload or the job_id of an archive import). Pass the returned as_of as
+    since on the next poll to receive only statuses changed meanwhile; large
+    jobs are paged with next_cursor, keeping the first page's as_of.
+    """
+    if (request.message_ids is None) == (request.job_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of message_ids or job_id")
+    
+    if request.message_ids is not None and len(request.message_ids) > settings.STATUS_BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many message IDs. Maximum {settings.STATUS_BULK_MAX_IDS} per request."
+        )
+    
+    after = None
+    if request.cursor:
+        try:
+            after = decode_cursor(request.cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        # Taken before the query, so a change committed while it runs is returned again rather than lost
+        as_of = datetime.utcnow() - timedelta(seconds=settings.STATUS_BULK_SINCE_OVERLAP)
+        
+        statuses = await hl7_processor.get_processing_statuses(
+            db,
+            message_ids=request.message_ids,
+            ingest_job_id=request.job_id,
+            since=request.since,
+            after=after,
+            limit=settings.STATUS_BULK_MAX_IDS + 1
+        )
+        
+        rows = list(statuses.values())
+        has_next = len(rows) > settings.STATUS_BULK_MAX_IDS
+        rows = rows[:settings.STATUS_BULK_MAX_IDS]
+        
+        next_cursor = None
+        if has_next and rows[-1]["updated_at"]:
+            next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["message_id"])
+        
+        not_found = []
+        if request.message_ids is not None and request.since is None:
+            # The ID list fits in one page, so anything missing from it does not exist
+            not_found = list(dict.fromkeys(message_id for message_id in request.message_ids if message_id not in statuses))
+        
+        return BulkStatusResponse(
+            statuses=[ProcessingStatusResponse(**row) for row in rows],
+            not_found=not_found,
+            as_of=as_of,
+            next_cursor=next_cursor
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving statuses: {str(e)}"
+        )
+
+@router.websocket("/upload/status/ws")
+async def status_websocket(websocket: WebSocket):
+    """
+    Follow processing status for many messages over one WebSocket
+    
+    Clients send {"action": "subscribe" | "unsubscribe", "message_ids": [...]}.
+    Each subscribe is answered with the current status of those messages,
+    then {"type": "status", ...} is pushed for every committed change.
+    """
+    await websocket.accept()
+    
+    async def current_statuses(message_ids: Set[uuid.UUID]) -> List[Dict[str, Any]]:
+        statuses = await _current_statuses(message_ids)
+        for message_id in message_ids - statuses.keys():
+            await websocket.send_json({"type": "not_found", "message_id": str(message_id)})
+        return list(statuses.values())
+    
+    async def read_commands(subscription: StatusSubscription):
+        while True:
+            command = await websocket.receive_json()
+            try:
+                action = command["action"]
+                message_ids = {uuid.UUID(str(message_id)) for message_id in command["message_ids"]}
+                if action not in ("subscribe", "unsubscribe"):
+                    raise ValueError(f"Unknown action {action!r}")
+            except (KeyError, TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid command: {str(e)}"})
+                continue
+            
+            if action == "unsubscribe":
+                subscription.remove(message_ids)
+            elif len(subscription.message_ids | message_ids) > settings.STATUS_WS_MAX_IDS:
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"Maximum {settings.STATUS_WS_MAX_IDS} messages per connection"
+                })
+            else:
+                subscription.add(message_ids)
+                # Queued so they are not sent after newer events already pushed
+                for status in await current_statuses(message_ids):
+                    subscription.put(status)
+    
+    async def push_events(subscription: StatusSubscription):
+        while True:
+            try:
+                event = await subscription.get(settings.STATUS_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                continue
+            if event is None:
+                # Listener reconnected or the queue overflowed; changes may have been missed.
+                # Sent directly, since re-queueing more statuses than fit would overflow again
+                await status_broadcaster.reconnect()
+                for status in await current_statuses(set(subscription.message_ids)):
+                    await websocket.send_json({"type": "status", **status})
+            elif uuid.UUID(event["message_id"]) in subscription.message_ids:
+                await websocket.send_json({"type": "status", **event})
+    
+    try:
+        async with status_broadcaster.subscribe() as subscription:
+            tasks = [
+                asyncio.ensure_future(read_commands(subscription)),
+                asyncio.ensure_future(push_events(subscription))
+            ]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in status WebSocket: {e}")
+        await websocket.close(code=1011)
+
 @router.get("/upload/status/{message_id}", response_model=ProcessingStatusResponse)
 async def get_processing_status(
     message_id: uuid.UUID,
@@ -185,83 +584,336 @@ async def get_processing_status(
             detail=f"Error retrieving status: {str(e)}"
         )
 
-@router.post("/upload/batch", response_model=List[HL7UploadResponse])
+@router.post(
+    "/upload/batch",
+    response_model=List[HL7UploadResponse],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["files"],
+                        "properties": {
+                            "files": {
+                                "type": "array",
+                                "items": {"type": "string", "format": "binary"},
+                                "description": "Multiple HL7 files to upload"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+)
 async def upload_multiple_hl7_files(
+    request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
-    files: List[UploadFile] = File(..., description="Multiple HL7 files to upload"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Upload multiple HL7 files for batch processing
+    
+    Files are read concurrently, parsed off the event loop, inserted with
+    multi-row INSERTs in a single transaction and handed to one background
+    task for processing. The X-Batch-ID response header can be passed as
+    job_id to /upload/status/bulk.
     """
-    if len(files) > 10:  # Limit batch size
+    # Parse the form ourselves: the default multipart limit is 1000 files
+    form = await request.form(
+        max_files=settings.MAX_BATCH_FILES,
+        max_fields=settings.MAX_BATCH_FILES
+    )
+    files = [item for item in form.getlist("files") if isinstance(item, StarletteUploadFile)]
+    
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    
+    if len(files) > settings.MAX_BATCH_FILES:  # Limit batch size
         raise HTTPException(
             status_code=400,
-            detail="Too many files. Maximum 10 files per batch upload."
+            detail=f"Too many files. Maximum {settings.MAX_BATCH_FILES} files per batch upload."
         )
     
+    try:
+        contents = await asyncio.gather(*(file.read() for file in files))
+    finally:
+        await form.close()
+    
+    batch_id = uuid.uuid4()
+    
+    def prepare() -> Tuple[List[Tuple[str, List[PreparedMessage], Optional[str]]], List[Dict[str, Any]]]:
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        prepared_files = [
+            _prepare_batch_file(file.filename or f"batch_file_{index}.hl7", content)
+            for index, (file, content) in enumerate(zip(files, contents))
+        ]
+        elapsed = time.perf_counter() - started
+        messages = [message for _, file_messages, _ in prepared_files for message in file_messages]
+        records = _build_records(messages, batch_id)
+        # Splitting, decoding and validation are one pass over the bytes; IDs exist only once records are built
+        span_recorder.record([record["id"] for record in records], "decode_validate", started_at, elapsed)
+        return prepared_files, records
+    
+    # Splitting and header extraction are CPU-bound; run them in one pass off the event loop
+    prepared, records = await run_in_threadpool(prepare)
+    
     responses = []
+    queued = []
+    file_records = iter(records)
     
-    for file in files:
-        try:
-            # Process each file similar to single upload
-            content = await file.read()
-            
-            try:
-                hl7_content = content.decode('utf-8')
-            except UnicodeDecodeError:
-                hl7_content = content.decode('latin-1')
-            
-            if not file_handler.is_valid_hl7_file(hl7_content):
-                responses.append(HL7UploadResponse(
-                    message_id=uuid.uuid4(),
-                    filename=file.filename or "unknown",
-                    status=ProcessingStatus.FAILED,
-                    message=f"Invalid HL7 format in file {file.filename}"
-                ))
-                continue
-            
-            # Generate message ID
-            message_id = uuid.uuid4()
-            
-            # Extract basic info
-            message_info = hl7_processor.extract_basic_info(hl7_content)
-            
-            # Save to database
-            await hl7_processor.save_message_to_db(
-                db=db,
-                message_id=message_id,
-                filename=file.filename or f"batch_file_{len(responses)}.hl7",
-                content=hl7_content,
-                message_type=message_info.get('message_type', 'Unknown'),
-                patient_id=message_info.get('patient_id')
-            )
-            
-            # Schedule processing
-            background_tasks.add_task(
-                process_hl7_message,
-                message_id=message_id,
-                hl7_content=hl7_content,
-                db_session=db
-            )
-            
-            responses.append(HL7UploadResponse(
-                message_id=message_id,
-                filename=file.filename or f"batch_file_{len(responses)}.hl7",
-                status=ProcessingStatus.PENDING,
-                message="File queued for processing"
-            ))
-            
-        except Exception as e:
+    for filename, file_messages, error in prepared:
+        if error:
             responses.append(HL7UploadResponse(
                 message_id=uuid.uuid4(),
-                filename=file.filename or "unknown",
+                filename=filename,
                 status=ProcessingStatus.FAILED,
-                message=f"Error processing file: {str(e)}"
+                message=error
+            ))
+            continue
+        
+        for record in itertools.islice(file_records, len(file_messages)):
+            queued.append((record["id"], record["raw_hl7_content"]))
+            responses.append(HL7UploadResponse(
+                message_id=record["id"],
+                filename=record["original_filename"],
+                status=ProcessingStatus.PENDING,
+                message="File queued for processing"
             ))
     
+    try:
+        await hl7_processor.save_messages_bulk(db, records)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error saving batch upload: {str(e)}"
+        )
+    
+    response.headers["X-Batch-ID"] = str(batch_id)
+    
+    # Schedule processing for the whole batch at once
+    if queued:
+        background_tasks.add_task(
+            process_hl7_messages_batch,
+            messages=queued,
+            db_session=db
+        )
+    
     return responses
 
+def _prepare_batch_file(filename: str, content: Union[bytes, str]) -> Tuple[str, List[PreparedMessage], Optional[str]]:
+    """
+    Split one batch file into messages ready for record building
+    
+    Raw bytes are split and indexed without decoding the whole file; each
+    message is decoded on its own with its MSH-18 charset and its header fields
+    are read from the byte index. Batch envelopes and concatenated messages
+    yield one entry per message.
+    Returns (filename, messages, error); messages is empty when error is set.
+    """
+    try:
+        if isinstance(content, str):
+            messages = split_hl7_messages(content)
+            if not messages or not all(file_handler.is_valid_hl7_file(message) for message in messages):
+                return filename, [], f"Invalid HL7 format in file {filename}"
+            prepared = [(message, None) for message in messages]
+        else:
+            raw_messages = split_raw_messages(content)
+            if not raw_messages or not all(message.is_valid() for message in raw_messages):
+                return filename, [], f"Invalid HL7 format in file {filename}"
+            prepared = [(message.decode(), message.header_fields()) for message in raw_messages]
+        
+        return filename, [
+            (filename if len(prepared) == 1 else f"{filename}#{index}", message, header_fields)
+            for index, (message, header_fields) in enumerate(prepared, start=1)
+        ], None
+        
+    except Exception as e:
+        return filename, [], f"Error processing file: {str(e)}"
+
+def _build_records(messages: List[PreparedMessage], ingest_job_id: Optional[uuid.UUID] = None) -> List[Dict[str, Any]]:
+    """
+    Assign IDs and build rows for prepared messages with one columnar extraction
+    """
+    return hl7_processor.build_message_records(
+        message_ids=[uuid.uuid4() for _ in messages],
+        filenames=[filename for filename, _, _ in messages],
+        contents=[content for _, content, _ in messages],
+        header_fields=[header_fields for _, _, header_fields in messages],
+        ingest_job_id=ingest_job_id
+    )
+
+@router.post("/upload/archive", response_model=IngestJobResponse, status_code=202)
+async def upload_hl7_archive(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="Zip, tar(.gz) or NDJSON archive of HL7 messages"),
+    process: bool = Query(False, description="Queue imported messages for Mastra processing"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import an archive of HL7 files as a background job
+    
+    Entries are read one at a time without extracting to disk and written to
+    the database with COPY in chunks. Poll /upload/jobs/{job_id} for progress.
+    """
+    filename = file.filename or "archive"
+    
+    # The upload is closed once the response is sent, so keep our own copy for the job
+    archive = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_CHUNK_SIZE * 8)
+    size = 0
+    try:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.MAX_ARCHIVE_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Archive too large. Maximum size is {settings.MAX_ARCHIVE_SIZE} bytes"
+                )
+            archive.write(chunk)
+        archive.seek(0)
+    except BaseException:
+        archive.close()
+        raise
+    
+    job_id = ingest_jobs.create_job(filename)
+    
+    background_tasks.add_task(
+        import_hl7_archive,
+        job_id=job_id,
+        archive=archive,
+        filename=filename,
+        process=process,
+        db_session=db
+    )
+    
+    return IngestJobResponse(**ingest_jobs.get_job(job_id))
+
+@router.get("/upload/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job_status(job_id: uuid.UUID):
+    """
+    Get progress for a bulk ingestion job
+    """
+    job = ingest_jobs.get_job(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID {job_id} not found"
+        )
+    
+    return IngestJobResponse(**job)
+
+def _read_archive_chunk(
+    entries: Iterator[Tuple[str, Optional[Union[bytes, str]], Optional[str]]],
+    limit: int,
+    job_id: uuid.UUID
+) -> Tuple[List[Dict[str, Any]], List[str], int, bool]:
+    """
+    Pull up to limit valid message records from an archive entry iterator
+    
+    Records are tagged with job_id. Returns (records, errors, entries_read, exhausted).
+    """
+    messages = []
+    errors = []
+    entries_read = 0
+    started_at = datetime.utcnow()
+    elapsed = 0.0
+    
+    def build() -> List[Dict[str, Any]]:
+        records = _build_records(messages, job_id)
+        span_recorder.record([record["id"] for record in records], "decode_validate", started_at, elapsed)
+        return records
+    
+    for entry_name, content, error in entries:
+        entries_read += 1
+        
+        if error:
+            errors.append(f"{entry_name}: {error}")
+            continue
+        
+        started = time.perf_counter()
+        _, entry_messages, error = _prepare_batch_file(entry_name, content)
+        elapsed += time.perf_counter() - started
+        if error:
+            errors.append(f"{entry_name}: {error}")
+            continue
+        
+        messages.extend(entry_messages)
+        if len(messages) >= limit:
+            return build(), errors, entries_read, False
+    
+    return build(), errors, entries_read, True
+
+async def import_hl7_archive(
+    job_id: uuid.UUID,
+    archive: BinaryIO,
+    filename: str,
+    process: bool,
+    db_session: AsyncSession
+):
+    """
+    Background task that streams archive entries into the database with COPY
+    """
+    ingest_jobs.update_job(job_id, status=ProcessingStatus.PROCESSING.value)
+    chunk_size = max(1, settings.ARCHIVE_COPY_CHUNK_SIZE)
+    
+    try:
+        entries = file_handler.iter_archive_entries(archive, filename)
+        exhausted = False
+        
+        while not exhausted:
+            # Decompression and parsing are blocking; do them off the event loop
+            records, errors, entries_read, exhausted = await run_in_threadpool(
+                _read_archive_chunk, entries, chunk_size, job_id
+            )
+            
+            for error in errors:
+                ingest_jobs.add_error(job_id, error)
+            
+            try:
+                await hl7_processor.copy_messages_to_db(db_session, records)
+            except Exception as e:
+                ingest_jobs.add_error(job_id, f"Failed to import {len(records)} messages: {str(e)}")
+                ingest_jobs.update_job(
+                    job_id,
+                    add_entries_processed=entries_read,
+                    add_messages_failed=len(errors) + len(records)
+                )
+                continue
+            
+            ingest_jobs.update_job(
+                job_id,
+                add_entries_processed=entries_read,
+                add_messages_imported=len(records),
+                add_messages_failed=len(errors)
+            )
+            
+            if process and records:
+                await process_hl7_messages_batch(
+                    messages=[(record["id"], record["raw_hl7_content"]) for record in records],
+                    db_session=db_session
+                )
+        
+        job = ingest_jobs.get_job(job_id)
+        if job["messages_failed"] and job["messages_imported"]:
+            status = ProcessingStatus.PARTIAL
+        elif job["messages_failed"]:
+            status = ProcessingStatus.FAILED
+        else:
+            status = ProcessingStatus.COMPLETED
+        ingest_jobs.update_job(job_id, status=status.value)
+        
+    except Exception as e:
+        logger.error(f"Error importing archive {filename}: {e}")
+        ingest_jobs.add_error(job_id, f"Archive import failed: {str(e)}")
+        ingest_jobs.update_job(job_id, status=ProcessingStatus.FAILED.value)
+    finally:
+        archive.close()
+
 async def process_hl7_message(
     message_id: uuid.UUID,
     hl7_content: str,
@@ -273,13 +925,17 @@ async def process_hl7_message(
     try:
         # Update status to processing
         await hl7_processor.update_processing_status(
-            db_session, message_id, ProcessingStatus.PROCESSING
+            db_session, message_id, ProcessingStatus.PROCESSING, *CONVERTING_STEP
         )
         
         # Process with Mastra agents
-        results = await mastra_service.process_hl7_message(hl7_content)
+        with message_context(message_id), span_recorder.span(message_id, "convert", agent_name="Mastra"):
+            results = await mastra_service.process_hl7_message(hl7_content)
         
         # Save results to database
+        await hl7_processor.update_processing_status(
+            db_session, message_id, ProcessingStatus.PROCESSING, *SAVING_STEP
+        )
         await hl7_processor.save_processed_formats(
             db_session,
             message_id,
@@ -299,5 +955,79 @@ async def process_hl7_message(
             db_session, message_id, str(e)
         )
         await hl7_processor.update_processing_status(
-            db_session, message_id, ProcessingStatus.FAILED
-        )
\ No newline at end of file
+            db_session, message_id, ProcessingStatus.FAILED, error_message=str(e)
+        )
+
+async def process_hl7_messages_batch(
+    messages: List[Tuple[uuid.UUID, str]],
+    db_session: AsyncSession
+):
+    """
+    Background task to process a batch of HL7 messages with Mastra agents
+    
+    Mastra calls run concurrently up to MAX_CONCURRENT_PROCESSES; database
+    writes are serialized because they share the request's session.
+    """
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_PROCESSES)
+    db_lock = asyncio.Lock()
+    
+    async def process_one(message_id: uuid.UUID, hl7_content: str):
+        async with semaphore:
+            try:
+                async with db_lock:
+                    await hl7_processor.update_processing_status(
+                        db_session, message_id, ProcessingStatus.PROCESSING, *CONVERTING_STEP
+                    )
+                
+                with message_context(message_id), span_recorder.span(message_id, "convert", agent_name="Mastra"):
+                    results = await mastra_service.process_hl7_message(hl7_content)
+                
+                async with db_lock:
+                    await hl7_processor.update_processing_status(
+                        db_session, message_id, ProcessingStatus.PROCESSING, *SAVING_STEP
+                    )
+                    await hl7_processor.save_processed_formats(
+                        db_session,
+                        message_id,
+                        xml_content=results.get('xml'),
+                        json_content=results.get('json'),
+                        pdf_content=results.get('pdf')
+                    )
+                    await hl7_processor.update_processing_status(
+                        db_session, message_id, ProcessingStatus.COMPLETED
+                    )
+                
+            except Exception as e:
+                async with db_lock:
+                    await hl7_processor.log_processing_error(
+                        db_session, message_id, str(e)
+                    )
+                    await hl7_processor.update_processing_status(
+                        db_session, message_id, ProcessingStatus.FAILED, error_message=str(e)
+                    )
+    
+    await asyncio.gather(*(
+        process_one(message_id, hl7_content) for message_id, hl7_content in messages
+    ))
+
+async def process_stored_hl7_messages(
+    message_ids: List[uuid.UUID],
+    db_session: AsyncSession
+):
+    """
+    Background task to process saved HL7 messages by ID
+    
+    Raw content is loaded and processed BULK_INSERT_CHUNK_SIZE messages at a
+    time, so only one chunk of content is in memory.
+    """
+    chunk_size = max(1, settings.BULK_INSERT_CHUNK_SIZE)
+    
+    for start in range(0, len(message_ids), chunk_size):
+        chunk = message_ids[start:start + chunk_size]
+        try:
+            messages = await hl7_processor.get_raw_contents(db_session, chunk)
+        except Exception as e:
+            logger.error(f"Error loading {len(chunk)} saved messages for processing: {e}")
+            await db_session.rollback()
+            continue
+        await process_hl7_messages_batch(messages=messages, db_session=db_session)
@@ -3,81 +3,104 @@ HL7 Processing Service
 Handles HL7 parsing, database operations, and coordination
 """
 
+import json
+import time
 import uuid
 import re
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Sequence, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, case, func, any_, bindparam, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.database.models import HL7Message, ProcessingLog
+from app.config import settings
+from app.database.models import HL7Message, Observation, Patient, ProcessingLog
 from app.models.hl7_models import ProcessingStatus, MessageType
-from app.utils.data_escape import hl7_processor as data_processor
+from app.services.metrics import MESSAGES_PROCESSED, PARSE_DURATION, PARSED_DATA_LOOKUPS, count_ingested
+from app.services.processing_spans import span_recorder
+from app.services.status_events import STATUS_CHANNEL, TERMINAL_STATUSES, status_payload
+from app.utils.data_escape import HL7DataProcessor, hl7_processor as data_processor, processor_for
+from app.utils.hl7_columns import DEFAULT_ENCODING_CHARS, HEADER_FIELD_PATHS, header_columns, scan_header_fields, timestamp_component
+from app.utils.hl7_datetime import parse_hl7_date, parse_hl7_timestamp
+from app.utils.hl7_message import HL7MessageView
+from app.utils.hl7_parsed import is_current, parse_hl7_data
 import logging
 
 logger = logging.getLogger(__name__)
 
+# OBX.5 values stored as numeric_value: plain numbers, optionally with a comparator (e.g. "<0.5")
+NUMERIC_VALUE_PATTERN = re.compile(r"^(?:[<>]=?|=)?\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))$")
+
+# patients columns taken from the newest message that carries a value, keyed by hl7_messages column
+PATIENT_DEMOGRAPHIC_COLUMNS = {
+    "first_name": "patient_first_name",
+    "last_name": "patient_last_name",
+    "date_of_birth": "patient_dob",
+    "gender": "patient_gender",
+}
+
+# asyncpg binds at most 32767 parameters per statement, one per column of every row
+POSTGRES_MAX_BIND_PARAMETERS = 32767
+
 class HL7Processor:
     """Service for processing HL7 messages and managing database operations"""
     
     def __init__(self):
         pass
     
-    def extract_basic_info(self, hl7_content: str) -> Dict[str, Any]:
+    def extract_basic_info(self, hl7_content: Union[str, HL7MessageView]) -> Dict[str, Any]:
         """
         Extract basic information from HL7 message without full parsing
         """
         try:
-            lines = hl7_content.strip().split('\n')
-            msh_line = lines[0] if lines else ""
+            message = self._as_message(hl7_content)
+            header = message.header
             
-            if not msh_line.startswith("MSH"):
+            if header is None:
                 return {"message_type": "Unknown", "patient_id": None}
             
-            # Extract encoding characters
-            data_processor.extract_encoding_chars(msh_line)
-            
-            # Extract message type from MSH.9
-            msh_fields = msh_line.split(data_processor.field_separator)
-            message_type = "Unknown"
-            trigger_event = None
-            
-            if len(msh_fields) > 8:
-                message_type_field = msh_fields[8]  # MSH.9
-                components = data_processor.split_field_components(message_type_field)
-                if components:
-                    message_type = components[0]
-                if len(components) > 1:
-                    trigger_event = components[1]
-            
-            # Try to find patient ID from PID segment
-            patient_id = None
-            for line in lines:
-                if line.startswith("PID"):
-                    patient_id = self._extract_patient_id_from_pid(line)
-                    break
-            
-            return {
-                "message_type": message_type,
-                "trigger_event": trigger_event,
-                "patient_id": patient_id
-            }
+            return self._basic_info_from_fields(message["MSH-9"], message["PID-3"], self._data_processor(message))
             
         except Exception as e:
             logger.error(f"Error extracting basic info from HL7: {e}")
             return {"message_type": "Unknown", "patient_id": None}
     
-    def _extract_patient_id_from_pid(self, pid_line: str) -> Optional[str]:
-        """Extract patient ID from PID segment"""
-        try:
-            fields = pid_line.split(data_processor.field_separator)
-            if len(fields) > 3:
-                # PID.3 contains patient identifiers
-                return data_processor.extract_identifier(fields[3])
-            return None
-        except Exception:
-            return None
+    def _as_message(self, hl7_content: Union[str, HL7MessageView]) -> HL7MessageView:
+        """Wrap raw content so one parse can be shared by several extractors"""
+        if isinstance(hl7_content, HL7MessageView):
+            return hl7_content
+        return HL7MessageView(hl7_content)
+    
+    def _data_processor(self, message: HL7MessageView) -> HL7DataProcessor:
+        """Field processor for the message's encoding characters (defaults without an MSH header)"""
+        header = message.header
+        return processor_for(header.text[4:8] if header is not None else DEFAULT_ENCODING_CHARS)
+    
+    def _basic_info_from_fields(
+        self,
+        message_type_field: Optional[str],
+        patient_id_field: Optional[str],
+        processor: HL7DataProcessor = data_processor
+    ) -> Dict[str, Any]:
+        """
+        Build basic info from raw MSH.9 and PID.3 field values
+        """
+        message_type = "Unknown"
+        trigger_event = None
+        
+        if message_type_field is not None:
+            components = processor.split_field_components(message_type_field)
+            if components:
+                message_type = components[0]
+            if len(components) > 1:
+                trigger_event = components[1]
+        
+        return {
+            "message_type": message_type,
+            "trigger_event": trigger_event,
+            "patient_id": processor.extract_identifier(patient_id_field) if patient_id_field else None
+        }
     
     async def save_message_to_db(
         self,
@@ -92,30 +115,23 @@ class HL7Processor:
         Save HL7 message to database
         """
         try:
-            # Parse additional patient info if available
-            patient_info = self._extract_patient_demographics(content)
-            visit_info = self._extract_visit_info(content)
-            
-            db_message = HL7Message(
-                id=message_id,
-                original_filename=filename,
-                raw_hl7_content=content,
-                message_type=message_type,
-                patient_id=patient_id,
-                processing_status=ProcessingStatus.PENDING.value,
-                processed_at=datetime.utcnow(),
-                patient_first_name=patient_info.get("first_name"),
-                patient_last_name=patient_info.get("last_name"),
-                patient_dob=patient_info.get("date_of_birth"),
-                patient_gender=patient_info.get("gender"),
-                visit_number=visit_info.get("visit_number"),
-                admission_date=visit_info.get("admission_date"),
-                discharge_date=visit_info.get("discharge_date")
-            )
+            with span_recorder.span(message_id, "parse"):
+                record = self.build_message_record(
+                    message_id=message_id,
+                    filename=filename,
+                    content=content,
+                    message_info={"message_type": message_type, "patient_id": patient_id}
+                )
             
-            db.add(db_message)
-            await db.commit()
-            await db.refresh(db_message)
+            with span_recorder.span(message_id, "db_insert"):
+                await self.upsert_patients(db, [record])
+                db_message = HL7Message(**record)
+                
+                db.add(db_message)
+                db.add_all(Observation(**row) for row in self.build_observation_records([record]))
+                await db.commit()
+                await db.refresh(db_message)
+            count_ingested([record])
             
             return db_message
             
@@ -128,6 +144,388 @@ class HL7Processor:
             logger.error(f"Error saving message to database: {e}")
             raise
     
+    def build_message_record(
+        self,
+        message_id: uuid.UUID,
+        filename: str,
+        content: str,
+        message_info: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the hl7_messages column values for a message
+        
+        Pure CPU work with no database access, so callers can prepare many
+        records off the event loop and insert them together.
+        """
+        with PARSE_DURATION.labels("single").time():
+            message = HL7MessageView(content)
+            if message_info is None:
+                message_info = self.extract_basic_info(message)
+            
+            # Parse additional patient info if available
+            patient_info = self._extract_patient_demographics(message)
+            visit_info = self._extract_visit_info(message)
+            
+            return self._message_record(message_id, filename, content, message_info, patient_info, visit_info, parse_hl7_data(message))
+    
+    def build_message_records(
+        self,
+        message_ids: Sequence[uuid.UUID],
+        filenames: Sequence[str],
+        contents: Sequence[str],
+        header_fields: Optional[Sequence[Optional[Dict[str, Optional[str]]]]] = None,
+        ingest_job_id: Optional[uuid.UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build hl7_messages column values for many messages at once
+        
+        Header fields are extracted column-wise (one regex scan over the batch,
+        NumPy date parsing) instead of message by message. header_fields may
+        supply raw fields already located per message, e.g. by
+        RawHL7Message.header_fields(); the rest are scanned from contents.
+        The full structured parse is stored per message in parsed_data.
+        ingest_job_id tags the rows with the archive job or batch upload.
+        """
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        count = len(contents)
+        if header_fields is None:
+            header_fields = [None] * count
+        
+        fields = {path: [None] * count for path in HEADER_FIELD_PATHS}
+        pending = [index for index, row in enumerate(header_fields) if row is None]
+        if pending:
+            scanned = scan_header_fields([contents[index] for index in pending])
+            for path in HEADER_FIELD_PATHS:
+                for position, index in enumerate(pending):
+                    fields[path][index] = scanned[path][position]
+        for index, row in enumerate(header_fields):
+            if row is not None:
+                for path in HEADER_FIELD_PATHS:
+                    fields[path][index] = row.get(path)
+        
+        columns = {name: values.tolist() for name, values in header_columns(fields).items()}
+        processed_at = datetime.utcnow()
+        
+        records = [
+            {
+                "id": message_ids[index],
+                "original_filename": filenames[index],
+                "raw_hl7_content": contents[index],
+                **{name: values[index] for name, values in columns.items()},
+                "parsed_data": parse_hl7_data(contents[index]),
+                "processing_status": ProcessingStatus.PENDING.value,
+                "processed_at": processed_at,
+                "status_updated_at": processed_at,
+                "ingest_job_id": ingest_job_id
+            }
+            for index in range(count)
+        ]
+        elapsed = time.perf_counter() - started
+        PARSE_DURATION.labels("batch").observe(elapsed)
+        span_recorder.record(message_ids, "parse", started_at, elapsed)
+        
+        return records
+    
+    def _message_record(
+        self,
+        message_id: uuid.UUID,
+        filename: str,
+        content: str,
+        message_info: Dict[str, Any],
+        patient_info: Dict[str, Any],
+        visit_info: Dict[str, Any],
+        parsed_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Assemble an hl7_messages row from extracted header information"""
+        now = datetime.utcnow()
+        return {
+            "id": message_id,
+            "original_filename": filename,
+            "raw_hl7_content": content,
+            "message_type": message_info.get("message_type") or "Unknown",
+            "trigger_event": message_info.get("trigger_event"),
+            "patient_id": message_info.get("patient_id"),
+            "processing_status": ProcessingStatus.PENDING.value,
+            "processed_at": now,
+            "status_updated_at": now,
+            "patient_first_name": patient_info.get("first_name"),
+            "patient_last_name": patient_info.get("last_name"),
+            "patient_dob": patient_info.get("date_of_birth"),
+            "patient_gender": patient_info.get("gender"),
+            "visit_number": visit_info.get("visit_number"),
+            "admission_date": visit_info.get("admission_date"),
+            "discharge_date": visit_info.get("discharge_date"),
+            "parsed_data": parsed_data
+        }
+    
+    async def save_messages_bulk(
+        self,
+        db: AsyncSession,
+        records: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Insert many prepared message records in a single transaction
+        
+        Patients are upserted first, then records are written with
+        multi-row INSERT statements of up to BULK_INSERT_CHUNK_SIZE rows
+        (fewer when the rows would exceed the bind parameter limit), followed
+        by their OBX observations, and committed once at the end.
+        """
+        if not records:
+            return
+        
+        try:
+            with span_recorder.span([record["id"] for record in records], "db_insert"):
+                await self.upsert_patients(db, records)
+                # Built after the upsert so rows carry patient_ref_id
+                observations = self.build_observation_records(records)
+                chunk_size = self._insert_chunk_size(records)
+                for start in range(0, len(records), chunk_size):
+                    await db.execute(insert(HL7Message).values(records[start:start + chunk_size]))
+                chunk_size = self._insert_chunk_size(observations)
+                for start in range(0, len(observations), chunk_size):
+                    await db.execute(insert(Observation).values(observations[start:start + chunk_size]))
+                await db.commit()
+            count_ingested(records)
+            
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database error bulk saving {len(records)} messages: {e}")
+            raise
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error bulk saving messages to database: {e}")
+            raise
+    
+    async def copy_messages_to_db(
+        self,
+        db: AsyncSession,
+        records: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Write prepared message records with PostgreSQL COPY
+        
+        Uses asyncpg's binary copy_records_to_table on the session's
+        connection, which is much faster than INSERT for large imports.
+        asyncpg takes JSONB as text, so parsed_data is serialized here.
+        """
+        if not records:
+            return
+        
+        try:
+            with span_recorder.span([record["id"] for record in records], "db_insert", details={"method": "copy"}):
+                await self.upsert_patients(db, records)
+                # Built after the upsert so rows carry patient_ref_id
+                observations = self.build_observation_records(records)
+                columns = list(records[0].keys())
+                connection = await db.connection()
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    HL7Message.__tablename__,
+                    records=[tuple(self._copy_value(column, record[column]) for column in columns) for record in records],
+                    columns=columns
+                )
+                if observations:
+                    observation_columns = list(observations[0].keys())
+                    await raw_connection.driver_connection.copy_records_to_table(
+                        Observation.__tablename__,
+                        records=[tuple(row[column] for column in observation_columns) for row in observations],
+                        columns=observation_columns
+                    )
+                await db.commit()
+            count_ingested(records)
+            
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error copying {len(records)} messages to database: {e}")
+            raise
+    
+    def build_observation_records(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Build observations rows from the OBX results in message records' parsed_data
+        
+        patient_ref_id is copied from the records, so call this after upsert_patients.
+        """
+        rows = []
+        for record in records:
+            parsed_data = record.get("parsed_data") or {}
+            message_timestamp = self._parse_iso(parsed_data.get("message_timestamp"))
+            
+            for observation in parsed_data.get("observations") or []:
+                set_id = observation.get("observation_id")
+                value = observation.get("observation_value")
+                rows.append({
+                    "id": uuid.uuid4(),
+                    "message_id": record["id"],
+                    "patient_id": record.get("patient_id"),
+                    "patient_ref_id": record.get("patient_ref_id"),
+                    "set_id": int(set_id) if set_id and set_id.isdigit() else None,
+                    "value_type": observation.get("value_type"),
+                    "code": observation.get("observation_identifier"),
+                    "code_text": observation.get("observation_text"),
+                    "value": value,
+                    "numeric_value": self._numeric_value(value),
+                    "units": observation.get("units"),
+                    "reference_range": observation.get("reference_range"),
+                    "abnormal_flag": observation.get("abnormal_flags"),
+                    "observed_at": self._parse_iso(observation.get("observation_date")) or message_timestamp
+                })
+        
+        return rows
+    
+    def build_patient_records(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Aggregate one patients row per (identifier, assigning authority) in a batch
+        
+        Each demographic comes from the newest message (by MSH.7, falling back
+        to processed_at) that carries it. Rows are sorted by key so concurrent
+        batches upsert in the same order.
+        """
+        now = datetime.utcnow()
+        patients: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        
+        for record in records:
+            key = self._patient_key(record)
+            if key is None:
+                continue
+            
+            seen_at = self._parse_iso((record.get("parsed_data") or {}).get("message_timestamp")) or record["processed_at"]
+            demographics = {column: record.get(source) for column, source in PATIENT_DEMOGRAPHIC_COLUMNS.items()}
+            
+            row = patients.get(key)
+            if row is None:
+                patients[key] = {
+                    "id": uuid.uuid4(),
+                    "identifier": key[0],
+                    "assigning_authority": key[1],
+                    **demographics,
+                    "message_count": 1,
+                    "first_seen_at": seen_at,
+                    "last_seen_at": seen_at,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                continue
+            
+            newer = seen_at >= row["last_seen_at"]
+            for column, value in demographics.items():
+                if value is not None and (newer or row[column] is None):
+                    row[column] = value
+            row["message_count"] += 1
+            row["first_seen_at"] = min(row["first_seen_at"], seen_at)
+            row["last_seen_at"] = max(row["last_seen_at"], seen_at)
+        
+        return [patients[key] for key in sorted(patients)]
+    
+    async def upsert_patients(
+        self,
+        db: AsyncSession,
+        records: Sequence[Dict[str, Any]]
+    ) -> None:
+        """
+        Upsert the patients referenced by message records and link them
+        
+        Sets patient_ref_id on every record (None without a PID.3
+        identifier). Existing patients get their message count incremented
+        and demographics replaced when the batch is newer. Runs inside the
+        caller's transaction; nothing is committed here.
+        """
+        patient_ids: Dict[Tuple[str, str], uuid.UUID] = {}
+        rows = self.build_patient_records(records)
+        chunk_size = self._insert_chunk_size(rows)
+        
+        for start in range(0, len(rows), chunk_size):
+            stmt = pg_insert(Patient).values(rows[start:start + chunk_size])
+            excluded = stmt.excluded
+            newer = excluded.last_seen_at >= Patient.last_seen_at
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_patients_identifier_authority",
+                set_={
+                    **{
+                        column: case(
+                            (newer, func.coalesce(excluded[column], Patient.__table__.c[column])),
+                            else_=func.coalesce(Patient.__table__.c[column], excluded[column])
+                        )
+                        for column in PATIENT_DEMOGRAPHIC_COLUMNS
+                    },
+                    "message_count": Patient.message_count + excluded.message_count,
+                    "first_seen_at": func.least(Patient.first_seen_at, excluded.first_seen_at),
+                    "last_seen_at": func.greatest(Patient.last_seen_at, excluded.last_seen_at),
+                    "updated_at": excluded.updated_at
+                }
+            ).returning(Patient.id, Patient.identifier, Patient.assigning_authority)
+            
+            result = await db.execute(stmt)
+            patient_ids.update({(row.identifier, row.assigning_authority): row.id for row in result})
+        
+        for record in records:
+            key = self._patient_key(record)
+            record["patient_ref_id"] = patient_ids.get(key) if key else None
+    
+    def _insert_chunk_size(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Rows per multi-row INSERT: BULK_INSERT_CHUNK_SIZE, capped by the bind parameter limit"""
+        columns = max(1, len(rows[0])) if rows else 1
+        return max(1, min(settings.BULK_INSERT_CHUNK_SIZE, POSTGRES_MAX_BIND_PARAMETERS // columns))
+    
+    def _patient_key(self, record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(identifier, assigning authority) of a record's PID.3; None without an identifier"""
+        identifier = record.get("patient_id")
+        if not identifier:
+            return None
+        patient_info = (record.get("parsed_data") or {}).get("patient_info") or {}
+        return identifier, patient_info.get("assigning_authority") or ""
+    
+    def _numeric_value(self, value: Optional[str]) -> Optional[float]:
+        """OBX.5 as a float when it is a plain (optionally compared) number"""
+        if not value:
+            return None
+        match = NUMERIC_VALUE_PATTERN.match(value)
+        return float(match.group(1)) if match else None
+    
+    def _parse_iso(self, value: Optional[str]) -> Optional[datetime]:
+        return datetime.fromisoformat(value) if value else None
+    
+    def _copy_value(self, column: str, value: Any) -> Any:
+        """Adapt a record value for COPY (JSONB columns are sent as JSON text)"""
+        if column == "parsed_data" and value is not None:
+            return json.dumps(value)
+        return value
+    
+    async def get_parsed_data(
+        self,
+        db: AsyncSession,
+        message: HL7Message
+    ) -> Dict[str, Any]:
+        """
+        Get the structured parse of a stored message
+        
+        Rows without parsed_data, or stamped with an older parse version, are
+        re-parsed from raw_hl7_content and the result is written back so the
+        next reader gets it directly. The write-back uses its own session on
+        db's engine, so a failure there never rolls back (and expires) the
+        caller's loaded objects.
+        """
+        if is_current(message.parsed_data):
+            PARSED_DATA_LOOKUPS.labels("hit").inc()
+            return message.parsed_data
+        
+        PARSED_DATA_LOOKUPS.labels("miss").inc()
+        message_id = message.id
+        parsed_data = parse_hl7_data(message.raw_hl7_content)
+        try:
+            async with AsyncSession(db.bind) as session:
+                await session.execute(
+                    update(HL7Message)
+                    .where(HL7Message.id == message_id)
+                    .values(parsed_data=parsed_data)
+                )
+                await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error storing parsed data for {message_id}: {e}")
+        
+        return parsed_data
+    
     async def save_processed_formats(
         self,
         db: AsyncSession,
@@ -152,12 +550,13 @@ class HL7Processor:
                 update_data["pdf_content"] = pdf_content
             
             if update_data:
-                await db.execute(
-                    update(HL7Message)
-                    .where(HL7Message.id == message_id)
-                    .values(**update_data)
-                )
-                await db.commit()
+                with span_recorder.span(message_id, "artifact_save", details={"formats": sorted(update_data)}):
+                    await db.execute(
+                        update(HL7Message)
+                        .where(HL7Message.id == message_id)
+                        .values(**update_data)
+                    )
+                    await db.commit()
             
         except SQLAlchemyError as e:
             await db.rollback()
@@ -172,18 +571,36 @@ class HL7Processor:
         self,
         db: AsyncSession,
         message_id: uuid.UUID,
-        status: ProcessingStatus
+        status: ProcessingStatus,
+        progress: Optional[int] = None,
+        current_step: Optional[str] = None,
+        error_message: Optional[str] = None
     ):
         """
-        Update processing status for a message
+        Update processing status for a message and notify status subscribers
+        
+        progress/current_step record the step within the status (status defaults
+        when omitted). The NOTIFY is sent in the same transaction, so listeners
+        only hear about committed changes.
         """
         try:
+            now = datetime.utcnow()
+            payload = status_payload(message_id, status.value, progress, current_step, error_message, now)
             await db.execute(
                 update(HL7Message)
                 .where(HL7Message.id == message_id)
-                .values(processing_status=status.value)
+                .values(
+                    processing_status=status.value,
+                    progress=payload["progress"],
+                    current_step=payload["current_step"],
+                    error_message=error_message,
+                    status_updated_at=now
+                )
             )
+            await db.execute(select(func.pg_notify(STATUS_CHANNEL, json.dumps(payload))))
             await db.commit()
+            if status.value in TERMINAL_STATUSES:
+                MESSAGES_PROCESSED.labels(status.value).inc()
             
         except SQLAlchemyError as e:
             await db.rollback()
@@ -230,137 +647,187 @@ class HL7Processor:
         Get processing status for a message
         """
         try:
-            result = await db.execute(
-                select(HL7Message.processing_status, HL7Message.processed_at)
-                .where(HL7Message.id == message_id)
-            )
-            row = result.first()
-            
-            if not row:
-                return None
-            
-            status, processed_at = row
-            
-            # Calculate progress percentage
-            progress = 0
-            current_step = None
-            
-            if status == ProcessingStatus.PENDING.value:
-                progress = 10
-                current_step = "Queued for processing"
-            elif status == ProcessingStatus.PROCESSING.value:
-                progress = 50
-                current_step = "Converting formats"
-            elif status == ProcessingStatus.COMPLETED.value:
-                progress = 100
-                current_step = "Completed"
-            elif status == ProcessingStatus.FAILED.value:
-                progress = 0
-                current_step = "Failed"
-            elif status == ProcessingStatus.PARTIAL.value:
-                progress = 75
-                current_step = "Partially completed"
-            
-            return {
-                "message_id": message_id,
-                "status": status,
-                "progress": progress,
-                "current_step": current_step,
-                "error_message": None
-            }
+            statuses = await self.get_processing_statuses(db, [message_id])
+            return statuses.get(message_id)
             
         except Exception as e:
             logger.error(f"Error getting processing status: {e}")
             return None
     
-    def _extract_patient_demographics(self, hl7_content: str) -> Dict[str, Any]:
+    async def get_processing_statuses(
+        self,
+        db: AsyncSession,
+        message_ids: Optional[Sequence[uuid.UUID]] = None,
+        ingest_job_id: Optional[uuid.UUID] = None,
+        since: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, uuid.UUID]] = None,
+        limit: Optional[int] = None
+    ) -> Dict[uuid.UUID, Dict[str, Any]]:
         """
-        Extract patient demographic information from HL7
+        Get processing statuses for many messages with one query, keyed by message ID
+        
+        Selects by message IDs and/or ingest job, optionally only statuses
+        changed at or after since. Results are ordered by (status_updated_at, id)
+        so after (the last key of a previous page) and limit page through
+        them; unknown IDs are absent from the result.
         """
-        patient_info = {}
+        query = select(
+            HL7Message.id,
+            HL7Message.processing_status,
+            HL7Message.progress,
+            HL7Message.current_step,
+            HL7Message.error_message,
+            HL7Message.status_updated_at
+        )
+        
+        if message_ids is not None:
+            # One array parameter (= ANY) keeps the statement the same whatever the number of IDs
+            query = query.where(HL7Message.id == any_(bindparam("message_ids", list(message_ids), type_=ARRAY(UUID(as_uuid=True)))))
+        
+        if ingest_job_id is not None:
+            query = query.where(HL7Message.ingest_job_id == ingest_job_id)
+        
+        if since is not None:
+            query = query.where(HL7Message.status_updated_at >= since)
+        
+        if after is not None:
+            query = query.where(tuple_(HL7Message.status_updated_at, HL7Message.id) > tuple_(*after))
+        
+        if since is not None or after is not None or limit is not None:
+            query = query.order_by(HL7Message.status_updated_at, HL7Message.id)
+        
+        if limit is not None:
+            query = query.limit(limit)
+        
+        result = await db.execute(query)
         
+        return {
+            row.id: {
+                **status_payload(
+                    row.id,
+                    row.processing_status,
+                    row.progress,
+                    row.current_step,
+                    row.error_message,
+                    row.status_updated_at
+                ),
+                "message_id": row.id,
+                "updated_at": row.status_updated_at
+            }
+            for row in result.all()
+        }
+    
+    async def get_raw_contents(
+        self,
+        db: AsyncSession,
+        message_ids: Sequence[uuid.UUID]
+    ) -> List[Tuple[uuid.UUID, str]]:
+        """
+        Get (message ID, raw HL7 content) pairs for stored messages, in the order of message_ids
+        
+        Unknown IDs are skipped.
+        """
+        result = await db.execute(
+            select(HL7Message.id, HL7Message.raw_hl7_content)
+            .where(HL7Message.id == any_(bindparam("message_ids", list(message_ids), type_=ARRAY(UUID(as_uuid=True)))))
+        )
+        contents = dict(result.all())
+        return [(message_id, contents[message_id]) for message_id in message_ids if message_id in contents]
+    
+    def _extract_patient_demographics(self, hl7_content: Union[str, HL7MessageView]) -> Dict[str, Any]:
+        """
+        Extract patient demographic information from HL7
+        """
         try:
-            lines = hl7_content.strip().split('\n')
+            message = self._as_message(hl7_content)
+            if message.segment("PID") is None:
+                return {}
             
-            for line in lines:
-                if line.startswith("PID"):
-                    fields = line.split(data_processor.field_separator)
-                    
-                    # PID.5 - Patient Name
-                    if len(fields) > 5:
-                        name_info = data_processor.clean_patient_name(fields[5])
-                        patient_info.update(name_info)
-                    
-                    # PID.7 - Date of Birth
-                    if len(fields) > 7:
-                        dob_str = data_processor.normalize_field(fields[7])
-                        if dob_str:
-                            try:
-                                # HL7 date format: YYYYMMDD
-                                if len(dob_str) >= 8:
-                                    dob = datetime.strptime(dob_str[:8], "%Y%m%d")
-                                    patient_info["date_of_birth"] = dob
-                            except ValueError:
-                                pass
-                    
-                    # PID.8 - Gender
-                    if len(fields) > 8:
-                        gender = data_processor.normalize_field(fields[8])
-                        if gender:
-                            patient_info["gender"] = gender[0].upper() if gender else None
-                    
-                    break
-                    
+            return self._patient_demographics_from_fields(
+                name_field=message["PID-5"],
+                dob_field=message["PID-7"],
+                gender_field=message["PID-8"],
+                processor=self._data_processor(message)
+            )
+        
         except Exception as e:
             logger.error(f"Error extracting patient demographics: {e}")
+            return {}
+    
+    def _patient_demographics_from_fields(
+        self,
+        name_field: Optional[str],
+        dob_field: Optional[str],
+        gender_field: Optional[str],
+        processor: HL7DataProcessor = data_processor
+    ) -> Dict[str, Any]:
+        """
+        Build patient demographics from raw PID.5, PID.7 and PID.8 field values
+        """
+        patient_info = {}
+        
+        # PID.5 - Patient Name
+        if name_field is not None:
+            name_info = processor.clean_patient_name(name_field)
+            patient_info.update(name_info)
+        
+        # PID.7 - Date of Birth
+        dob = parse_hl7_date(timestamp_component(dob_field, processor))
+        if dob:
+            patient_info["date_of_birth"] = dob
+        
+        # PID.8 - Gender
+        gender = processor.normalize_field(gender_field)
+        if gender:
+            patient_info["gender"] = gender[0].upper()
         
         return patient_info
     
-    def _extract_visit_info(self, hl7_content: str) -> Dict[str, Any]:
+    def _extract_visit_info(self, hl7_content: Union[str, HL7MessageView]) -> Dict[str, Any]:
         """
         Extract visit information from HL7
         """
-        visit_info = {}
-        
         try:
-            lines = hl7_content.strip().split('\n')
+            message = self._as_message(hl7_content)
+            if message.segment("PV1") is None:
+                return {}
             
-            for line in lines:
-                if line.startswith("PV1"):
-                    fields = line.split(data_processor.field_separator)
-                    
-                    # PV1.19 - Visit Number
-                    if len(fields) > 19:
-                        visit_number = data_processor.normalize_field(fields[19])
-                        if visit_number:
-                            visit_info["visit_number"] = visit_number
-                    
-                    # PV1.44 - Admit Date/Time
-                    if len(fields) > 44:
-                        admit_date_str = data_processor.normalize_field(fields[44])
-                        if admit_date_str:
-                            try:
-                                # HL7 timestamp format: YYYYMMDDHHMMSS
-                                if len(admit_date_str) >= 8:
-                                    admit_date = datetime.strptime(admit_date_str[:14], "%Y%m%d%H%M%S")
-                                    visit_info["admission_date"] = admit_date
-                            except ValueError:
-                                pass
-                    
-                    # PV1.45 - Discharge Date/Time
-                    if len(fields) > 45:
-                        discharge_date_str = data_processor.normalize_field(fields[45])
-                        if discharge_date_str:
-                            try:
-                                if len(discharge_date_str) >= 8:
-                                    discharge_date = datetime.strptime(discharge_date_str[:14], "%Y%m%d%H%M%S")
-                                    visit_info["discharge_date"] = discharge_date
-                            except ValueError:
-                                pass
-                    
-                    break
-                    
+            return self._visit_info_from_fields(
+                visit_number_field=message["PV1-19"],
+                admit_field=message["PV1-44"],
+                discharge_field=message["PV1-45"],
+                processor=self._data_processor(message)
+            )
+        
         except Exception as e:
             logger.error(f"Error extracting visit info: {e}")
+            return {}
+    
+    def _visit_info_from_fields(
+        self,
+        visit_number_field: Optional[str],
+        admit_field: Optional[str],
+        discharge_field: Optional[str],
+        processor: HL7DataProcessor = data_processor
+    ) -> Dict[str, Any]:
+        """
+        Build visit information from raw PV1.19, PV1.44 and PV1.45 field values
+        """
+        visit_info = {}
+        
+        # PV1.19 - Visit Number
+        visit_number = processor.normalize_field(visit_number_field)
+        if visit_number:
+            visit_info["visit_number"] = visit_number
+        
+        # PV1.44 - Admit Date/Time
+        admit_date = parse_hl7_timestamp(timestamp_component(admit_field, processor))
+        if admit_date:
+            visit_info["admission_date"] = admit_date
+        
+        # PV1.45 - Discharge Date/Time
+        discharge_date = parse_hl7_timestamp(timestamp_component(discharge_field, processor))
+        if discharge_date:
+            visit_info["discharge_date"] = discharge_date
         
         return visit_info
\ No newline at end of file
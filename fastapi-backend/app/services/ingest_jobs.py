@@ -0,0 +1,93 @@
+"""
+Ingestion Job Tracking
+Keeps progress for long-running imports so clients can poll by job ID
+"""
+
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.models.hl7_models import ProcessingStatus
+
+
+class IngestJobTracker:
+    """In-memory progress registry for ingestion jobs (per worker process)"""
+
+    def __init__(self, max_jobs: int = 500, max_errors: int = 100):
+        self.max_jobs = max_jobs
+        self.max_errors = max_errors
+        self._jobs: "OrderedDict[uuid.UUID, Dict[str, Any]]" = OrderedDict()
+
+    def create_job(self, filename: str) -> uuid.UUID:
+        """
+        Register a new job and return its ID
+        """
+        job_id = uuid.uuid4()
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "filename": filename,
+            "status": ProcessingStatus.PENDING.value,
+            "entries_processed": 0,
+            "messages_imported": 0,
+            "messages_failed": 0,
+            "errors": [],
+            "created_at": datetime.utcnow(),
+            "completed_at": None
+        }
+
+        # Drop the oldest finished jobs once the registry is full
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest["status"] in (ProcessingStatus.PENDING.value, ProcessingStatus.PROCESSING.value):
+                break
+            self._jobs.pop(oldest_id)
+
+        return job_id
+
+    def get_job(self, job_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """
+        Get a snapshot of a job's progress
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "errors": list(job["errors"])}
+
+    def update_job(self, job_id: uuid.UUID, **changes: Any) -> None:
+        """
+        Update job fields; counters are passed as increments with an "add_" prefix
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+
+        for key, value in changes.items():
+            if key.startswith("add_"):
+                job[key[4:]] += value
+            else:
+                job[key] = value
+
+        if job["status"] in (ProcessingStatus.COMPLETED.value, ProcessingStatus.FAILED.value, ProcessingStatus.PARTIAL.value):
+            job["completed_at"] = job["completed_at"] or datetime.utcnow()
+
+    def active_count(self) -> int:
+        """
+        Number of jobs pending or in progress
+        """
+        return sum(
+            1 for job in self._jobs.values()
+            if job["status"] in (ProcessingStatus.PENDING.value, ProcessingStatus.PROCESSING.value)
+        )
+
+    def add_error(self, job_id: uuid.UUID, error: str) -> None:
+        """
+        Record an error message, keeping only the first max_errors
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and len(job["errors"]) < self.max_errors:
+            job["errors"].append(error)
+
+
+# Global job tracker instance
+ingest_jobs = IngestJobTracker()
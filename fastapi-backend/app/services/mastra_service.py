@@ -6,30 +6,102 @@ Handles communication with Mastra agents for HL7 processing
 import httpx
 import asyncio
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 import logging
 
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.metrics import CONVERSIONS_IN_PROGRESS, MASTRA_REQUEST_DURATION, runtime_collector
+from app.services.processing_spans import message_span
+from app.services.retry_policy import RetryBudget, RetryingCaller, RetryPolicy
+from app.services.triage_engine import IndexedResult, triage_chunk, triage_engine
+from app.utils.hl7_message import HL7MessageView
+from app.utils.hl7_tokenizer import first_segment
+
 logger = logging.getLogger(__name__)
 
+def default_retry_policies() -> Dict[str, RetryPolicy]:
+    """
+    Retry policy per Mastra call kind, with MASTRA_RETRY_POLICIES overrides applied
+    """
+    default = RetryPolicy(
+        max_attempts=settings.MASTRA_RETRY_MAX_ATTEMPTS,
+        base_delay=settings.MASTRA_RETRY_BASE_DELAY,
+        max_delay=settings.MASTRA_RETRY_MAX_DELAY
+    )
+    policies = {
+        # Per-message conversions behind the upload pipeline; short enough to hedge
+        "json": default._replace(hedge=True),
+        "xml": default._replace(hedge=True),
+        "both": default._replace(hedge=True),
+        "plain_english": default,
+        "latex": default,
+        "medical_document": default,
+        # One attempt: a failed chunk falls back to rule-based triage instead of retrying for minutes
+        "triage": default._replace(timeout=settings.MASTRA_TRIAGE_TIMEOUT, max_attempts=1)
+    }
+    for kind, overrides in settings.MASTRA_RETRY_POLICIES.items():
+        policies[kind] = policies.get(kind, default)._replace(**overrides)
+    return policies
+
+# Shared by every MastraService so the retry budget and latency history cover all calls to the service
+mastra_retry = RetryingCaller(default_retry_policies(), RetryBudget(ratio=settings.MASTRA_RETRY_BUDGET_RATIO))
+
 class MastraService:
     """Service for interacting with Mastra AI agents"""
     
     def __init__(self):
         self.mastra_endpoint = os.getenv("MASTRA_SERVICE_URL", "http://localhost:3001")
         self.timeout = 60.0
-        
+        # Shared by every triage request so concurrent batches stay under the limit together
+        self._triage_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_PROCESSES)
+        self._http: Optional[httpx.AsyncClient] = None
+        runtime_collector.track_http_client(self)
+    
+    def _client(self) -> httpx.AsyncClient:
+        # One pooled client so retries, hedges and triage chunks reuse keep-alive connections
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+    
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP client
+        """
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _post(self, kind: str, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST to a Mastra endpoint under the kind's retry policy and return the JSON body
+        """
+        client = self._client()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with message_span(f"mastra_{kind}", agent_name="Mastra"):
+                response = await mastra_retry.call(
+                    kind,
+                    lambda timeout: client.post(f"{self.mastra_endpoint}{path}", json=payload, timeout=timeout)
+                )
+            outcome = "success"
+        finally:
+            MASTRA_REQUEST_DURATION.labels(kind, outcome).observe(time.perf_counter() - started)
+        return response.json()
+    
     async def convert_hl7_to_json(self, hl7_content: str) -> Dict[str, Any]:
         """
         Convert HL7 message to JSON using Mastra service
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7/json",
-                    json={"hl7Content": hl7_content}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "json",
+                "/convert-hl7/json",
+                {"hl7Content": hl7_content}
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra JSON conversion: {e}")
             raise
@@ -42,13 +114,11 @@ class MastraService:
         Convert HL7 message to XML using Mastra service
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7/xml",
-                    json={"hl7Content": hl7_content}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "xml",
+                "/convert-hl7/xml",
+                {"hl7Content": hl7_content}
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra XML conversion: {e}")
             raise
@@ -61,13 +131,11 @@ class MastraService:
         Convert HL7 message to both JSON and XML using Mastra service
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7",
-                    json={"hl7Content": hl7_content}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "both",
+                "/convert-hl7",
+                {"hl7Content": hl7_content}
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra conversion: {e}")
             raise
@@ -80,13 +148,11 @@ class MastraService:
         Convert HL7 message to plain English medical report
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7/plain-english",
-                    json={"hl7Content": hl7_content}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "plain_english",
+                "/convert-hl7/plain-english",
+                {"hl7Content": hl7_content}
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra plain English conversion: {e}")
             raise
@@ -99,13 +165,11 @@ class MastraService:
         Convert HL7 message to LaTeX document
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7/latex",
-                    json={"hl7Content": hl7_content}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "latex",
+                "/convert-hl7/latex",
+                {"hl7Content": hl7_content}
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra LaTeX conversion: {e}")
             raise
@@ -123,17 +187,15 @@ class MastraService:
         Convert HL7 message to complete medical document with optional PDF
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.mastra_endpoint}/convert-hl7/medical-document",
-                    json={
-                        "hl7Content": hl7_content,
-                        "generatePdf": generate_pdf,
-                        "format": format
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post(
+                "medical_document",
+                "/convert-hl7/medical-document",
+                {
+                    "hl7Content": hl7_content,
+                    "generatePdf": generate_pdf,
+                    "format": format
+                }
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra medical document conversion: {e}")
             raise
@@ -148,7 +210,8 @@ class MastraService:
         """
         try:
             # Use the new dual conversion method
-            result = await self.convert_hl7_both_formats(hl7_content)
+            with CONVERSIONS_IN_PROGRESS.track_inprogress():
+                result = await self.convert_hl7_both_formats(hl7_content)
             
             # Extract the data from the nested response structure
             if result.get("success") and result.get("data"):
@@ -173,9 +236,8 @@ class MastraService:
         Check if Mastra service is available
         """
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(f"{self.mastra_endpoint}/health")
-                return response.status_code == 200
+            response = await self._client().get(f"{self.mastra_endpoint}/health", timeout=10)
+            return response.status_code == 200
         except Exception:
             return False
     
@@ -183,17 +245,85 @@ class MastraService:
         """
         Analyze multiple HL7 messages for medical triage severity assessment
         """
+        chunks = [chunk async for chunk in self.iter_triage(hl7_messages)]
+        return self.merge_triage(chunks)
+    
+    async def iter_triage(self, hl7_messages: list[str]) -> AsyncIterator[Tuple[List[IndexedResult], Dict[str, Any]]]:
+        """
+        Triage a batch in chunks, yielding ((index, result) list, metadata) per chunk as each completes
+        
+        Chunks of MASTRA_TRIAGE_CHUNK_SIZE messages are sent concurrently, at most
+        MAX_CONCURRENT_PROCESSES at a time. A chunk that fails or times out is
+        triaged by the local rule engine instead of failing the whole batch.
+        """
+        size = max(1, settings.MASTRA_TRIAGE_CHUNK_SIZE)
+        tasks = [
+            asyncio.ensure_future(self._triage_chunk(start, list(hl7_messages[start:start + size])))
+            for start in range(0, len(hl7_messages), size)
+        ]
         try:
-            async with httpx.AsyncClient(timeout=120) as client:  # Longer timeout for AI processing
-                response = await client.post(
-                    f"{self.mastra_endpoint}/triage-analysis",
-                    json={
-                        "hl7_messages": hl7_messages,
-                        "patient_count": len(hl7_messages)
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def merge_triage(self, chunks: List[Tuple[List[IndexedResult], Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Merge per-chunk triage results into one response ranked by severity (request order breaks ties)
+        """
+        indexed = [item for results, _ in chunks for item in results]
+        indexed.sort(key=lambda item: (-(item[1].get("severity_score") or 0), item[0]))
+        
+        fallback_chunks = sum(1 for _, metadata in chunks if metadata.get("fallback_mode"))
+        # Describe the run with an AI chunk's metadata when there is one
+        metadata = next(
+            (metadata for _, metadata in chunks if not metadata.get("fallback_mode")),
+            chunks[0][1] if chunks else {}
+        )
+        
+        return {
+            "success": True,
+            "data": [result for _, result in indexed],
+            "metadata": {
+                **metadata,
+                "patientsAnalyzed": len(indexed),
+                "chunks": len(chunks),
+                "fallbackChunks": fallback_chunks,
+                "fallback_mode": bool(chunks) and fallback_chunks == len(chunks)
+            }
+        }
+    
+    async def _triage_chunk(self, start: int, hl7_messages: List[str]) -> Tuple[List[IndexedResult], Dict[str, Any]]:
+        async with self._triage_semaphore:
+            try:
+                result = await self._request_triage(start, hl7_messages)
+                if result.get("success", True):
+                    indexed = [(start + offset, item) for offset, item in enumerate(result.get("data", []))]
+                    return indexed, result.get("metadata", {})
+                logger.warning(f"Mastra triage analysis unsuccessful for messages {start + 1}-{start + len(hl7_messages)}")
+            except Exception as e:
+                logger.warning(f"Mastra triage analysis failed for messages {start + 1}-{start + len(hl7_messages)}: {e}")
+        
+        # Local rules run outside the semaphore; they do not load the AI service
+        logger.info("Falling back to rule-based triage for the failed chunk")
+        indexed = await run_in_threadpool(triage_chunk, start, hl7_messages)
+        return indexed, triage_engine.build_response(indexed)["metadata"]
+    
+    async def _request_triage(self, start: int, hl7_messages: List[str]) -> Dict[str, Any]:
+        """
+        Send one chunk to the Mastra triage agent; start is the chunk's offset in the batch
+        """
+        try:
+            return await self._post(
+                "triage",
+                "/triage-analysis",
+                {
+                    "hl7_messages": hl7_messages,
+                    "patient_count": len(hl7_messages)
+                }
+            )
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Mastra triage analysis: {e}")
             raise
@@ -206,14 +336,13 @@ class MastraService:
         Get status of a specific Mastra agent
         """
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(f"{self.mastra_endpoint}/health")
-                
-                if response.status_code == 200:
-                    return {"status": "active", "service": "mastra-hl7-service"}
-                else:
-                    return {"status": "unknown", "error": f"HTTP {response.status_code}"}
-                    
+            response = await self._client().get(f"{self.mastra_endpoint}/health", timeout=10)
+            
+            if response.status_code == 200:
+                return {"status": "active", "service": "mastra-hl7-service"}
+            else:
+                return {"status": "unknown", "error": f"HTTP {response.status_code}"}
+            
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
@@ -278,8 +407,7 @@ class MockMastraService(MastraService):
     
     def _generate_mock_xml(self, hl7_content: str) -> str:
         """Generate mock XML output"""
-        lines = hl7_content.strip().split('\n')
-        first_line = lines[0] if lines else ""
+        first_line = first_segment(hl7_content)
         
         return f"""<?xml version="1.0" encoding="UTF-8"?>
 <HL7Message>
@@ -516,8 +644,8 @@ Name: John Doe\\
 ID: 123456789\\
 \end{document}"""
     
-    async def analyze_triage(self, hl7_messages: list[str]) -> Dict[str, Any]:
-        """Mock triage analysis"""
+    async def _request_triage(self, start: int, hl7_messages: List[str]) -> Dict[str, Any]:
+        """Mock triage analysis of one chunk"""
         await asyncio.sleep(3)  # Simulate AI processing time
         
         mock_results = []
@@ -525,28 +653,17 @@ ID: 123456789\\
         priority_levels = ["Emergent", "Urgent", "Non-urgent", "Immediate", "Delayed"]
         timelines = ["Within 15 minutes", "Within 1 hour", "Within 2-4 hours", "Immediate", "Routine"]
         
-        for i, hl7_content in enumerate(hl7_messages):
+        for i, hl7_content in enumerate(hl7_messages, start):
             # Extract mock patient info from HL7
-            lines = hl7_content.split('\n')
+            message = HL7MessageView(hl7_content)
             patient_name = f"Patient {i+1}"
             patient_id = f"P{12345 + i}"
             
             # Try to extract real patient name if available
-            for line in lines:
-                if line.startswith('PID'):
-                    segments = line.split('|')
-                    if len(segments) >= 6:
-                        name_segment = segments[5]
-                        if name_segment:
-                            name_parts = name_segment.split('^')
-                            if len(name_parts) >= 2:
-                                patient_name = f"{name_parts[1]} {name_parts[0]}".strip()
-                        id_segment = segments[3]
-                        if id_segment:
-                            id_parts = id_segment.split('^')
-                            if id_parts:
-                                patient_id = id_parts[0]
-                    break
+            if message["PID-5.1"] or message["PID-5.2"]:
+                patient_name = f"{message['PID-5.2'] or ''} {message['PID-5.1'] or ''}".strip()
+            if message["PID-3.1"]:
+                patient_id = message["PID-3.1"]
             
             score_index = i % len(severity_scores)
             mock_results.append({
@@ -0,0 +1,306 @@
+"""
+Prometheus Metrics
+Histograms for routes, Mastra calls, parsing and database statements are
+observed inline; pool, queue and cache gauges are read only when /metrics
+is scraped, so the request path pays for little more than a clock read.
+With METRICS_ENABLED off every metric is a no-op and nothing is registered
+"""
+
+import collections
+import re
+import time
+import weakref
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.models.hl7_models import MessageType
+from app.services.ingest_jobs import ingest_jobs
+from app.services.processing_spans import span_recorder
+from app.services.status_events import status_broadcaster
+from app.utils.hl7_datetime import parse_hl7_datetime
+from app.utils.hl7_message import compile_path
+
+class _NullMetric:
+    """Stands in for every metric when metrics are disabled"""
+
+    def labels(self, *labelvalues: str) -> "_NullMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def time(self):
+        return nullcontext()
+
+    def track_inprogress(self):
+        return nullcontext()
+
+
+NULL_METRIC = _NullMetric()
+
+
+def _metric(metric_class, *args, **kwargs):
+    """A registered metric, or the no-op stand-in when metrics are disabled"""
+    return metric_class(*args, **kwargs) if settings.METRICS_ENABLED else NULL_METRIC
+
+
+# Sub-millisecond parses up to minute-long Mastra calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_DURATION = _metric(
+    Histogram,
+    "hl7_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+MASTRA_REQUEST_DURATION = _metric(
+    Histogram,
+    "hl7_mastra_request_duration_seconds",
+    "Mastra call latency by conversion kind, including retries and hedged requests",
+    ["kind", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+PARSE_DURATION = _metric(
+    Histogram,
+    "hl7_parse_duration_seconds",
+    "Time to build message records (header extraction and structured parse) per call",
+    ["mode"],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERY_DURATION = _metric(
+    Histogram,
+    "hl7_db_query_duration_seconds",
+    "Database statement latency by statement verb and table",
+    ["statement"],
+    buckets=LATENCY_BUCKETS
+)
+MESSAGES_INGESTED = _metric(
+    Counter,
+    "hl7_messages_ingested",
+    "Messages stored, by message type",
+    ["message_type"]
+)
+MESSAGES_PROCESSED = _metric(
+    Counter,
+    "hl7_messages_processed",
+    "Messages reaching a terminal processing status",
+    ["status"]
+)
+PARSED_DATA_LOOKUPS = _metric(
+    Counter,
+    "hl7_parsed_data_lookups",
+    "Stored structured parses served as is (hit) or re-parsed (miss)",
+    ["result"]
+)
+CONVERSIONS_IN_PROGRESS = _metric(
+    Gauge,
+    "hl7_conversions_in_progress",
+    "Messages being converted by Mastra"
+)
+DB_CONNECTIONS_CHECKED_OUT = _metric(
+    Gauge,
+    "hl7_db_pool_checked_out",
+    "Database connections checked out of the async engine's pool"
+)
+
+# First table named after FROM, INTO, UPDATE or JOIN
+STATEMENT_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str) -> str:
+    """Low-cardinality label for a SQL statement, e.g. "SELECT hl7_messages" """
+    words = statement.split(None, 1)
+    if not words:
+        return "UNKNOWN"
+    table = STATEMENT_TABLE_PATTERN.search(statement)
+    return f"{words[0].upper()} {table.group(1)}" if table else words[0].upper()
+
+
+# lru_cache-backed lookups whose hit rates are exported
+CACHES: Dict[str, Callable[..., Any]] = {
+    "hl7_datetime": parse_hl7_datetime,
+    "hl7_path": compile_path,
+    "sql_statement_label": statement_label,
+}
+
+
+# Known message types keep their own series; anything else read from MSH-9 is counted as "other"
+KNOWN_MESSAGE_TYPES = frozenset(message_type.value for message_type in MessageType)
+
+
+def count_ingested(records: Iterable[Dict[str, Any]]) -> None:
+    """Count stored message records by message type"""
+    if not settings.METRICS_ENABLED:
+        return
+    counts = collections.Counter(
+        record.get("message_type") if record.get("message_type") in KNOWN_MESSAGE_TYPES else "other"
+        for record in records
+    )
+    for message_type, count in counts.items():
+        MESSAGES_INGESTED.labels(message_type).inc(count)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Time every statement and count pool checkouts of an async engine
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        DB_QUERY_DURATION.labels(statement_label(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    @event.listens_for(sync_engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_CONNECTIONS_CHECKED_OUT.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        DB_CONNECTIONS_CHECKED_OUT.dec()
+
+
+class RuntimeCollector:
+    """Scrape-time gauges for HTTP client pools, in-memory queues and caches"""
+
+    def __init__(self):
+        self._http_owners: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+    def track_http_client(self, owner: Any) -> None:
+        """Report the pool of owner._http (an httpx.AsyncClient created on demand)"""
+        self._http_owners.add(owner)
+
+    def collect(self) -> Iterator[Any]:
+        connections = GaugeMetricFamily(
+            "hl7_http_pool_connections",
+            "Connections in the Mastra HTTP client pools",
+            labels=["state"]
+        )
+        limit = GaugeMetricFamily("hl7_http_pool_max_connections", "Connection limit of the Mastra HTTP client pools")
+        idle = active = maximum = 0
+        for owner in list(self._http_owners):
+            client = getattr(owner, "_http", None)
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            if client is None or client.is_closed or pool is None:
+                continue
+            for connection in pool.connections:
+                if connection.is_idle():
+                    idle += 1
+                else:
+                    active += 1
+            maximum += pool._max_connections or 0
+        connections.add_metric(["active"], active)
+        connections.add_metric(["idle"], idle)
+        limit.add_metric([], maximum)
+        yield connections
+        yield limit
+
+        queues = GaugeMetricFamily("hl7_queue_depth", "Items waiting in in-memory queues", labels=["queue"])
+        queues.add_metric(["processing_spans"], span_recorder.buffered)
+        queues.add_metric(
+            ["status_events"],
+            sum(subscription.queue.qsize() for subscription in status_broadcaster.subscriptions())
+        )
+        queues.add_metric(["ingest_jobs"], ingest_jobs.active_count())
+        yield queues
+
+        dropped = CounterMetricFamily("hl7_processing_spans_dropped", "Processing spans dropped because the buffer was full")
+        dropped.add_metric([], span_recorder.dropped)
+        yield dropped
+
+        hits = CounterMetricFamily("hl7_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("hl7_cache_misses", "Cache misses", labels=["cache"])
+        size = GaugeMetricFamily("hl7_cache_size", "Entries in cache", labels=["cache"])
+        for name, cached in CACHES.items():
+            info = cached.cache_info()
+            hits.add_metric([name], info.hits)
+            misses.add_metric([name], info.misses)
+            size.add_metric([name], info.currsize)
+        yield hits
+        yield misses
+        yield size
+
+
+runtime_collector = RuntimeCollector()
+if settings.METRICS_ENABLED:
+    REGISTRY.register(runtime_collector)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing request latency per route template
+
+    Labelled by the matched route's path template rather than the URL, so
+    IDs in paths do not create series; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_path(self, scope: Dict[str, Any]) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in getattr(app, "routes", ())
+                if hasattr(route, "endpoint")
+            }
+            path = self._route_paths.get(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                self._route_path(scope),
+                str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> bytes:
+    """Current metrics in the Prometheus text format"""
+    return generate_latest(REGISTRY)
@@ -0,0 +1,270 @@
+"""
+Processing Spans
+Per-stage timings of the ingestion and conversion pipeline. Spans are
+buffered in memory and written to processing_logs in batches with COPY on a
+dedicated connection, so recording one costs no query or commit on the
+request path
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import asyncpg
+
+from app.config import settings
+from app.database.models import HL7Message, ProcessingLog
+
+logger = logging.getLogger(__name__)
+
+# Message whose conversion the current task is running; Mastra calls record their spans against it
+current_message_id: contextvars.ContextVar[Optional[uuid.UUID]] = contextvars.ContextVar("current_message_id", default=None)
+
+SPAN_COLUMNS = (
+    "id",
+    "message_id",
+    "agent_name",
+    "processing_step",
+    "status",
+    "error_message",
+    "error_details",
+    "started_at",
+    "completed_at",
+    "duration_seconds",
+    "duration_ms",
+    "created_at",
+)
+
+MAX_ERROR_LENGTH = 1000
+
+MessageIds = Union[uuid.UUID, Sequence[uuid.UUID]]
+
+
+class SpanRecorder:
+    """
+    Buffers spans and flushes them to processing_logs from a background task
+
+    A stage that handles many messages at once (e.g. one columnar parse of a
+    batch) is recorded once per message with its share of the elapsed time;
+    the batch size and total go in error_details. Spans may be recorded
+    before their message row is committed, so rows whose message does not
+    exist yet are kept for a few flushes and then dropped.
+    """
+
+    def __init__(self):
+        # Appends and pops are atomic, so threadpool stages can record directly
+        self._buffer: Deque[Tuple[Tuple[Any, ...], int]] = deque(maxlen=max(1, settings.PROCESSING_SPAN_BUFFER_MAX))
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    @property
+    def buffered(self) -> int:
+        """Spans waiting to be written"""
+        return len(self._buffer)
+
+    def record(
+        self,
+        message_ids: MessageIds,
+        step: str,
+        started_at: datetime,
+        duration: float,
+        status: str = "success",
+        agent_name: Optional[str] = None,
+        error_message: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Buffer one span of duration seconds for each message
+        """
+        if not settings.PROCESSING_SPANS_ENABLED:
+            return
+        if isinstance(message_ids, uuid.UUID):
+            message_ids = [message_ids]
+        if not message_ids:
+            return
+
+        total_ms = duration * 1000
+        share_ms = total_ms / len(message_ids)
+        if len(message_ids) > 1:
+            details = {**(details or {}), "batch_size": len(message_ids), "batch_duration_ms": round(total_ms, 3)}
+        completed_at = started_at + timedelta(seconds=duration)
+        error_details = json.dumps(details) if details else None
+        if error_message:
+            error_message = error_message[:MAX_ERROR_LENGTH]
+
+        for message_id in message_ids:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(((
+                uuid.uuid4(),
+                message_id,
+                agent_name or "Pipeline",
+                step,
+                status,
+                error_message,
+                error_details,
+                started_at,
+                completed_at,
+                int(round(share_ms / 1000)),
+                share_ms,
+                completed_at,
+            ), 0))
+
+    @contextmanager
+    def span(
+        self,
+        message_ids: MessageIds,
+        step: str,
+        agent_name: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None
+    ) -> Iterator[None]:
+        """
+        Time the enclosed block as one stage; an exception is recorded as an error span and re-raised
+        """
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(
+                message_ids, step, started_at, time.perf_counter() - started,
+                status="error", agent_name=agent_name, error_message=str(e), details=details
+            )
+            raise
+        self.record(message_ids, step, started_at, time.perf_counter() - started, agent_name=agent_name, details=details)
+
+    def start(self) -> None:
+        """
+        Start the background flush task on the running event loop
+        """
+        if settings.PROCESSING_SPANS_ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.PROCESSING_SPAN_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Keep the buffered spans; the connection is re-opened on the next flush
+                logger.warning(f"Error writing processing spans: {e}")
+                await self._close_connection()
+
+    async def _ensure_connection(self) -> asyncpg.Connection:
+        if self._connection is None or self._connection.is_closed():
+            self._connection = await asyncpg.connect(settings.DATABASE_URL)
+        return self._connection
+
+    async def _close_connection(self) -> None:
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+    async def flush(self) -> int:
+        """
+        Write the spans buffered so far in COPY batches; returns the number written
+        """
+        written = 0
+        pending = len(self._buffer)
+        deferred: List[Tuple[Tuple[Any, ...], int]] = []
+        batch_size = max(1, settings.PROCESSING_SPAN_BATCH_SIZE)
+
+        try:
+            while pending:
+                batch = [self._buffer.popleft() for _ in range(min(batch_size, pending))]
+                pending -= len(batch)
+                try:
+                    count, later = await self._write_batch(batch)
+                except Exception:
+                    # Retried on later flushes, but a batch that keeps failing is eventually dropped
+                    deferred.extend(
+                        (row, deferrals + 1) for row, deferrals in batch
+                        if deferrals < settings.PROCESSING_SPAN_MAX_DEFERRALS
+                    )
+                    raise
+                except BaseException:
+                    self._buffer.extendleft(reversed(batch))
+                    raise
+                written += count
+                deferred.extend(later)
+        finally:
+            self._buffer.extend(deferred)
+
+        return written
+
+    async def _write_batch(
+        self,
+        batch: List[Tuple[Tuple[Any, ...], int]]
+    ) -> Tuple[int, List[Tuple[Tuple[Any, ...], int]]]:
+        """COPY the rows whose message exists; returns (rows written, rows to retry)"""
+        connection = await self._ensure_connection()
+        existing = {
+            row["id"]
+            for row in await connection.fetch(
+                f"SELECT id FROM {HL7Message.__tablename__} WHERE id = ANY($1::uuid[])",
+                list({row[1] for row, _ in batch})
+            )
+        }
+
+        rows = []
+        deferred = []
+        for row, deferrals in batch:
+            if row[1] in existing:
+                rows.append(row)
+            elif deferrals < settings.PROCESSING_SPAN_MAX_DEFERRALS:
+                # The message row may not be committed yet
+                deferred.append((row, deferrals + 1))
+
+        if rows:
+            await connection.copy_records_to_table(ProcessingLog.__tablename__, records=rows, columns=SPAN_COLUMNS)
+        return len(rows), deferred
+
+    async def close(self) -> None:
+        """
+        Stop the flush task, write what is buffered and close the connection
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            if self._buffer:
+                await self.flush()
+        except Exception as e:
+            logger.warning(f"Error writing processing spans on shutdown: {e}")
+        finally:
+            await self._close_connection()
+
+
+# Global recorder instance
+span_recorder = SpanRecorder()
+
+
+@contextmanager
+def message_context(message_id: uuid.UUID) -> Iterator[None]:
+    """
+    Attribute spans recorded by message_span in the enclosed block (e.g. each Mastra call) to message_id
+    """
+    token = current_message_id.set(message_id)
+    try:
+        yield
+    finally:
+        current_message_id.reset(token)
+
+
+def message_span(step: str, agent_name: Optional[str] = None):
+    """
+    Span for the message in current_message_id; a no-op outside a message's conversion
+    """
+    message_id = current_message_id.get()
+    if message_id is None:
+        return nullcontext()
+    return span_recorder.span(message_id, step, agent_name=agent_name)
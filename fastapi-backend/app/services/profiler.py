@@ -0,0 +1,264 @@
+"""
+On-demand Profiling
+CPU profiles (a statistical stack sampler, or cProfile on the event loop
+thread) and tracemalloc snapshots of the running worker. Nothing runs until
+a profile is started, and every profile stops itself after a bounded time
+"""
+
+import asyncio
+import cProfile
+import collections
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Counter, Dict, List, Optional
+
+SAMPLING = "sampling"
+CPROFILE = "cprofile"
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stacks of every other thread at a fixed interval
+
+    Stacks are counted in collapsed form (root;...;leaf), which flamegraph.pl,
+    speedscope and similar tools read directly.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Signal the thread to stop; join() waits for a sample in progress to finish"""
+        self._stop.set()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def top_functions(self, limit: int) -> List[Dict[str, Any]]:
+        """Functions by samples on top of the stack (self) and anywhere in it (total)"""
+        own: Counter[str] = collections.Counter()
+        total: Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for function in set(frames):
+                total[function] += count
+        return [
+            {
+                "function": function,
+                "self_samples": own[function],
+                "total_samples": total[function],
+                "self_percent": round(100 * own[function] / max(1, sum(own.values())), 2)
+            }
+            for function, _ in own.most_common(limit)
+        ]
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    One CPU profile and one allocation trace at a time for this worker process
+
+    Results are kept until the next profile starts, so they can be fetched
+    after the profile stopped itself.
+    """
+
+    def __init__(self):
+        self.cpu: Optional[Dict[str, Any]] = None
+        self._sampler: Optional[StackSampler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._stop_task: Optional[asyncio.Task] = None
+        self._started = 0.0
+
+    @property
+    def cpu_running(self) -> bool:
+        """True until the profile has fully stopped, including while the sampler thread finishes"""
+        return self.cpu is not None and self.cpu["status"] in ("running", "stopping")
+
+    def start_cpu(self, seconds: float, mode: str, interval: float) -> Dict[str, Any]:
+        """
+        Start a CPU profile that stops itself after seconds; raises RuntimeError if one is running
+        """
+        if self.cpu_running:
+            raise RuntimeError("A CPU profile is already running")
+
+        self._sampler = None
+        self._cprofile = None
+        if mode == CPROFILE:
+            # cProfile traces only the calling thread: the event loop, where requests run
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler(interval)
+            self._sampler.start()
+
+        self.cpu = {
+            "status": "running",
+            "mode": mode,
+            "pid": os.getpid(),
+            "seconds": seconds,
+            "interval": interval if mode == SAMPLING else None,
+            "started_at": datetime.utcnow(),
+            "stopped_at": None,
+            "samples": None
+        }
+        self._started = time.perf_counter()
+        self._stop_task = asyncio.ensure_future(self._stop_after(seconds))
+        return dict(self.cpu)
+
+    async def _stop_after(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+        await self.stop_cpu()
+
+    async def stop_cpu(self) -> Optional[Dict[str, Any]]:
+        """
+        Stop the running CPU profile, if any, and return its status
+
+        The sampler thread is joined off the event loop; until it has exited
+        the status is "stopping" and results are not read. A call made while
+        another is stopping the profile returns that status without waiting.
+        """
+        if self.cpu is None or self.cpu["status"] != "running":
+            return dict(self.cpu) if self.cpu else None
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._stop_task is not None and self._stop_task is not asyncio.current_task():
+            self._stop_task.cancel()
+        self._stop_task = None
+        self.cpu["status"] = "stopping"
+        self.cpu["stopped_at"] = datetime.utcnow()
+        self.cpu["seconds"] = round(time.perf_counter() - self._started, 3)
+
+        sampler = self._sampler
+        try:
+            if sampler is not None:
+                sampler.stop()
+                await asyncio.to_thread(sampler.join)
+        finally:
+            # Even if the caller is cancelled, so the next profile can start
+            if sampler is not None:
+                self.cpu["samples"] = sampler.samples
+            self.cpu["status"] = "completed"
+        return dict(self.cpu)
+
+    def top_functions(self, limit: int, sort: str = "cumulative") -> List[Dict[str, Any]]:
+        """
+        Hottest functions of the last CPU profile
+        """
+        if self._sampler is not None:
+            return self._sampler.top_functions(limit)
+        if self._cprofile is None:
+            return []
+
+        stats = pstats.Stats(self._cprofile, stream=io.StringIO())
+        rows = [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "self_seconds": round(self_time, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            }
+            for (filename, line, name), (primitive_calls, calls, self_time, cumulative, _) in stats.stats.items()
+        ]
+        key = "self_seconds" if sort == "self" else "cumulative_seconds"
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:limit]
+
+    def collapsed_stacks(self) -> Optional[str]:
+        """
+        Collapsed stacks of the last sampling profile; None for cProfile profiles
+        """
+        if self._sampler is None:
+            return None
+        return self._sampler.collapsed()
+
+    def start_memory(self, frames: int) -> None:
+        """
+        Start tracing allocations with frames of traceback each (restarts an active trace)
+        """
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames)
+
+    def stop_memory(self) -> None:
+        """
+        Stop tracing allocations and free the trace
+        """
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def memory_snapshot(self, limit: int, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Top allocations by size; raises RuntimeError unless tracing is active
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Allocation tracing is not active")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "top": [
+                {
+                    "traceback": [f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in stat.traceback],
+                    "size_bytes": stat.size,
+                    "count": stat.count
+                }
+                for stat in snapshot.statistics(group_by)[:limit]
+            ]
+        }
+
+    async def shutdown(self) -> None:
+        """
+        Stop any running profile or trace
+        """
+        await self.stop_cpu()
+        self.stop_memory()
+
+
+# Global profiler instance (profiles the worker process that serves the request)
+profiler = Profiler()
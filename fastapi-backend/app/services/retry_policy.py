@@ -0,0 +1,180 @@
+"""
+Retry Policy
+Retries idempotent HTTP calls on connect errors, timeouts, 5xx and 429 with
+exponential backoff and full jitter, bounded by a shared retry budget, and
+optionally hedges a second request once a call runs past its kind's p95
+latency
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, NamedTuple, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Errors raised before or while waiting on the server; for idempotent calls it is safe to send again
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+# Latency samples needed before a kind's p95 is trusted for hedging
+MIN_LATENCY_SAMPLES = 20
+
+
+class RetryPolicy(NamedTuple):
+    """How one kind of call is retried and hedged"""
+    max_attempts: int = 3
+    base_delay: float = 0.5  # Seconds; doubles per attempt before jitter
+    max_delay: float = 8.0
+    timeout: float = 60.0  # Seconds per attempt
+    idempotent: bool = True  # Only idempotent calls are retried or hedged
+    hedge: bool = False  # Send a second request once the first runs past the p95 latency
+
+
+class RetryBudget:
+    """
+    Token bucket capping retries and hedges to a fraction of calls
+
+    Every call deposits ratio tokens and every extra request withdraws one,
+    so when the service is down the extra load stays near ratio instead of
+    multiplying by max_attempts.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per call kind"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, kind: str, seconds: float) -> None:
+        self._samples[kind].append(seconds)
+
+    def percentile(self, kind: str, q: float = 0.95) -> Optional[float]:
+        """Latency at quantile q, or None until MIN_LATENCY_SAMPLES are recorded"""
+        samples = self._samples.get(kind)
+        if not samples or len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt (1-based)"""
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1)))
+
+
+def retry_after_delay(response: httpx.Response, policy: RetryPolicy) -> Optional[float]:
+    """Seconds requested by a Retry-After header (capped at max_delay), if given as seconds"""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return min(policy.max_delay, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+class RetryingCaller:
+    """Runs HTTP calls under per-kind retry policies sharing one budget and latency history"""
+
+    def __init__(
+        self,
+        policies: Dict[str, RetryPolicy],
+        budget: Optional[RetryBudget] = None,
+        latencies: Optional[LatencyTracker] = None
+    ):
+        self.policies = policies
+        self.budget = budget or RetryBudget()
+        self.latencies = latencies or LatencyTracker()
+
+    def policy(self, kind: str) -> RetryPolicy:
+        return self.policies.get(kind) or RetryPolicy()
+
+    async def call(self, kind: str, send: Callable[[float], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Call send(timeout) under kind's policy and return the successful response
+
+        Raises the last error (httpx.HTTPStatusError for error statuses) once
+        attempts or the retry budget run out.
+        """
+        policy = self.policy(kind)
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                response = await self._attempt(kind, policy, send)
+            except RETRYABLE_ERRORS as e:
+                if not self._may_retry(policy, attempt):
+                    raise
+                delay = backoff_delay(policy, attempt)
+                logger.warning(f"Mastra {kind} call failed ({e.__class__.__name__}); retry {attempt} in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or not self._may_retry(policy, attempt):
+                    response.raise_for_status()
+                    return response
+                delay = retry_after_delay(response, policy)
+                if delay is None:
+                    delay = backoff_delay(policy, attempt)
+                logger.warning(f"Mastra {kind} call returned HTTP {response.status_code}; retry {attempt} in {delay:.2f}s")
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _may_retry(self, policy: RetryPolicy, attempt: int) -> bool:
+        return policy.idempotent and attempt < policy.max_attempts and self.budget.withdraw()
+
+    async def _timed(self, kind: str, policy: RetryPolicy, send: Callable[[float], Awaitable[httpx.Response]]) -> httpx.Response:
+        started = time.perf_counter()
+        response = await send(policy.timeout)
+        if response.status_code < 400:
+            self.latencies.record(kind, time.perf_counter() - started)
+        return response
+
+    async def _attempt(self, kind: str, policy: RetryPolicy, send: Callable[[float], Awaitable[httpx.Response]]) -> httpx.Response:
+        hedge_after = self.latencies.percentile(kind) if policy.hedge and policy.idempotent else None
+        if hedge_after is None:
+            return await self._timed(kind, policy, send)
+
+        primary = asyncio.ensure_future(self._timed(kind, policy, send))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done or not self.budget.withdraw():
+            return await primary
+
+        logger.info(f"Mastra {kind} call exceeded p95 ({hedge_after:.2f}s); sending hedged request")
+        pending = {primary, asyncio.ensure_future(self._timed(kind, policy, send))}
+        outcome: Any = None
+        try:
+            # First usable response wins; an error or retryable status waits for the other request
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.exception() or task.result()
+                    if isinstance(outcome, httpx.Response) and outcome.status_code not in RETRYABLE_STATUS_CODES:
+                        return outcome
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
@@ -0,0 +1,181 @@
+"""
+Processing Status Events
+Status changes are published with Postgres NOTIFY in the transaction that
+makes them; each worker process LISTENs on one dedicated connection and
+fans events out to the SSE/WebSocket subscribers of the affected messages
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+import asyncpg
+
+from app.config import settings
+from app.models.hl7_models import ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL = "hl7_message_status"
+
+# Progress and step reported for a status when no finer step was recorded
+STATUS_PROGRESS: Dict[str, Tuple[int, str]] = {
+    ProcessingStatus.PENDING.value: (10, "Queued for processing"),
+    ProcessingStatus.PROCESSING.value: (50, "Converting formats"),
+    ProcessingStatus.COMPLETED.value: (100, "Completed"),
+    ProcessingStatus.FAILED.value: (0, "Failed"),
+    ProcessingStatus.PARTIAL.value: (75, "Partially completed"),
+}
+
+TERMINAL_STATUSES = frozenset({
+    ProcessingStatus.COMPLETED.value,
+    ProcessingStatus.FAILED.value,
+    ProcessingStatus.PARTIAL.value,
+})
+
+# Steps of the Mastra conversion pipeline as (progress, current_step)
+CONVERTING_STEP = (25, "Converting formats with Mastra")
+SAVING_STEP = (80, "Saving converted formats")
+
+# NOTIFY payloads are limited to 8000 bytes
+MAX_ERROR_LENGTH = 1000
+
+
+def status_payload(
+    message_id: uuid.UUID,
+    status: str,
+    progress: Optional[int],
+    current_step: Optional[str],
+    error_message: Optional[str] = None,
+    updated_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    JSON-ready ProcessingStatusResponse fields; rows without a recorded step get the status defaults
+    """
+    if current_step is None:
+        progress, current_step = STATUS_PROGRESS.get(status, (0, None))
+    return {
+        "message_id": str(message_id),
+        "status": status,
+        "progress": progress or 0,
+        "current_step": current_step,
+        "error_message": error_message[:MAX_ERROR_LENGTH] if error_message else None,
+        "updated_at": updated_at.isoformat() if updated_at else None
+    }
+
+
+class StatusSubscription:
+    """Queue of status events for a changing set of message IDs"""
+
+    def __init__(self, broadcaster: "StatusBroadcaster", max_events: int):
+        self.broadcaster = broadcaster
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=max_events)
+        self.message_ids: Set[uuid.UUID] = set()
+
+    def add(self, message_ids: Iterable[uuid.UUID]) -> None:
+        for message_id in message_ids:
+            self.message_ids.add(message_id)
+            self.broadcaster._subscribers[message_id].add(self)
+
+    def remove(self, message_ids: Iterable[uuid.UUID]) -> None:
+        for message_id in list(message_ids):
+            self.message_ids.discard(message_id)
+            subscribers = self.broadcaster._subscribers.get(message_id)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self.broadcaster._subscribers[message_id]
+
+    def put(self, event: Optional[Dict[str, Any]]) -> None:
+        # A stalled client is resynced from current statuses rather than blocking the listener
+        # or silently losing events (possibly the terminal one)
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = None
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Next event; raises asyncio.TimeoutError when idle and returns None when events may
+        have been missed (the listener reconnected or the queue overflowed)
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class StatusBroadcaster:
+    """Routes NOTIFY events from one LISTEN connection to subscriptions by message ID"""
+
+    def __init__(self, max_events: int = 1000):
+        self.max_events = max_events
+        self._subscribers: Dict[uuid.UUID, Set[StatusSubscription]] = defaultdict(set)
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_listening(self) -> None:
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            self._connection = await asyncpg.connect(settings.DATABASE_URL)
+            await self._connection.add_listener(STATUS_CHANNEL, self._on_notify)
+            self._connection.add_termination_listener(self._on_terminate)
+
+    def _on_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            subscriptions = self._subscribers.get(uuid.UUID(event["message_id"]), ())
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed status notification: {e}")
+            return
+        for subscription in list(subscriptions):
+            subscription.put(event)
+
+    def _on_terminate(self, connection: asyncpg.Connection) -> None:
+        # Events may have been missed; None tells every subscriber to re-read current statuses
+        logger.warning("Status listener connection closed; subscribers will resynchronize")
+        self._connection = None
+        for subscription in self.subscriptions():
+            subscription.put(None)
+
+    def subscriptions(self) -> Set[StatusSubscription]:
+        """
+        Subscriptions currently following at least one message
+        """
+        return {subscription for subscriptions in self._subscribers.values() for subscription in subscriptions}
+
+    @asynccontextmanager
+    async def subscribe(self, message_ids: Iterable[uuid.UUID] = ()) -> AsyncIterator[StatusSubscription]:
+        """
+        Subscribe to status events; read current statuses after entering so no change is missed
+        """
+        await self._ensure_listening()
+        subscription = StatusSubscription(self, self.max_events)
+        subscription.add(message_ids)
+        try:
+            yield subscription
+        finally:
+            subscription.remove(subscription.message_ids)
+
+    async def reconnect(self) -> None:
+        """
+        Re-establish the LISTEN connection after a termination
+        """
+        await self._ensure_listening()
+
+    async def close(self) -> None:
+        """
+        Close the LISTEN connection
+        """
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            connection.remove_termination_listener(self._on_terminate)
+            await connection.close()
+
+
+# Global broadcaster instance (one LISTEN connection per worker process)
+status_broadcaster = StatusBroadcaster()
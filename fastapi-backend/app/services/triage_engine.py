@@ -0,0 +1,429 @@
+"""
+Rule-based Triage Engine
+Scores HL7 messages without the AI service. Batches are split into chunks
+that run across a process pool, and results are handed back per chunk as
+each one finishes so large ward submissions never block the event loop.
+Scoring rules come from a declarative JSON file (triage_rules.json) that is
+compiled once into keyword matchers
+"""
+
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.hl7_message import HL7MessageView
+
+logger = logging.getLogger(__name__)
+
+# (position in the request, triage result)
+IndexedResult = Tuple[int, Dict[str, Any]]
+
+DEFAULT_TRIAGE_RULES_FILE = os.path.join(os.path.dirname(__file__), "triage_rules.json")
+
+
+class KeywordTiers:
+    """
+    Ordered keyword tiers compiled into one regex alternation
+
+    Keywords match as case-insensitive substrings and the best (first) tier
+    found wins. Each search resumes one character past the previous match's
+    start, so a lower-tier keyword never hides an overlapping higher-tier one.
+    """
+
+    def __init__(self, tiers: Sequence[Dict[str, Any]]):
+        self.scores = [tier.get("score", 0) for tier in tiers]
+        self._tier_of: Dict[str, int] = {}
+        for index, tier in enumerate(tiers):
+            for keyword in tier["keywords"]:
+                if keyword:
+                    self._tier_of.setdefault(keyword.lower(), index)
+
+        # At each offset the regex takes the first alternative that matches, so list the best tiers first
+        keywords = sorted(self._tier_of, key=lambda keyword: (self._tier_of[keyword], -len(keyword)))
+        self._pattern = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+
+    def match(self, text: Optional[str]) -> Optional[int]:
+        """Index of the best tier with a keyword in text, or None"""
+        if not text or self._pattern is None:
+            return None
+
+        text = text.lower()
+        best = None
+        found = self._pattern.search(text)
+        while found is not None:
+            tier = self._tier_of[found.group()]
+            if best is None or tier < best:
+                best = tier
+                if best == 0:
+                    break
+            found = self._pattern.search(text, found.start() + 1)
+        return best
+
+    def score(self, text: Optional[str]) -> int:
+        tier = self.match(text)
+        return 0 if tier is None else self.scores[tier]
+
+
+class TriageRules:
+    """Severity scoring rules; see triage_rules.json for the format"""
+
+    # Observation kinds, in OBX-3 matching precedence
+    CHIEF_COMPLAINT = 0
+    VITAL_SIGN = 1
+
+    def __init__(self, config: Dict[str, Any]):
+        self.base_score = config["base_score"]
+        self.min_score = config["min_score"]
+        self.max_score = config["max_score"]
+        self.message_type_scores = {key.upper(): score for key, score in config.get("message_type", {}).items()}
+        self.admit_type = KeywordTiers(config.get("admit_type", []))
+        self.chief_complaint = KeywordTiers(config.get("chief_complaint", []))
+        self.location = KeywordTiers(config.get("location", []))
+        self.observation_kind = KeywordTiers([
+            {"keywords": config.get("chief_complaint_codes", [])},
+            {"keywords": config.get("vital_sign_codes", [])}
+        ])
+        # Highest threshold first; a null min_score is the catch-all level
+        self.priority_levels = sorted(
+            config["priority_levels"],
+            key=lambda level: float("-inf") if level["min_score"] is None else level["min_score"],
+            reverse=True
+        )
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "TriageRules":
+        """
+        Load rules from path, settings.TRIAGE_RULES_FILE or the bundled triage_rules.json
+        """
+        with open(path or settings.TRIAGE_RULES_FILE or DEFAULT_TRIAGE_RULES_FILE, encoding="utf-8") as rules_file:
+            return cls(json.load(rules_file))
+
+    def score(self, clinical_info: Dict[str, Any]) -> int:
+        score = self.base_score
+        score += self.message_type_scores.get(clinical_info.get("message_type", "").upper(), 0)
+        score += self.admit_type.score(clinical_info.get("admit_type"))
+        score += self.chief_complaint.score(clinical_info.get("chief_complaint"))
+        score += self.location.score(clinical_info.get("location"))
+        return max(self.min_score, min(self.max_score, score))
+
+    def priority_level(self, severity_score: int) -> Dict[str, Any]:
+        for level in self.priority_levels:
+            if level["min_score"] is None or severity_score >= level["min_score"]:
+                return level
+        return self.priority_levels[-1]
+
+
+def triage_message(hl7_content: str, index: int = 0) -> Dict[str, Any]:
+    """
+    Triage one message; index (0-based position in the request) names unidentified patients
+    """
+    try:
+        # Parse HL7 segments
+        message = HL7MessageView(hl7_content)
+
+        # Initialize patient data
+        patient_info = _parse_patient_info(message)
+        clinical_info = _parse_clinical_info(message)
+
+        # Calculate basic severity score based on available data
+        severity_score = _calculate_severity_score(clinical_info, patient_info)
+        priority_level = _get_priority_level(severity_score)
+        timeline = _get_recommended_timeline(severity_score)
+
+        # Create triage result with real patient data
+        return {
+            "patient_id": patient_info.get("id", f"UNKNOWN_{index+1}"),
+            "patient_name": patient_info.get("name", f"Patient {index+1}"),
+            "severity_score": severity_score,
+            "priority_level": priority_level,
+            "clinical_summary": _generate_clinical_summary(clinical_info, patient_info),
+            "key_findings": _extract_key_findings(clinical_info),
+            "recommended_timeline": timeline,
+            "reasoning": f"Score based on parsed HL7 data: {_get_scoring_reasoning(clinical_info, patient_info)}"
+        }
+
+    except Exception as e:
+        logger.warning(f"Error parsing HL7 message {index+1}: {e}")
+        # Create a basic result for unparseable messages
+        return {
+            "patient_id": f"PARSE_ERROR_{index+1}",
+            "patient_name": f"Patient {index+1} (Parse Error)",
+            "severity_score": 50,  # Default middle score
+            "priority_level": "Non-urgent",
+            "clinical_summary": "Unable to parse HL7 message for detailed analysis",
+            "key_findings": ["HL7 parsing error"],
+            "recommended_timeline": "Routine",
+            "reasoning": "Default score due to HL7 parsing error"
+        }
+
+
+def triage_chunk(start: int, hl7_messages: Sequence[str]) -> List[IndexedResult]:
+    """
+    Triage a contiguous chunk of a request; runs inside pool workers
+    """
+    return [(start + offset, triage_message(hl7_content, start + offset)) for offset, hl7_content in enumerate(hl7_messages)]
+
+
+class TriageEngine:
+    """Runs rule-based triage inline for small batches and across a process pool for large ones"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        inline_max: Optional[int] = None
+    ):
+        self.max_workers = max_workers or settings.TRIAGE_MAX_WORKERS or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size or settings.TRIAGE_CHUNK_SIZE)
+        self.inline_max = settings.TRIAGE_INLINE_MAX if inline_max is None else inline_max
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Workers are spawned (not forked) so they never inherit the event loop or open connections
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker processes (they are started again on demand)
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _chunk_size_for(self, count: int) -> int:
+        """Spread a batch over every worker, but never exceed chunk_size per task"""
+        return max(1, min(self.chunk_size, math.ceil(count / self.max_workers)))
+
+    async def iter_results(
+        self,
+        hl7_messages: Sequence[str],
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[List[IndexedResult]]:
+        """
+        Yield (index, result) lists chunk by chunk, in completion order
+
+        chunk_size caps the messages per chunk; smaller chunks get the first
+        results out sooner at some extra dispatch cost.
+        """
+        if len(hl7_messages) <= self.inline_max:
+            size = chunk_size or len(hl7_messages) or 1
+            for start in range(0, len(hl7_messages), size):
+                yield await run_in_threadpool(triage_chunk, start, list(hl7_messages[start:start + size]))
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        size = self._chunk_size_for(len(hl7_messages))
+        if chunk_size:
+            size = min(size, chunk_size)
+        futures = [
+            loop.run_in_executor(executor, triage_chunk, start, list(hl7_messages[start:start + size]))
+            for start in range(0, len(hl7_messages), size)
+        ]
+
+        try:
+            for future in asyncio.as_completed(futures):
+                yield await future
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for the next request
+            logger.error("Triage process pool broke; restarting it on next use")
+            # Stop its surviving workers, unless another request already replaced it
+            if self._executor is executor:
+                self.shutdown()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def analyze(self, hl7_messages: Sequence[str]) -> Dict[str, Any]:
+        """
+        Triage a whole batch and return results sorted by severity (highest first)
+        """
+        indexed: List[IndexedResult] = []
+        async for chunk in self.iter_results(hl7_messages):
+            indexed.extend(chunk)
+        return self.build_response(indexed)
+
+    def build_response(self, indexed: List[IndexedResult]) -> Dict[str, Any]:
+        """
+        Rank collected (index, result) pairs into the triage response
+        """
+        # Ties keep request order, as with sequential processing
+        indexed.sort(key=lambda item: (-item[1]["severity_score"], item[0]))
+        results = [result for _, result in indexed]
+
+        return {
+            "success": True,
+            "data": results,
+            "metadata": {
+                "patientsAnalyzed": len(results),
+                "timestamp": "2024-12-01T12:00:00Z",
+                "triageProtocols": ["Rule-based parsing", "HL7 direct analysis"],
+                "fallback_mode": True
+            }
+        }
+
+
+def _parse_patient_info(message: HL7MessageView) -> Dict[str, str]:
+    """Extract patient information from HL7 PID segment"""
+    patient_info = {"id": "", "name": "", "dob": "", "gender": ""}
+
+    if message.segment("PID") is None:
+        return patient_info
+
+    # Extract patient ID from PID.3
+    patient_info["id"] = message["PID-3.1"] or ""
+
+    # Extract patient name from PID.5 (LAST^FIRST^MIDDLE)
+    last_name = message["PID-5.1"] or ""
+    first_name = message["PID-5.2"] or ""
+    if first_name or last_name:
+        patient_info["name"] = f"{first_name} {last_name}".strip()
+    else:
+        patient_info["name"] = message["PID-5"] or ""
+
+    # Extract DOB from PID.7 and gender from PID.8
+    patient_info["dob"] = message["PID-7"] or ""
+    patient_info["gender"] = message["PID-8"] or ""
+
+    return patient_info
+
+
+def _parse_clinical_info(message: HL7MessageView) -> Dict[str, Any]:
+    """Extract clinical information from various HL7 segments"""
+    clinical_info = {
+        "message_type": "",
+        "chief_complaint": "",
+        "observations": [],
+        "vital_signs": {},
+        "admit_type": "",
+        "location": ""
+    }
+
+    # Message type from MSH.9
+    clinical_info["message_type"] = message["MSH-9.1"] or ""
+
+    # Visit information from PV1.2 (patient class) and PV1.3 (assigned location)
+    clinical_info["admit_type"] = message["PV1-2"] or ""
+    clinical_info["location"] = message["PV1-3"] or ""
+
+    # Observations: OBX.3 identifier paired with OBX.5 value
+    for obs_type, obs_value in zip(message["OBX[*]-3"], message["OBX[*]-5"]):
+        if obs_type is None and obs_value is None:
+            continue
+        obs_type = obs_type or ""
+        obs_value = obs_value or ""
+
+        kind = triage_rules.observation_kind.match(obs_type)
+        if kind == TriageRules.CHIEF_COMPLAINT:
+            clinical_info["chief_complaint"] = obs_value
+        elif kind == TriageRules.VITAL_SIGN:
+            clinical_info["vital_signs"][obs_type] = obs_value
+        else:
+            clinical_info["observations"].append(f"{obs_type}: {obs_value}")
+
+    return clinical_info
+
+
+def _calculate_severity_score(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> int:
+    """Calculate severity score based on parsed HL7 data"""
+    return triage_rules.score(clinical_info)
+
+
+def _get_priority_level(severity_score: int) -> str:
+    """Get priority level based on severity score"""
+    return triage_rules.priority_level(severity_score)["priority"]
+
+
+def _get_recommended_timeline(severity_score: int) -> str:
+    """Get recommended timeline based on severity score"""
+    return triage_rules.priority_level(severity_score)["timeline"]
+
+
+def _generate_clinical_summary(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> str:
+    """Generate a clinical summary from parsed data"""
+    summary_parts = []
+
+    if clinical_info.get("message_type"):
+        summary_parts.append(f"Message type: {clinical_info['message_type']}")
+
+    if clinical_info.get("chief_complaint"):
+        summary_parts.append(f"Chief complaint: {clinical_info['chief_complaint']}")
+
+    if clinical_info.get("admit_type"):
+        summary_parts.append(f"Admission type: {clinical_info['admit_type']}")
+
+    if clinical_info.get("location"):
+        summary_parts.append(f"Location: {clinical_info['location']}")
+
+    if not summary_parts:
+        summary_parts.append("Clinical assessment based on available HL7 data")
+
+    return ". ".join(summary_parts)
+
+
+def _extract_key_findings(clinical_info: Dict[str, Any]) -> List[str]:
+    """Extract key findings from clinical data"""
+    findings = []
+
+    if clinical_info.get("chief_complaint"):
+        findings.append(f"Chief complaint: {clinical_info['chief_complaint']}")
+
+    if clinical_info.get("vital_signs"):
+        findings.append("Vital signs recorded")
+
+    if clinical_info.get("observations"):
+        findings.extend(clinical_info["observations"][:3])  # Limit to first 3
+
+    if clinical_info.get("location"):
+        findings.append(f"Location: {clinical_info['location']}")
+
+    if not findings:
+        findings.append("HL7 message processed")
+
+    return findings
+
+
+def _get_scoring_reasoning(clinical_info: Dict[str, Any], patient_info: Dict[str, str]) -> str:
+    """Provide reasoning for the calculated score"""
+    factors = []
+
+    msg_type = clinical_info.get("message_type", "")
+    if msg_type:
+        factors.append(f"message type ({msg_type})")
+
+    admit_type = clinical_info.get("admit_type", "")
+    if admit_type:
+        factors.append(f"admission type ({admit_type})")
+
+    if clinical_info.get("chief_complaint"):
+        factors.append("chief complaint analysis")
+
+    location = clinical_info.get("location", "")
+    if location:
+        factors.append(f"location ({location})")
+
+    if factors:
+        return ", ".join(factors)
+    else:
+        return "baseline HL7 data analysis"
+
+
+# Global rules (loaded once per process, pool workers included) and engine instances
+triage_rules = TriageRules.load()
+triage_engine = TriageEngine()
@@ -3,6 +3,7 @@ HL7 Data Unescaping and Normalization Utilities
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, Optional
 
 class HL7DataProcessor:
@@ -254,5 +255,18 @@ class HL7DataProcessor:
         return self.normalize_field(text)
 
 
-# Global processor instance
-hl7_processor = HL7DataProcessor()
\ No newline at end of file
+# Global processor instance (default encoding characters)
+hl7_processor = HL7DataProcessor()
+
+
+@lru_cache(maxsize=32)
+def processor_for(encoding_chars: str) -> HL7DataProcessor:
+    """
+    Processor for a message's MSH-2 encoding characters
+    
+    Instances are shared per distinct encoding characters and must not be
+    reconfigured, so concurrent parses never switch each other's delimiters.
+    """
+    processor = HL7DataProcessor()
+    processor.extract_encoding_chars(f"MSH|{encoding_chars}")
+    return processor
\ No newline at end of file
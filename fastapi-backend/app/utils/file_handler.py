@@ -3,12 +3,16 @@ File handling utilities for HL7 LiteBoard
 """
 
 import os
+import json
+import tarfile
+import zipfile
 import aiofiles
-from typing import List, Optional, Tuple
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 from datetime import datetime
 
 from app.config import settings
+from app.utils.hl7_tokenizer import first_segment
 
 class FileHandler:
     """Handles file operations for HL7 files"""
@@ -49,6 +53,15 @@ class FileHandler:
             async with aiofiles.open(file_path, "r", encoding="latin-1") as f:
                 return await f.read()
     
+    def decode_content(self, content: bytes) -> str:
+        """
+        Decode uploaded bytes as UTF-8, falling back to latin-1
+        """
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            return content.decode('latin-1')
+    
     async def read_sample_file(self, filename: str) -> Tuple[str, str]:
         """
         Read sample file content and return (filename, content)
@@ -164,11 +177,101 @@ class FileHandler:
         if not content or len(content.strip()) < 10:
             return False
         
-        # Check if it starts with MSH segment
-        lines = content.strip().split('\n')
-        first_line = lines[0].strip()
+        # Check if it starts with MSH segment, or a batch envelope (FHS/BHS)
+        first_line = first_segment(content)
+        
+        return first_line.startswith(("MSH|", "FHS|", "BHS|"))
+
+    def detect_archive_format(self, filename: str, fileobj: BinaryIO) -> str:
+        """
+        Detect whether an uploaded archive is a zip, tar or NDJSON file
+        """
+        name = (filename or "").lower()
+        
+        if name.endswith(".zip"):
+            return "zip"
+        if name.endswith((".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")):
+            return "tar"
+        if name.endswith((".ndjson", ".jsonl")):
+            return "ndjson"
+        
+        # Fall back to magic bytes
+        position = fileobj.tell()
+        header = fileobj.read(262)
+        fileobj.seek(position)
+        
+        if header.startswith(b"PK\x03\x04"):
+            return "zip"
+        if header.startswith((b"\x1f\x8b", b"BZh", b"\xfd7zXZ")) or header[257:262] == b"ustar":
+            return "tar"
+        return "ndjson"
+    
+    def iter_archive_entries(
+        self,
+        fileobj: BinaryIO,
+        filename: str
+    ) -> Iterator[Tuple[str, Optional[Union[bytes, str]], Optional[str]]]:
+        """
+        Iterate over the entries of a zip, tar or NDJSON archive without extracting to disk
+        
+        Yields (entry_name, content, error) one entry at a time, so memory is
+        bounded by the largest entry. NDJSON lines are either a JSON string of
+        HL7 content or an object with "content" (or "hl7_content") and an
+        optional "filename"; their content is yielded as already-decoded text.
+        """
+        archive_format = self.detect_archive_format(filename, fileobj)
+        
+        if archive_format == "zip":
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or self._is_archive_metadata(info.filename):
+                        continue
+                    if info.file_size > settings.MAX_FILE_SIZE:
+                        yield info.filename, None, f"Entry exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+                        continue
+                    with archive.open(info) as entry:
+                        yield info.filename, entry.read(), None
+        
+        elif archive_format == "tar":
+            # Stream mode reads members sequentially without seeking
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or self._is_archive_metadata(member.name):
+                        continue
+                    if member.size > settings.MAX_FILE_SIZE:
+                        yield member.name, None, f"Entry exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+                        continue
+                    entry = archive.extractfile(member)
+                    yield member.name, entry.read() if entry else None, None if entry else "Unreadable entry"
         
-        return first_line.startswith("MSH|")
+        else:
+            for line_number, line in enumerate(fileobj, start=1):
+                if not line.strip():
+                    continue
+                entry_name = f"{filename or 'upload'}:{line_number}"
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    yield entry_name, None, f"Invalid JSON on line {line_number}: {e}"
+                    continue
+                
+                if isinstance(item, dict):
+                    content = item.get("content") or item.get("hl7_content")
+                    entry_name = item.get("filename") or entry_name
+                else:
+                    content = item
+                
+                if not isinstance(content, str):
+                    yield entry_name, None, f"Line {line_number} has no HL7 content"
+                    continue
+                yield entry_name, content, None
+    
+    def _is_archive_metadata(self, name: str) -> bool:
+        """
+        Skip OS metadata entries such as __MACOSX/ and ._ resource forks
+        """
+        base = os.path.basename(name)
+        return name.startswith("__MACOSX/") or base.startswith("._") or base == ".DS_Store"
 
 
 # Global file handler instance
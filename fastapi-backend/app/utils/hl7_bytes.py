@@ -0,0 +1,271 @@
+"""
+Byte-level HL7 tokenizer
+Locates segments and fields in raw upload bytes as offsets, decoding only the
+fields that are read (using the MSH-18 character set) instead of the whole file
+"""
+
+import re
+from array import array
+from typing import Dict, List, Optional, Union
+
+from app.utils.hl7_tokenizer import iter_segments
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Fields needed to build a message record at ingest time
+HEADER_FIELDS = ("MSH-9", "PID-3", "PID-5", "PID-7", "PID-8", "PV1-19", "PV1-44", "PV1-45")
+
+# MSH-18 character set values (HL7 table 0211) mapped to Python codecs
+HL7_CHARSETS = {
+    "ASCII": "ascii",
+    "ISO IR6": "ascii",
+    "8859/1": "latin-1",
+    "ISO IR100": "latin-1",
+    "8859/2": "iso8859-2",
+    "8859/3": "iso8859-3",
+    "8859/4": "iso8859-4",
+    "8859/5": "iso8859-5",
+    "8859/6": "iso8859-6",
+    "8859/7": "iso8859-7",
+    "8859/8": "iso8859-8",
+    "8859/9": "iso8859-9",
+    "8859/15": "iso8859-15",
+    "ISO IR87": "iso2022_jp",
+    "ISO IR159": "iso2022_jp_2",
+    "BIG-5": "big5",
+    "CNS 11643-1992": "big5",
+    "GB 18030-2000": "gb18030",
+    "KS X 1001": "euc_kr",
+    "UNICODE": "utf-8",
+    "UNICODE UTF-8": "utf-8",
+}
+
+_SEGMENT = re.compile(rb"[^\r\n]+")
+_LINE_END = re.compile(rb"[\r\n]")
+_NON_BLANK = re.compile(rb"[^\s\x1c]")
+
+# MSH and batch/file envelope segments at the start of a line
+_MESSAGE_BOUNDARY = re.compile(rb"(?:\A|[\r\n])[ \t\x0b\x1c]*(MSH|FHS|BHS|BTS|FTS)")
+
+# Leading MLLP start block / whitespace before a segment ID
+_SEGMENT_LEAD = b" \t\x0b\x1c"
+
+
+def resolve_charset(value: Optional[str]) -> Optional[str]:
+    """
+    Map an MSH-18 value to a Python codec name, or None if unknown/absent
+    """
+    if not value:
+        return None
+    return HL7_CHARSETS.get(value.strip().upper())
+
+
+class RawHL7Message:
+    """
+    Offset index over the bytes of a single HL7 message
+
+    Segments are found lazily and only as far as the requested segment, and
+    field boundaries are stored as array('I') offsets per segment, so reading
+    the header of a very large message touches only its first few segments.
+    """
+
+    def __init__(self, data: BytesLike):
+        self._view = memoryview(data)
+        self._segment_starts = array("I")
+        self._segment_ends = array("I")
+        self._scan_position = 0
+        self._scan_done = False
+        self._field_ends: Dict[int, array] = {}
+        self._field_separator: Optional[int] = None
+        self._charset: Optional[str] = None
+        self._charset_loaded = False
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def _scan_next_segment(self) -> bool:
+        """Index the next segment; False once the message is exhausted"""
+        if self._scan_done:
+            return False
+
+        match = _SEGMENT.search(self._view, self._scan_position)
+        if match is None:
+            self._scan_done = True
+            return False
+
+        start, end = match.span()
+        while start < end and self._view[start] in _SEGMENT_LEAD:
+            start += 1
+        self._scan_position = end
+
+        if start < end:
+            self._segment_starts.append(start)
+            self._segment_ends.append(end)
+        return True
+
+    def _segment_index(self, segment_id: str) -> Optional[int]:
+        """Index of the first segment with the given ID, scanning only as far as needed"""
+        key = segment_id.encode("ascii")
+        position = 0
+
+        while True:
+            while position < len(self._segment_starts):
+                start = self._segment_starts[position]
+                if self._view[start:start + len(key)] == key:
+                    return position
+                position += 1
+            if not self._scan_next_segment():
+                return None
+
+    @property
+    def field_separator(self) -> int:
+        """Field separator byte, declared by MSH-1 (defaults to '|')"""
+        if self._field_separator is None:
+            msh = self._segment_index("MSH")
+            separator = ord("|")
+            if msh is not None:
+                start = self._segment_starts[msh]
+                if self._segment_ends[msh] > start + 3:
+                    separator = self._view[start + 3]
+            self._field_separator = separator
+        return self._field_separator
+
+    def _fields(self, index: int) -> array:
+        """Field end offsets for a segment, computed on first access"""
+        ends = self._field_ends.get(index)
+        if ends is None:
+            start = self._segment_starts[index]
+            end = self._segment_ends[index]
+            pattern = re.compile(re.escape(bytes((self.field_separator,))))
+            ends = array("I", (match.start() for match in pattern.finditer(self._view, start, end)))
+            ends.append(end)
+            self._field_ends[index] = ends
+        return ends
+
+    def field_bytes(self, segment_id: str, number: int) -> Optional[memoryview]:
+        """
+        Get a zero-copy view of a field by HL7 number (e.g. "PID", 5 for PID-5)
+        """
+        index = self._segment_index(segment_id)
+        if index is None or number < 1:
+            return None
+
+        # MSH-1 is the field separator itself, so MSH fields are shifted by one
+        position = number - 1 if segment_id == "MSH" else number
+        ends = self._fields(index)
+        if position >= len(ends):
+            return None
+
+        start = self._segment_starts[index] if position == 0 else ends[position - 1] + 1
+        return self._view[start:ends[position]]
+
+    @property
+    def charset(self) -> Optional[str]:
+        """Python codec for the MSH-18 character set, if declared and known"""
+        if not self._charset_loaded:
+            value = self.field_bytes("MSH", 18)
+            if value is not None and len(value):
+                # Only the first repetition names the default character set
+                declared = str(value, "latin-1")
+                self._charset = resolve_charset(declared.split("~", 1)[0])
+            self._charset_loaded = True
+        return self._charset
+
+    def _decode(self, data: BytesLike) -> str:
+        """Decode with the declared charset, falling back to UTF-8 then latin-1"""
+        for codec in (self.charset, "utf-8"):
+            if codec is None:
+                continue
+            try:
+                return str(data, codec)
+            except (UnicodeDecodeError, LookupError):
+                continue
+        return str(data, "latin-1")
+
+    def field(self, segment_id: str, number: int) -> Optional[str]:
+        """
+        Get a decoded field by HL7 number, or None if the segment or field is absent
+        """
+        value = self.field_bytes(segment_id, number)
+        if value is None:
+            return None
+        return self._decode(value)
+
+    def segment(self, segment_id: str) -> Optional[str]:
+        """
+        Get a whole decoded segment (e.g. "MSH" for encoding characters)
+        """
+        index = self._segment_index(segment_id)
+        if index is None:
+            return None
+        return self._decode(self._view[self._segment_starts[index]:self._segment_ends[index]])
+
+    def header_fields(self) -> Dict[str, Optional[str]]:
+        """
+        Decode only the fields listed in HEADER_FIELDS
+
+        Values are the first repetition, matching HL7MessageView paths, and None
+        when absent or empty. MSH-2 (the encoding characters) is included
+        as-is so callers can normalize the values with the right delimiters.
+        """
+        encoding_chars = self.field("MSH", 2) or ""
+        repetition_separator = encoding_chars[1] if len(encoding_chars) > 1 else "~"
+
+        fields = {"MSH-2": encoding_chars or None}
+        for path in HEADER_FIELDS:
+            segment_id, number = path.split("-")
+            value = self.field(segment_id, int(number))
+            fields[path] = value.split(repetition_separator, 1)[0] or None if value else None
+        return fields
+
+    def is_valid(self) -> bool:
+        """
+        Same check as FileHandler.is_valid_hl7_file, without decoding the message
+        """
+        while not self._segment_starts and self._scan_next_segment():
+            pass
+        if not self._segment_starts:
+            return False
+
+        start = self._segment_starts[0]
+        if self._view[start:start + 4].tobytes() not in (b"MSH|", b"FHS|", b"BHS|"):
+            return False
+        # At least 10 non-blank characters, i.e. something at or beyond offset 9
+        return _NON_BLANK.search(self._view, start + 9) is not None
+
+    def decode(self, segment_separator: str = "\n") -> str:
+        """
+        Decode the whole message, normalizing segment terminators
+        """
+        return segment_separator.join(iter_segments(self._decode(self._view)))
+
+
+def _add_message(view: memoryview, start: int, end: int, messages: List[RawHL7Message]) -> None:
+    if start < end and _NON_BLANK.search(view, start, end):
+        messages.append(RawHL7Message(view[start:end]))
+
+
+def split_raw_messages(data: BytesLike) -> List[RawHL7Message]:
+    """
+    Split raw bytes into messages at MSH segments, dropping FHS/BHS/BTS/FTS envelopes
+
+    Each message is a zero-copy view into data. Only message boundaries are
+    located here; segments and fields are indexed on first access.
+    """
+    view = memoryview(data)
+    messages: List[RawHL7Message] = []
+    position = 0
+
+    for match in _MESSAGE_BOUNDARY.finditer(view):
+        segment_start = match.start(1)
+        _add_message(view, position, segment_start, messages)
+
+        if match.group(1) == b"MSH":
+            position = segment_start
+        else:
+            line_end = _LINE_END.search(view, segment_start)
+            position = line_end.start() if line_end else len(view)
+
+    _add_message(view, position, len(view), messages)
+    return messages
+
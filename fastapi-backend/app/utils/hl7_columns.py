@@ -0,0 +1,225 @@
+"""
+Columnar HL7 header extraction
+Extracts the hl7_messages header columns for many messages at once: one regex
+scan over the whole batch to locate MSH/PID/PV1 fields and NumPy arithmetic
+to parse all timestamps of a column together
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.data_escape import HL7DataProcessor, hl7_processor as data_processor, processor_for
+from app.utils.hl7_bytes import HEADER_FIELDS
+from app.utils.hl7_datetime import DTM_DEFAULTS, DTM_LENGTHS, parse_hl7_date, parse_hl7_timestamp
+from app.utils.hl7_message import HL7MessageView
+
+DEFAULT_ENCODING_CHARS = "^~\\&"
+
+# Raw fields consumed by header_columns: the encoding characters plus HEADER_FIELDS
+HEADER_FIELD_PATHS = ("MSH-2",) + HEADER_FIELDS
+
+# Header segments at the start of a line, with everything after the first field separator
+_HEADER_SEGMENT = re.compile(r"(?:\A|(?<=[\r\n]))[ \t\x0b\x1c]*(MSH|PID|PV1)\|([^\r\n]*)")
+
+# Messages the batch scan can handle: first segment is MSH with the default delimiters
+_DEFAULT_HEADER = re.compile(r"[\s\x1c]*MSH\|\^~\\&\|")
+
+# Output columns, in hl7_messages column names
+STRING_COLUMNS = (
+    "message_type",
+    "trigger_event",
+    "patient_id",
+    "patient_first_name",
+    "patient_last_name",
+    "patient_gender",
+    "visit_number",
+)
+
+
+def _first_repetition(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return value.split("~", 1)[0] or None
+
+
+def timestamp_component(value: Optional[str], processor: HL7DataProcessor = data_processor) -> Optional[str]:
+    """DTM component of a raw TS field (TS.2, the degree of precision, is ignored)"""
+    value = processor.normalize_field(value)
+    if not value:
+        return None
+    return processor.split_field_components(value)[0]
+
+
+def _fields_from_message(message: HL7MessageView) -> Dict[str, Optional[str]]:
+    """Header fields for one message via the path accessor (non-default delimiters)"""
+    fields = {"MSH-2": None}
+    for path in HEADER_FIELDS:
+        fields[path] = message[path]
+
+    # Match extract_basic_info: MSH/PID-3 only count when MSH is the first segment
+    if message.header is None:
+        fields["MSH-9"] = None
+        fields["PID-3"] = None
+    else:
+        fields["MSH-2"] = message["MSH-2"]
+    return fields
+
+
+def scan_header_fields(messages: Sequence[str]) -> Dict[str, List[Optional[str]]]:
+    """
+    Locate the raw header fields (HEADER_FIELDS plus MSH-2) of many messages
+
+    All messages are joined and scanned with a single regex pass; each match
+    is mapped back to its message by offset. Messages that do not start with
+    an MSH segment using the default delimiters go through HL7MessageView instead.
+    """
+    count = len(messages)
+    columns: Dict[str, List[Optional[str]]] = {path: [None] * count for path in HEADER_FIELD_PATHS}
+    if not count:
+        return columns
+
+    # Offsets of each message inside the joined text (joined with one "\n")
+    lengths = np.fromiter((len(message) + 1 for message in messages), dtype=np.int64, count=count)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    batched = np.fromiter((_DEFAULT_HEADER.match(message) is not None for message in messages), dtype=bool, count=count)
+
+    matches = list(_HEADER_SEGMENT.finditer("\n".join(messages)))
+    owners = np.searchsorted(starts, np.fromiter((match.start() for match in matches), dtype=np.int64, count=len(matches)), side="right") - 1
+
+    seen = set()
+    for owner, match in zip(owners.tolist(), matches):
+        segment_id = match.group(1)
+        if not batched[owner] or (owner, segment_id) in seen:
+            continue
+        seen.add((owner, segment_id))
+
+        # parts[0] is field 1 (MSH-2 for MSH, whose field 1 is the separator itself)
+        parts = match.group(2).split("|", 46)
+        if segment_id == "MSH":
+            columns["MSH-2"][owner] = parts[0]
+            columns["MSH-9"][owner] = _first_repetition(parts[7]) if len(parts) > 7 else None
+        elif segment_id == "PID":
+            for number in (3, 5, 7, 8):
+                columns[f"PID-{number}"][owner] = _first_repetition(parts[number - 1]) if len(parts) >= number else None
+        else:
+            for number in (19, 44, 45):
+                columns[f"PV1-{number}"][owner] = _first_repetition(parts[number - 1]) if len(parts) >= number else None
+
+    for index in np.flatnonzero(~batched).tolist():
+        for path, value in _fields_from_message(HL7MessageView(messages[index])).items():
+            columns[path][index] = value
+
+    return columns
+
+
+def parse_timestamp_column(values: Sequence[Optional[str]], date_only: bool = False) -> np.ndarray:
+    """
+    Parse a column of HL7 DTM values into naive UTC datetime64[us]
+
+    Plain digit values at any precision (YYYY up to YYYYMMDDHHMMSS) are padded
+    to full precision and decoded from a fixed-width unicode view of the
+    whole column, so no per-value datetime construction happens in Python;
+    values with fractional seconds or an offset go through the scalar
+    parser. Missing or invalid values are NaT. With date_only, times are
+    dropped as in parse_hl7_date.
+    """
+    count = len(values)
+    padded = [""] * count
+    scalar: List[int] = []
+    for index, value in enumerate(values):
+        if not value:
+            continue
+        if len(value) in DTM_LENGTHS and value.isdigit() and value.isascii():
+            padded[index] = value + DTM_DEFAULTS[len(value):]
+        else:
+            scalar.append(index)
+
+    codes = np.array(padded, dtype="U14").view(np.uint32).reshape(count, 14).astype(np.int64)
+
+    valid = ((codes >= 48) & (codes <= 57)).all(axis=1)
+    digits = np.where(valid[:, None], codes - 48, 0)
+
+    def number(start: int, length: int) -> np.ndarray:
+        weights = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+        return digits[:, start:start + length] @ weights
+
+    year, month, day = number(0, 4), number(4, 2), number(6, 2)
+    valid &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    months = (year - 1970) * 12 + np.clip(month, 1, 12) - 1
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+    next_month = (months + 1).astype("datetime64[M]").astype("datetime64[D]")
+    valid &= day <= (next_month - month_start).astype(np.int64)
+
+    hour, minute, second = number(8, 2), number(10, 2), number(12, 2)
+    valid &= (hour < 24) & (minute < 60) & (second < 60)
+    seconds = np.zeros(count, dtype=np.int64) if date_only else hour * 3600 + minute * 60 + second
+
+    result = month_start.astype("datetime64[us]") + ((day - 1) * 86400 + seconds).astype("timedelta64[s]")
+    result[~valid] = np.datetime64("NaT")
+
+    parse = parse_hl7_date if date_only else parse_hl7_timestamp
+    for index in scalar:
+        parsed = parse(values[index])
+        result[index] = np.datetime64(parsed, "us") if parsed else np.datetime64("NaT")
+    return result
+
+
+def header_columns(fields: Dict[str, Sequence[Optional[str]]]) -> Dict[str, np.ndarray]:
+    """
+    Normalize raw header fields into hl7_messages columns
+
+    Strings become object arrays (None when absent); DOB and admit/discharge
+    dates become datetime64[us] arrays with NaT when absent or invalid.
+    """
+    count = len(fields["MSH-9"])
+    columns = {name: np.full(count, None, dtype=object) for name in STRING_COLUMNS}
+    columns["message_type"][:] = "Unknown"
+
+    dob_values: List[Optional[str]] = [None] * count
+    admit_values: List[Optional[str]] = [None] * count
+    discharge_values: List[Optional[str]] = [None] * count
+
+    for index in range(count):
+        processor = processor_for(fields["MSH-2"][index] or DEFAULT_ENCODING_CHARS)
+
+        message_type_field = fields["MSH-9"][index]
+        if message_type_field:
+            components = processor.split_field_components(message_type_field)
+            columns["message_type"][index] = components[0] or "Unknown"
+            if len(components) > 1:
+                columns["trigger_event"][index] = components[1]
+
+        patient_id_field = fields["PID-3"][index]
+        if patient_id_field:
+            columns["patient_id"][index] = processor.extract_identifier(patient_id_field)
+
+        name_field = fields["PID-5"][index]
+        if name_field:
+            name = processor.clean_patient_name(name_field)
+            columns["patient_first_name"][index] = name["first_name"]
+            columns["patient_last_name"][index] = name["last_name"]
+
+        gender = processor.normalize_field(fields["PID-8"][index])
+        if gender:
+            columns["patient_gender"][index] = gender[0].upper()
+
+        columns["visit_number"][index] = processor.normalize_field(fields["PV1-19"][index]) or None
+
+        dob_values[index] = timestamp_component(fields["PID-7"][index], processor)
+        admit_values[index] = timestamp_component(fields["PV1-44"][index], processor)
+        discharge_values[index] = timestamp_component(fields["PV1-45"][index], processor)
+
+    columns["patient_dob"] = parse_timestamp_column(dob_values, date_only=True)
+    columns["admission_date"] = parse_timestamp_column(admit_values)
+    columns["discharge_date"] = parse_timestamp_column(discharge_values)
+    return columns
+
+
+def extract_header_columns(messages: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Columnar header extraction for a batch of decoded messages
+    """
+    return header_columns(scan_header_fields(messages))
@@ -0,0 +1,115 @@
+"""
+HL7 date/time parsing
+Parses DT/DTM/TS values (YYYY[MM[DD[HH[MM[SS[.S[S[S[S]]]]]]]]][+/-ZZZZ]) by
+fixed-offset integer slicing instead of strptime; results are memoized since
+the same timestamps repeat across the messages of an encounter
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+# Distinct values kept by the parse memo
+DATETIME_CACHE_SIZE = 4096
+
+# Digit counts of the valid precisions: year, month, day, hour, minute, second
+DTM_LENGTHS = frozenset((4, 6, 8, 10, 12, 14))
+
+# Values of the omitted trailing digits at lower precisions (month and day default to 01)
+DTM_DEFAULTS = "00000101000000"
+
+
+def _is_digits(value: str) -> bool:
+    return value.isdigit() and value.isascii()
+
+
+def _parse_offset(value: str) -> Optional[timezone]:
+    """Parse a +ZZZZ/-ZZZZ suffix, or None if malformed"""
+    if len(value) != 5 or not _is_digits(value[1:]):
+        return None
+
+    hours, minutes = int(value[1:3]), int(value[3:5])
+    if hours > 23 or minutes > 59:
+        return None
+
+    offset = timedelta(hours=hours, minutes=minutes)
+    return timezone(-offset if value[0] == "-" else offset)
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def parse_hl7_datetime(value: str) -> Optional[datetime]:
+    """
+    Parse an HL7 DTM value at any precision
+
+    Omitted components default to the start of the period (January, day 1,
+    midnight). Returns an aware datetime when a +/-ZZZZ offset is present, a
+    naive one otherwise, and None for malformed values.
+    """
+    tzinfo = None
+    microsecond = 0
+    if not _is_digits(value):
+        sign = max(value.find("+", 4), value.find("-", 4))
+        if sign != -1:
+            tzinfo = _parse_offset(value[sign:])
+            if tzinfo is None:
+                return None
+            value = value[:sign]
+
+        dot = value.find(".")
+        if dot != -1:
+            fraction = value[dot + 1:]
+            if dot != 14 or not 1 <= len(fraction) <= 4 or not _is_digits(fraction):
+                return None
+            microsecond = int(fraction) * 10 ** (6 - len(fraction))
+            value = value[:dot]
+
+        if not _is_digits(value):
+            return None
+
+    if len(value) not in DTM_LENGTHS:
+        return None
+
+    # Pad to YYYYMMDDHHMMSS and slice the components out of one integer
+    number = int(value + DTM_DEFAULTS[len(value):])
+    try:
+        return datetime(
+            number // 10 ** 10,
+            number // 10 ** 8 % 100,
+            number // 10 ** 6 % 100,
+            number // 10 ** 4 % 100,
+            number // 100 % 100,
+            number % 100,
+            microsecond,
+            tzinfo
+        )
+    except ValueError:
+        return None
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert an aware datetime to naive UTC (the storage convention); naive values pass through
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_hl7_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an HL7 TS/DTM value into a naive UTC datetime for storage
+    """
+    return to_naive_utc(parse_hl7_datetime(value)) if value else None
+
+
+def parse_hl7_date(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an HL7 DT/DTM value as a calendar date (midnight), e.g. a date of birth
+
+    Any time and offset are dropped rather than shifted to UTC, so the
+    recorded date is the one written in the message.
+    """
+    parsed = parse_hl7_datetime(value) if value else None
+    if parsed is None:
+        return None
+    return datetime(parsed.year, parsed.month, parsed.day)
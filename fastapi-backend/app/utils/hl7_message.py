@@ -0,0 +1,373 @@
+"""
+Lazy HL7 message access by terser-style paths
+Exposes fields as msg["PID-5.2"] / msg["OBX[*]-5"] over a single backing
+string with array('I') offset tables, materializing only the values read
+"""
+
+import re
+from array import array
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from app.utils.hl7_tokenizer import iter_segment_spans
+
+# SEG[segment]-FIELD(repetition).COMPONENT.SUBCOMPONENT; all indexes are 1-based
+_PATH = re.compile(
+    r"^(?P<segment>[A-Z][A-Z0-9]{2})"
+    r"(?:\[(?P<segment_index>\*|\d+)\])?"
+    r"-(?P<field>\d+)"
+    r"(?:\((?P<repetition>\*|\d+)\))?"
+    r"(?:\.(?P<component>\d+)(?:\.(?P<subcomponent>\d+))?)?$"
+)
+
+# Wildcard marker for "[*]" / "(*)" in a compiled path
+ALL = -1
+
+PathValue = Union[Optional[str], List[Optional[str]]]
+
+
+class HL7Path(NamedTuple):
+    """Compiled field path; indexes are 0-based, ALL for wildcards, None when omitted"""
+    segment_id: str
+    segment_index: int
+    field: int
+    repetition: int
+    component: Optional[int]
+    subcomponent: Optional[int]
+
+    @property
+    def is_wildcard(self) -> bool:
+        return self.segment_index == ALL or self.repetition == ALL
+
+
+def _index(value: Optional[str]) -> int:
+    if value is None:
+        return 0
+    if value == "*":
+        return ALL
+    if int(value) < 1:
+        raise ValueError("Path indexes are 1-based")
+    return int(value) - 1
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> HL7Path:
+    """
+    Parse a path such as "PID-5.2", "OBX[*]-5" or "PID-3(2).1" once and cache it
+
+    Segment occurrences ([n]) and field repetitions ((n)) default to the
+    first; a path without a component returns the whole repetition.
+    """
+    match = _PATH.match(path)
+    if match is None:
+        raise ValueError(f"Invalid HL7 path '{path}'")
+
+    field = int(match.group("field"))
+    component = match.group("component")
+    subcomponent = match.group("subcomponent")
+    if field < 1 or (component is not None and int(component) < 1) or (subcomponent is not None and int(subcomponent) < 1):
+        raise ValueError(f"Invalid HL7 path '{path}': indexes are 1-based")
+
+    return HL7Path(
+        segment_id=match.group("segment"),
+        segment_index=_index(match.group("segment_index")),
+        field=field,
+        repetition=_index(match.group("repetition")),
+        component=int(component) - 1 if component is not None else None,
+        subcomponent=int(subcomponent) - 1 if subcomponent is not None else None
+    )
+
+
+class HL7Encoding(NamedTuple):
+    """Delimiters declared by MSH-1 and MSH-2"""
+    field: str = "|"
+    component: str = "^"
+    repetition: str = "~"
+    escape: str = "\\"
+    subcomponent: str = "&"
+
+    @classmethod
+    def from_msh(cls, msh_segment: str) -> "HL7Encoding":
+        if not msh_segment.startswith("MSH") or len(msh_segment) < 4:
+            return cls()
+        field = msh_segment[3]
+        encoding_chars = msh_segment[4:].split(field, 1)[0]
+        defaults = cls()
+        return cls(
+            field=field,
+            component=encoding_chars[0] if len(encoding_chars) > 0 else defaults.component,
+            repetition=encoding_chars[1] if len(encoding_chars) > 1 else defaults.repetition,
+            escape=encoding_chars[2] if len(encoding_chars) > 2 else defaults.escape,
+            subcomponent=encoding_chars[3] if len(encoding_chars) > 3 else defaults.subcomponent
+        )
+
+
+class HL7SegmentView:
+    """
+    Lightweight view of one segment of an HL7MessageView
+
+    Holds only the message and segment index; substrings are materialized
+    from the message's offset tables when a value is read.
+    """
+
+    __slots__ = ("message", "index")
+
+    def __init__(self, message: "HL7MessageView", index: int):
+        self.message = message
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        return self.message.segment_text(self.index)
+
+    @property
+    def id(self) -> str:
+        return self.message.segment_id(self.index)
+
+    def field(self, number: int) -> Optional[str]:
+        """
+        Raw field by HL7 number, including all repetitions
+        """
+        span = self.message.field_span(self.index, number)
+        return None if span is None else self.message.content[span[0]:span[1]]
+
+    def repetitions(self, number: int) -> List[str]:
+        """
+        Repetitions of a field
+        """
+        return [self.value(number, repetition) or "" for repetition in range(self.message.repetition_count(self.index, number))]
+
+    def components(self, number: int, repetition: int = 0) -> List[str]:
+        """
+        Components of one repetition of a field
+        """
+        return self.message.split_value(self.index, number, repetition)
+
+    def subcomponents(self, number: int, repetition: int, component: int) -> List[str]:
+        """
+        Subcomponents of one component
+        """
+        return self.message.split_value(self.index, number, repetition, component)
+
+    def value(self, number: int, repetition: int = 0, component: Optional[int] = None, subcomponent: Optional[int] = None) -> Optional[str]:
+        """
+        Value at a position (0-based repetition/component/subcomponent); None when absent or empty
+        """
+        return self.message.value(self.index, number, repetition, component, subcomponent)
+
+
+class HL7MessageView:
+    """
+    Lazily parsed HL7 message addressed by terser-style paths
+
+    msg["PID-5.2"] returns a single value (None when absent or empty);
+    wildcard paths such as msg["OBX[*]-5"] return one entry per matching
+    segment or repetition, so parallel paths (OBX[*]-3 / OBX[*]-5) line up.
+    Values are returned raw; unescaping is left to the caller.
+
+    The message keeps a single backing string. Segment boundaries are one
+    pair of array('I') offset tables, and a segment's field boundaries are
+    indexed into its own array('I') the first time one of its fields is
+    read, so a large ORU costs a few bytes per field instead of a Python
+    string per field. Substrings are only created for values that are read.
+    """
+
+    __slots__ = ("content", "_starts", "_ends", "_by_id", "_fields", "_encoding")
+
+    def __init__(self, content: str):
+        self.content = content
+        self._starts: Optional[array] = None
+        self._ends: Optional[array] = None
+        self._by_id: Optional[Dict[str, array]] = None
+        self._fields: Dict[int, array] = {}
+        self._encoding: Optional[HL7Encoding] = None
+
+    def _index_segments(self) -> None:
+        starts = array("I")
+        ends = array("I")
+        for start, end in iter_segment_spans(self.content):
+            starts.append(start)
+            ends.append(end)
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        if self._starts is None:
+            self._index_segments()
+        return len(self._starts)
+
+    @property
+    def encoding(self) -> HL7Encoding:
+        if self._encoding is None:
+            self._encoding = HL7Encoding.from_msh(self.segment_text(0) if len(self) else "")
+        return self._encoding
+
+    def segment_text(self, index: int) -> str:
+        """Materialize one segment by position"""
+        if self._starts is None:
+            self._index_segments()
+        return self.content[self._starts[index]:self._ends[index]]
+
+    def segment_id(self, index: int) -> str:
+        if self._starts is None:
+            self._index_segments()
+        start = self._starts[index]
+        return self.content[start:start + 3]
+
+    def _segment_indexes(self, segment_id: str) -> array:
+        if self._by_id is None:
+            by_id: Dict[str, array] = {}
+            for index in range(len(self)):
+                by_id.setdefault(self.segment_id(index), array("I")).append(index)
+            self._by_id = by_id
+        return self._by_id.get(segment_id, array("I"))
+
+    def _field_ends(self, index: int) -> array:
+        """Field separator positions (plus the segment end) for one segment"""
+        ends = self._fields.get(index)
+        if ends is None:
+            ends = array("I")
+            end = self._ends[index]
+            separator = self.encoding.field
+            find = self.content.find
+            found = find(separator, self._starts[index], end)
+            while found != -1:
+                ends.append(found)
+                found = find(separator, found + 1, end)
+            ends.append(end)
+            self._fields[index] = ends
+        return ends
+
+    def _part_span(self, start: int, end: int, separator: str, position: int) -> Optional[Tuple[int, int]]:
+        """Bounds of the position-th separator-delimited part of content[start:end]"""
+        find = self.content.find
+        for _ in range(position):
+            found = find(separator, start, end)
+            if found == -1:
+                return None
+            start = found + 1
+        found = find(separator, start, end)
+        return start, (end if found == -1 else found)
+
+    def field_span(self, index: int, number: int) -> Optional[Tuple[int, int]]:
+        """
+        Offsets of a field (all repetitions) by HL7 number
+        """
+        if self._starts is None:
+            self._index_segments()
+        start = self._starts[index]
+
+        if self.segment_id(index) == "MSH":
+            # MSH-1 is the field separator itself, shifting every later field by one
+            if number == 1:
+                return (start + 3, start + 4) if self._ends[index] > start + 3 else None
+            number -= 1
+
+        ends = self._field_ends(index)
+        if number >= len(ends):
+            return None
+        return (start if number == 0 else ends[number - 1] + 1), ends[number]
+
+    def _is_delimiter_field(self, index: int, number: int) -> bool:
+        """MSH-1/MSH-2 hold the delimiters and are never split"""
+        return number <= 2 and self.segment_id(index) == "MSH"
+
+    def _value_span(self, index: int, number: int, repetition: int = 0, component: Optional[int] = None, subcomponent: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        span = self.field_span(index, number)
+        if span is None:
+            return None
+
+        if self._is_delimiter_field(index, number):
+            if repetition or component or subcomponent:
+                return None
+            return span
+
+        # Repetitions and components are short, so they are scanned on demand rather than indexed
+        encoding = self.encoding
+        span = self._part_span(span[0], span[1], encoding.repetition, repetition)
+        if span is None or component is None:
+            return span
+        span = self._part_span(span[0], span[1], encoding.component, component)
+        if span is None or subcomponent is None:
+            return span
+        return self._part_span(span[0], span[1], encoding.subcomponent, subcomponent)
+
+    def value(self, index: int, number: int, repetition: int = 0, component: Optional[int] = None, subcomponent: Optional[int] = None) -> Optional[str]:
+        """
+        Value at a position in the index-th segment; None when absent or empty
+        """
+        span = self._value_span(index, number, repetition, component, subcomponent)
+        if span is None or span[0] == span[1]:
+            return None
+        return self.content[span[0]:span[1]]
+
+    def repetition_count(self, index: int, number: int) -> int:
+        span = self.field_span(index, number)
+        if span is None:
+            return 0
+        if self._is_delimiter_field(index, number):
+            return 1
+        return self.content.count(self.encoding.repetition, span[0], span[1]) + 1
+
+    def split_value(self, index: int, number: int, repetition: int = 0, component: Optional[int] = None) -> List[str]:
+        """
+        Materialize the components of a repetition, or the subcomponents of a component
+        """
+        span = self._value_span(index, number, repetition, component)
+        if span is None:
+            return []
+        text = self.content[span[0]:span[1]]
+        if self._is_delimiter_field(index, number):
+            return [text]
+        return text.split(self.encoding.component if component is None else self.encoding.subcomponent)
+
+    def segments(self, segment_id: Optional[str] = None) -> List[HL7SegmentView]:
+        """
+        Views of all segments, or all segments with the given ID
+        """
+        if segment_id is None:
+            return [HL7SegmentView(self, index) for index in range(len(self))]
+        return [HL7SegmentView(self, index) for index in self._segment_indexes(segment_id)]
+
+    def segment(self, segment_id: str, index: int = 0) -> Optional[HL7SegmentView]:
+        """
+        The index-th (0-based) segment with the given ID
+        """
+        indexes = self._segment_indexes(segment_id)
+        return HL7SegmentView(self, indexes[index]) if index < len(indexes) else None
+
+    @property
+    def header(self) -> Optional[HL7SegmentView]:
+        """The MSH segment when the message starts with one"""
+        if len(self) and self.segment_id(0) == "MSH":
+            return HL7SegmentView(self, 0)
+        return None
+
+    def get(self, path: Union[str, HL7Path], default: PathValue = None) -> PathValue:
+        """
+        Resolve a path, returning default when a single value is absent
+        """
+        compiled = compile_path(path) if isinstance(path, str) else path
+        indexes = self._segment_indexes(compiled.segment_id)
+
+        if compiled.segment_index != ALL:
+            indexes = indexes[compiled.segment_index:compiled.segment_index + 1]
+
+        if not compiled.is_wildcard:
+            if not indexes:
+                return default
+            value = self.value(indexes[0], compiled.field, compiled.repetition, compiled.component, compiled.subcomponent)
+            return default if value is None else value
+
+        values = []
+        for index in indexes:
+            if compiled.repetition == ALL:
+                repetitions = range(max(1, self.repetition_count(index, compiled.field)))
+            else:
+                repetitions = (compiled.repetition,)
+            for repetition in repetitions:
+                values.append(self.value(index, compiled.field, repetition, compiled.component, compiled.subcomponent))
+        return values
+
+    def __getitem__(self, path: Union[str, HL7Path]) -> PathValue:
+        return self.get(path)
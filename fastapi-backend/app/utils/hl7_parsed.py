@@ -0,0 +1,154 @@
+"""
+Structured HL7 parse
+Builds the JSON document stored in hl7_messages.parsed_data (the ParsedHL7Data
+shape: header, patient, visit and observations) so consumers read one
+normalized parse instead of re-parsing raw_hl7_content
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from app.utils.data_escape import HL7DataProcessor, processor_for
+from app.utils.hl7_datetime import parse_hl7_date, parse_hl7_timestamp
+from app.utils.hl7_message import HL7MessageView
+
+# Bump whenever the parsed_data layout or extraction rules change; rows stamped
+# with an older version are re-parsed lazily when read
+PARSE_VERSION = 2
+
+DEFAULT_ENCODING_CHARS = "^~\\&"
+
+
+def _text(message: HL7MessageView, processor: HL7DataProcessor, path: str) -> Optional[str]:
+    """Unescaped, whitespace-normalized value of a path (None when empty)"""
+    return _normalized(processor, message[path])
+
+
+def _normalized(processor: HL7DataProcessor, value: Optional[str]) -> Optional[str]:
+    return processor.normalize_field(value) or None
+
+
+def _timestamp(message: HL7MessageView, processor: HL7DataProcessor, path: str) -> Optional[str]:
+    return _isoformat(parse_hl7_timestamp(_text(message, processor, path)))
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _join_components(processor: HL7DataProcessor, value: Optional[str]) -> Optional[str]:
+    """Join the non-empty components of a composite field with spaces"""
+    if not value:
+        return None
+    parts = [processor.normalize_field(part) for part in processor.split_field_components(value)]
+    return " ".join(part for part in parts if part) or None
+
+
+def _person_name(message: HL7MessageView, processor: HL7DataProcessor, path: str) -> Optional[str]:
+    """XCN person name (ID^FAMILY^GIVEN...) as "GIVEN FAMILY", falling back to the ID"""
+    family = _text(message, processor, f"{path}.2")
+    given = _text(message, processor, f"{path}.3")
+    name = " ".join(part for part in (given, family) if part)
+    return name or _text(message, processor, f"{path}.1")
+
+
+def _patient_info(message: HL7MessageView, processor: HL7DataProcessor) -> Optional[Dict[str, Any]]:
+    if message.segment("PID") is None:
+        return None
+
+    name = processor.clean_patient_name(message["PID-5"] or "")
+    gender = _text(message, processor, "PID-8")
+    return {
+        "patient_id": processor.extract_identifier(message["PID-3"]),
+        "assigning_authority": _text(message, processor, "PID-3.4.1"),
+        "first_name": name["first_name"],
+        "last_name": name["last_name"],
+        "middle_name": name["middle_name"],
+        "date_of_birth": _isoformat(parse_hl7_date(_text(message, processor, "PID-7.1"))),
+        "gender": gender[0].upper() if gender else None,
+        "ssn": _text(message, processor, "PID-19"),
+        "address": _join_components(processor, message["PID-11"]),
+        "phone": processor.clean_phone_number(message["PID-13.1"]),
+        "marital_status": _text(message, processor, "PID-16.1"),
+        "race": _text(message, processor, "PID-10.2") or _text(message, processor, "PID-10.1"),
+        "ethnicity": _text(message, processor, "PID-22.2") or _text(message, processor, "PID-22.1"),
+    }
+
+
+def _visit_info(message: HL7MessageView, processor: HL7DataProcessor) -> Optional[Dict[str, Any]]:
+    if message.segment("PV1") is None:
+        return None
+
+    room = _text(message, processor, "PV1-3.2")
+    bed = _text(message, processor, "PV1-3.3")
+    return {
+        "visit_number": _text(message, processor, "PV1-19"),
+        "patient_class": _text(message, processor, "PV1-2"),
+        "assigned_location": _join_components(processor, message["PV1-3"]),
+        "admission_type": _text(message, processor, "PV1-4"),
+        "attending_doctor": _person_name(message, processor, "PV1-7"),
+        "referring_doctor": _person_name(message, processor, "PV1-8"),
+        "room_bed": "-".join(part for part in (room, bed) if part) or None,
+        "admission_date": _timestamp(message, processor, "PV1-44.1"),
+        "discharge_date": _timestamp(message, processor, "PV1-45.1"),
+    }
+
+
+def _observations(message: HL7MessageView, processor: HL7DataProcessor) -> List[Dict[str, Any]]:
+    observations = []
+    for segment in message.segments("OBX"):
+        observations.append({
+            "observation_id": _normalized(processor, segment.value(1)),
+            "value_type": _normalized(processor, segment.value(2)),
+            "observation_identifier": _normalized(processor, segment.value(3, 0, 0)),
+            "observation_text": _normalized(processor, segment.value(3, 0, 1)),
+            "observation_value": _normalized(processor, segment.value(5)),
+            "units": _normalized(processor, segment.value(6, 0, 0)),
+            "reference_range": _normalized(processor, segment.value(7)),
+            "abnormal_flags": _normalized(processor, segment.value(8)),
+            "observation_date": _isoformat(parse_hl7_timestamp(_normalized(processor, segment.value(14, 0, 0)))),
+        })
+    return observations
+
+
+def parse_hl7_data(hl7_content: Union[str, HL7MessageView]) -> Dict[str, Any]:
+    """
+    Parse a message into a JSON-ready ParsedHL7Data document
+
+    Dates are ISO 8601 strings (naive UTC, dates of birth as calendar dates)
+    so the result can be written to JSONB as-is. The document carries
+    parse_version for lazy re-parsing when the layout changes.
+    """
+    message = hl7_content if isinstance(hl7_content, HL7MessageView) else HL7MessageView(hl7_content)
+    header = message.header
+    processor = processor_for(header.text[4:8] if header is not None else DEFAULT_ENCODING_CHARS)
+
+    parsed = {
+        "parse_version": PARSE_VERSION,
+        "message_type": None,
+        "trigger_event": None,
+        "sending_application": None,
+        "receiving_application": None,
+        "message_timestamp": None,
+    }
+    # Header fields only count when MSH is the first segment, as in extract_basic_info
+    if header is not None:
+        parsed.update({
+            "message_type": _text(message, processor, "MSH-9.1"),
+            "trigger_event": _text(message, processor, "MSH-9.2"),
+            "sending_application": _text(message, processor, "MSH-3.1"),
+            "receiving_application": _text(message, processor, "MSH-5.1"),
+            "message_timestamp": _timestamp(message, processor, "MSH-7.1"),
+        })
+
+    parsed["patient_info"] = _patient_info(message, processor)
+    parsed["visit_info"] = _visit_info(message, processor)
+    parsed["observations"] = _observations(message, processor)
+    return parsed
+
+
+def is_current(parsed_data: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether a stored parsed_data document matches the current PARSE_VERSION
+    """
+    return bool(parsed_data) and parsed_data.get("parse_version") == PARSE_VERSION
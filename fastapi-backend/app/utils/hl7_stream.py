@@ -0,0 +1,154 @@
+"""
+Streaming HL7 message splitting
+Splits batch files (FHS/BHS/BTS/FTS envelopes) and concatenated MSH runs into
+individual messages while reading input incrementally
+"""
+
+import codecs
+from typing import AsyncIterator, List, Optional
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.utils.hl7_tokenizer import SEGMENT_BOUNDARY
+
+# Batch/file envelope segments that wrap messages but are not part of them
+ENVELOPE_SEGMENTS = ("FHS", "BHS", "BTS", "FTS")
+
+
+class HL7MessageSplitter:
+    """
+    Incrementally split HL7 text into messages
+
+    Feed decoded text in arbitrary chunks; complete messages are returned as
+    soon as the next MSH segment (or envelope segment) starts. Each message is
+    the text the sender wrote, segments and their terminators untouched;
+    only blank lines and envelope segments are left out. Only the current
+    message and one partial segment are held, so memory is bounded by the
+    largest single message.
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._segments: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add a chunk of text and return any messages it completed
+        """
+        if not text:
+            return []
+
+        buffer = self._partial + text
+        messages = []
+        start = 0
+        for boundary in SEGMENT_BOUNDARY.finditer(buffer):
+            if boundary.end() == len(buffer):
+                # The terminator run may continue in the next chunk (e.g. a split CR LF)
+                break
+            message = self._add_segment(buffer[start:boundary.start()], boundary.group())
+            if message is not None:
+                messages.append(message)
+            start = boundary.end()
+
+        self._partial = buffer[start:]
+        return messages
+
+    def close(self) -> List[str]:
+        """
+        Flush the trailing segment and the last message
+        """
+        messages = []
+        if self._partial:
+            boundary = SEGMENT_BOUNDARY.search(self._partial)
+            end = boundary.start() if boundary else len(self._partial)
+            message = self._add_segment(self._partial[:end], boundary.group() if boundary else "")
+            self._partial = ""
+            if message is not None:
+                messages.append(message)
+
+        message = self._finish_message()
+        if message is not None:
+            messages.append(message)
+        return messages
+
+    def _add_segment(self, segment: str, terminators: str) -> Optional[str]:
+        segment_id = segment.strip()[:3]
+        if not segment_id:
+            return None
+
+        # Keep the segment's own terminator; further ones only end blank lines
+        segment += terminators[:2] if terminators.startswith("\r\n") else terminators[:1]
+
+        if segment_id in ENVELOPE_SEGMENTS:
+            return self._finish_message()
+
+        if segment_id == "MSH":
+            finished = self._finish_message()
+            self._segments.append(segment)
+            return finished
+
+        # Segments before the first MSH are kept so invalid input still surfaces as a message
+        self._segments.append(segment)
+        return None
+
+    def _finish_message(self) -> Optional[str]:
+        if not self._segments:
+            return None
+        message = "".join(self._segments)
+        self._segments = []
+        return message
+
+
+class _FallbackDecoder:
+    """
+    Incremental UTF-8 decoder that switches to latin-1 on the first invalid byte
+
+    Mirrors the whole-file utf-8 then latin-1 retry used for single uploads,
+    except that text already decoded as valid UTF-8 is kept.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._fallback = False
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if self._fallback:
+            return data.decode("latin-1")
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            pending, _ = self._decoder.getstate()
+            self._fallback = True
+            return (pending + data).decode("latin-1")
+
+
+def split_hl7_messages(content: str) -> List[str]:
+    """
+    Split already-decoded HL7 content into individual messages
+    """
+    splitter = HL7MessageSplitter()
+    messages = splitter.feed(content)
+    messages.extend(splitter.close())
+    return messages
+
+
+async def iter_upload_messages(
+    upload: UploadFile,
+    chunk_size: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Read an upload in chunks and yield individual HL7 messages as they complete
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    decoder = _FallbackDecoder()
+    splitter = HL7MessageSplitter()
+
+    while chunk := await upload.read(chunk_size):
+        for message in splitter.feed(decoder.decode(chunk)):
+            yield message
+
+    for message in splitter.feed(decoder.decode(b"", final=True)):
+        yield message
+    for message in splitter.close():
+        yield message
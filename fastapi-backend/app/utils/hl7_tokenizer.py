@@ -0,0 +1,68 @@
+"""
+HL7 segment tokenizer
+Shared segment splitting for all parsers; accepts \r (the HL7/MLLP standard),
+\n and \r\n terminators, and ignores MLLP framing bytes
+"""
+
+import re
+from typing import Iterator, List, Optional, Tuple
+
+# Runs of terminators collapse, so blank lines between segments are skipped
+SEGMENT_BOUNDARY = re.compile(r"[\r\n]+")
+
+# A segment is any run of characters that is not a terminator
+_SEGMENT = re.compile(r"[^\r\n]+")
+
+# MLLP start block (VT) / end block (FS) plus surrounding whitespace
+_SEGMENT_STRIP_CHARS = " \t\x0b\x1c"
+
+
+def iter_segment_spans(content: str) -> Iterator[Tuple[int, int]]:
+    """
+    Lazily yield (start, end) offsets of non-empty segments without slicing
+    """
+    for match in _SEGMENT.finditer(content):
+        start, end = match.span()
+        while start < end and content[start] in _SEGMENT_STRIP_CHARS:
+            start += 1
+        while end > start and content[end - 1] in _SEGMENT_STRIP_CHARS:
+            end -= 1
+        if start < end:
+            yield start, end
+
+
+def iter_segments(content: str) -> Iterator[str]:
+    """
+    Lazily yield non-empty segments from HL7 content
+
+    Segments are sliced straight out of the input, so callers that stop at the
+    first match (e.g. the PID segment) never split the rest of the message.
+    """
+    for match in _SEGMENT.finditer(content):
+        segment = match.group().strip(_SEGMENT_STRIP_CHARS)
+        if segment:
+            yield segment
+
+
+def split_segments(content: str) -> List[str]:
+    """
+    Split HL7 content into a list of non-empty segments
+    """
+    return list(iter_segments(content))
+
+
+def first_segment(content: str) -> str:
+    """
+    Get the first segment (normally MSH), or an empty string
+    """
+    return next(iter_segments(content), "")
+
+
+def find_segment(content: str, segment_id: str) -> Optional[str]:
+    """
+    Get the first segment with the given ID (e.g. "PID"), or None
+    """
+    for segment in iter_segments(content):
+        if segment.startswith(segment_id):
+            return segment
+    return None
@@ -0,0 +1,261 @@
+"""
+Server-side JSON Patch and JSON Merge Patch utilities
+Translates RFC 6902 / RFC 7396 documents into PostgreSQL jsonb expressions
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import ARRAY, Text, and_, case, func, literal, select, true
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.selectable import CTE
+
+JSON_PATCH_OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+# RFC 6901 array index, bounded so PostgreSQL can read it as an int
+ARRAY_INDEX_PATTERN = re.compile(r"0|[1-9][0-9]{0,8}")
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch document is malformed"""
+
+
+def parse_json_pointer(pointer: Any) -> List[str]:
+    """
+    Split an RFC 6901 JSON Pointer into unescaped reference tokens
+    """
+    if not isinstance(pointer, str):
+        raise JsonPatchError("JSON Pointer must be a string")
+
+    if pointer == "":
+        return []
+
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON Pointer '{pointer}': must start with '/'")
+
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _jsonb_value(value: Any) -> ColumnElement:
+    """Bind a Python value as a jsonb literal"""
+    return literal(value, type_=JSONB)
+
+
+def _text_path(tokens: List[str]) -> ColumnElement:
+    """Bind path tokens as a text[] literal for jsonb path operators"""
+    return literal(tokens, type_=ARRAY(Text))
+
+
+def _get_path(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    """doc #> path"""
+    if not tokens:
+        return doc
+    return doc.op("#>", return_type=JSONB)(_text_path(tokens))
+
+
+def _path_exists(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    """True when the path resolves to a value (JSON null counts as a value)"""
+    return _get_path(doc, tokens).isnot(None)
+
+
+def _array_indexes_valid(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    """
+    False when a token that is not an array index addresses into an array
+
+    jsonb_set, jsonb_insert and #- raise instead of returning NULL for such
+    paths, so the operation must not be evaluated at all.
+    """
+    conditions = [
+        func.jsonb_typeof(_get_path(doc, tokens[:position])).is_distinct_from("array")
+        for position, token in enumerate(tokens)
+        if not ARRAY_INDEX_PATTERN.fullmatch(token)
+    ]
+    return and_(true(), *conditions)
+
+
+def _add(doc: ColumnElement, tokens: List[str], value: ColumnElement) -> Tuple[ColumnElement, ColumnElement]:
+    """RFC 6902 'add': insert into arrays, set object members"""
+    if not tokens:
+        return value, true()
+
+    parent = tokens[:-1]
+    parent_value = _get_path(doc, parent)
+
+    if tokens[-1] == "-":
+        appended = parent_value.op("||", return_type=JSONB)(func.jsonb_build_array(value, type_=JSONB))
+        if not parent:
+            return appended, func.jsonb_typeof(doc) == "array"
+        new_doc = func.jsonb_set(doc, _text_path(parent), appended, type_=JSONB)
+        return new_doc, func.jsonb_typeof(parent_value) == "array"
+
+    new_doc = case(
+        (
+            func.jsonb_typeof(parent_value) == "array",
+            func.jsonb_insert(doc, _text_path(tokens), value, type_=JSONB)
+        ),
+        else_=func.jsonb_set(doc, _text_path(tokens), value, True, type_=JSONB)
+    )
+    return new_doc, func.jsonb_typeof(parent_value).in_(["array", "object"])
+
+
+def _remove(doc: ColumnElement, tokens: List[str]) -> Tuple[ColumnElement, ColumnElement]:
+    """RFC 6902 'remove': the target must exist"""
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    return doc.op("#-", return_type=JSONB)(_text_path(tokens)), _path_exists(doc, tokens)
+
+
+def _replace(doc: ColumnElement, tokens: List[str], value: ColumnElement) -> Tuple[ColumnElement, ColumnElement]:
+    """RFC 6902 'replace': the target must exist"""
+    if not tokens:
+        return value, true()
+    new_doc = func.jsonb_set(doc, _text_path(tokens), value, False, type_=JSONB)
+    return new_doc, _path_exists(doc, tokens)
+
+
+def json_patch_step(doc: ColumnElement, operation: Dict[str, Any]) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    Build the jsonb expression for a single JSON Patch operation
+
+    Returns (new_document, precondition). The precondition is false when the
+    operation cannot be applied (missing target, failed test, wrong parent type).
+    """
+    if not isinstance(operation, dict):
+        raise JsonPatchError("Each JSON Patch operation must be an object")
+
+    op = operation.get("op")
+    if op not in JSON_PATCH_OPERATIONS:
+        raise JsonPatchError(f"Unsupported JSON Patch operation '{op}'")
+
+    if "path" not in operation:
+        raise JsonPatchError(f"Operation '{op}' requires a 'path'")
+    tokens = parse_json_pointer(operation["path"])
+
+    if op in ("add", "replace", "test") and "value" not in operation:
+        raise JsonPatchError(f"Operation '{op}' requires a 'value'")
+
+    if op in ("add", "replace") and not tokens and not isinstance(operation["value"], dict):
+        raise JsonPatchError("The document root can only be replaced with a JSON object")
+
+    # The appended position "-" is resolved by _add itself
+    checked = [tokens[:-1] if op in ("add", "copy", "move") and tokens and tokens[-1] == "-" else tokens]
+    if op in ("move", "copy"):
+        if "from" not in operation:
+            raise JsonPatchError(f"Operation '{op}' requires a 'from'")
+        checked.append(parse_json_pointer(operation["from"]))
+
+    valid = and_(*(_array_indexes_valid(doc, path) for path in checked))
+    new_doc, precondition = _apply_operation(doc, op, tokens, operation)
+    # Leave the document untouched when a path cannot be evaluated on it
+    return case((valid, new_doc), else_=doc), and_(valid, precondition)
+
+
+def _apply_operation(
+    doc: ColumnElement,
+    op: str,
+    tokens: List[str],
+    operation: Dict[str, Any]
+) -> Tuple[ColumnElement, ColumnElement]:
+    """Expression and precondition of one validated JSON Patch operation"""
+    if op == "add":
+        return _add(doc, tokens, _jsonb_value(operation["value"]))
+
+    if op == "remove":
+        return _remove(doc, tokens)
+
+    if op == "replace":
+        return _replace(doc, tokens, _jsonb_value(operation["value"]))
+
+    if op == "test":
+        return doc, _get_path(doc, tokens) == _jsonb_value(operation["value"])
+
+    # move / copy read the value from another location in the same document
+    from_tokens = parse_json_pointer(operation["from"])
+    source_value = _get_path(doc, from_tokens)
+
+    if op == "copy":
+        new_doc, precondition = _add(doc, tokens, source_value)
+        return new_doc, and_(_path_exists(doc, from_tokens), precondition)
+
+    if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+        raise JsonPatchError("Cannot move a value into one of its own children")
+    removed, removed_ok = _remove(doc, from_tokens)
+    new_doc, precondition = _add(removed, tokens, source_value)
+    return new_doc, and_(removed_ok, precondition)
+
+
+def merge_patch_expression(doc: ColumnElement, patch: Any) -> ColumnElement:
+    """
+    Build the jsonb expression applying an RFC 7396 merge patch to doc
+
+    Null members delete keys, object members merge recursively and anything
+    else replaces the target value.
+    """
+    if not isinstance(patch, dict):
+        return _jsonb_value(patch)
+
+    # A non-object target is replaced by an empty object before merging
+    result = case(
+        (func.jsonb_typeof(doc) == "object", doc),
+        else_=_jsonb_value({})
+    )
+
+    removed_keys = [key for key, value in patch.items() if value is None]
+    if removed_keys:
+        result = result.op("-", return_type=JSONB)(_text_path(removed_keys))
+
+    replaced = {key: value for key, value in patch.items() if value is not None and not isinstance(value, dict)}
+    if replaced:
+        result = result.op("||", return_type=JSONB)(_jsonb_value(replaced))
+
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            # Sibling keys are independent, so nested merges read the original member
+            member = doc.op("->", return_type=JSONB)(literal(key, type_=Text))
+            result = func.jsonb_set(
+                result,
+                _text_path([key]),
+                merge_patch_expression(member, value),
+                True,
+                type_=JSONB
+            )
+
+    return result
+
+
+def build_patched_document(source: CTE, patch_format: str, patch: Any) -> CTE:
+    """
+    Chain patch steps as CTEs over a source CTE exposing a 'doc' column
+
+    Each JSON Patch operation becomes its own CTE so later steps reference the
+    previous result by name instead of nesting the whole expression. The
+    returned CTE has a 'doc' column with the patched document and an 'ok'
+    column that is false if any operation's precondition failed or the
+    result is not a JSON object.
+    """
+    step = select(source.c.doc, true().label("ok")).select_from(source).cte("patch_step_0")
+
+    if patch_format == "merge":
+        # A non-object merge patch would replace the whole document with it
+        if not isinstance(patch, dict):
+            raise JsonPatchError("Merge patch must be a JSON object")
+        step = select(
+            merge_patch_expression(step.c.doc, patch).label("doc"),
+            step.c.ok
+        ).cte("patch_step_1")
+    else:
+        if not isinstance(patch, list):
+            raise JsonPatchError("JSON Patch document must be an array of operations")
+
+        for index, operation in enumerate(patch, start=1):
+            new_doc, precondition = json_patch_step(step.c.doc, operation)
+            step = select(
+                new_doc.label("doc"),
+                and_(step.c.ok, precondition).label("ok")
+            ).cte(f"patch_step_{index}")
+
+    # Stored documents stay objects, e.g. after copying or moving an array to the root
+    return select(
+        step.c.doc,
+        and_(step.c.ok, func.jsonb_typeof(step.c.doc) == "object").label("ok")
+    ).cte("patch_result")
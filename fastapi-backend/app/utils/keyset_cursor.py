@@ -0,0 +1,22 @@
+"""
+Keyset pagination cursors
+Opaque tokens for the (timestamp, id) of the last row of a page
+"""
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for the last row of a page"""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    (timestamp, id) of a cursor; raises ValueError when it is malformed
+    """
+    timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
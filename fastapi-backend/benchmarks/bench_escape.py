@@ -0,0 +1,41 @@
+"""
+HL7DataProcessor escape handling
+"""
+
+import pytest
+
+from app.utils.data_escape import HL7DataProcessor
+
+PLAIN_TEXT = "ACUTE CHEST PAIN SYNDROME WITH RADIATION TO LEFT ARM"
+ESCAPED_TEXT = r"Result\F\pending\S\review\T\see note\R\repeat\E\escape\X0D\\.br\line two " * 4
+SPACED_FIELD = r"  DOE   \T\   JOHN \S\  MICHAEL   JR  "
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return HL7DataProcessor()
+
+
+@pytest.mark.benchmark(group="escape")
+def test_unescape_plain(benchmark, processor):
+    assert benchmark(processor.unescape_text, PLAIN_TEXT) == PLAIN_TEXT
+
+
+@pytest.mark.benchmark(group="escape")
+def test_unescape_escaped(benchmark, processor):
+    assert "|" in benchmark(processor.unescape_text, ESCAPED_TEXT)
+
+
+@pytest.mark.benchmark(group="escape")
+def test_normalize_field(benchmark, processor):
+    assert benchmark(processor.normalize_field, SPACED_FIELD).startswith("DOE")
+
+
+@pytest.mark.benchmark(group="escape")
+def test_normalize_batch_fields(benchmark, processor, batch):
+    fields = [field for message in batch[:100] for segment in message.split("\r") for field in segment.split("|")]
+
+    def normalize_all():
+        return [processor.normalize_field(field) for field in fields]
+
+    assert len(benchmark(normalize_all)) == len(fields)
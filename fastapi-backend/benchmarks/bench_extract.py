@@ -0,0 +1,58 @@
+"""
+HL7Processor header, demographic and visit extraction
+"""
+
+import uuid
+
+import pytest
+
+from app.services.hl7_processor import HL7Processor
+from app.utils.hl7_message import HL7MessageView
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return HL7Processor()
+
+
+@pytest.mark.benchmark(group="extract")
+def test_extract_basic_info(benchmark, processor, adt_message):
+    assert benchmark(processor.extract_basic_info, adt_message)["message_type"] == "ADT"
+
+
+@pytest.mark.benchmark(group="extract")
+def test_extract_patient_demographics(benchmark, processor, adt_message):
+    assert benchmark(processor._extract_patient_demographics, adt_message)["last_name"]
+
+
+@pytest.mark.benchmark(group="extract")
+def test_extract_visit_info(benchmark, processor, adt_message):
+    assert benchmark(processor._extract_visit_info, adt_message)["visit_number"]
+
+
+@pytest.mark.benchmark(group="extract")
+def test_extract_shared_view(benchmark, processor, adt_message):
+    # One parse shared by all three extractors, as build_message_record does
+    def extract_all():
+        message = HL7MessageView(adt_message)
+        return (
+            processor.extract_basic_info(message),
+            processor._extract_patient_demographics(message),
+            processor._extract_visit_info(message)
+        )
+
+    assert benchmark(extract_all)[0]["message_type"] == "ADT"
+
+
+@pytest.mark.benchmark(group="extract")
+def test_build_message_record(benchmark, processor, adt_message):
+    message_id = uuid.uuid4()
+    assert benchmark(processor.build_message_record, message_id, "bench.hl7", adt_message)["id"] == message_id
+
+
+@pytest.mark.benchmark(group="extract-batch")
+def test_build_message_records_batch(benchmark, processor, batch):
+    message_ids = [uuid.uuid4() for _ in batch]
+    filenames = [f"bench_{index}.hl7" for index in range(len(batch))]
+    records = benchmark(processor.build_message_records, message_ids, filenames, batch)
+    assert len(records) == len(batch)
@@ -0,0 +1,25 @@
+"""
+Rule-based triage scoring
+"""
+
+import pytest
+
+from app.services.triage_engine import _parse_clinical_info, triage_chunk, triage_message, triage_rules
+from app.utils.hl7_message import HL7MessageView
+
+
+@pytest.mark.benchmark(group="triage")
+def test_triage_message(benchmark, adt_message):
+    assert benchmark(triage_message, adt_message)["severity_score"] > 0
+
+
+@pytest.mark.benchmark(group="triage")
+def test_rules_score(benchmark, adt_message):
+    clinical_info = _parse_clinical_info(HL7MessageView(adt_message))
+    assert benchmark(triage_rules.score, clinical_info) > 0
+
+
+@pytest.mark.benchmark(group="triage-batch")
+def test_triage_chunk(benchmark, batch):
+    # One worker task's share of a large batch, without process pool overhead
+    assert len(benchmark(triage_chunk, 0, batch)) == len(batch)
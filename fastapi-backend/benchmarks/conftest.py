@@ -0,0 +1,21 @@
+"""
+Shared benchmark fixtures
+"""
+
+import pytest
+
+from benchmarks.corpus import generate_messages
+
+# Messages per batch benchmark
+BATCH_SIZE = 1000
+
+
+@pytest.fixture(scope="session")
+def batch():
+    return generate_messages(BATCH_SIZE, seed=1)
+
+
+@pytest.fixture(scope="session")
+def adt_message(batch):
+    # Generated messages carry a visit number (PV1-19), unlike the samples
+    return next(message for message in batch if "|ADT^A01" in message)
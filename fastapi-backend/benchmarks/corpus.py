@@ -0,0 +1,63 @@
+"""
+Benchmark corpus
+Deterministic HL7 messages generated from the files in sample_files
+"""
+
+import random
+import re
+from pathlib import Path
+from typing import List
+
+from app.utils.hl7_stream import split_hl7_messages
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "sample_files"
+
+SEGMENT_SEPARATOR = re.compile(r"\r\n|\r|\n")
+
+FIRST_NAMES = ["JOHN", "MARY", "ANA", "WEI", "FATIMA", "LUCAS", "PRIYA", "OLGA", "KOFI", "SARA"]
+LAST_NAMES = ["PATIENT", "SMITH", "GARCIA", "NGUYEN", "KHAN", "MULLER", "ROSSI", "TANAKA", "OKAFOR", "BERG"]
+
+
+def load_samples() -> List[str]:
+    """Every message in sample_files, in file name order, with segments separated by CR as on the wire"""
+    messages = []
+    for path in sorted(SAMPLE_DIR.glob("*.hl7")):
+        messages.extend(
+            "\r".join(SEGMENT_SEPARATOR.split(message.strip()))
+            for message in split_hl7_messages(path.read_text())
+        )
+    return messages
+
+
+def _replace_field(segment: str, index: int, value: str) -> str:
+    fields = segment.split("|")
+    if len(fields) > index:
+        fields[index] = value
+    return "|".join(fields)
+
+
+def generate_messages(count: int, seed: int = 0) -> List[str]:
+    """
+    count messages cycling through the samples with distinct control IDs,
+    patients, visits and timestamps; the same seed gives the same messages
+    """
+    rng = random.Random(seed)
+    samples = load_samples()
+    messages = []
+    for index in range(count):
+        timestamp = f"2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}00"
+        patient = rng.randint(1, max(1, count // 4))
+        segments = []
+        for segment in SEGMENT_SEPARATOR.split(samples[index % len(samples)]):
+            if segment.startswith("MSH|"):
+                segment = _replace_field(_replace_field(segment, 6, timestamp), 9, f"BENCH{index:08d}")
+            elif segment.startswith("PID|"):
+                segment = _replace_field(segment, 3, f"{patient:09d}^^^HOSPITAL^MR")
+                segment = _replace_field(
+                    segment, 5, f"{LAST_NAMES[patient % len(LAST_NAMES)]}^{FIRST_NAMES[patient % len(FIRST_NAMES)]}"
+                )
+            elif segment.startswith("PV1|"):
+                segment = _replace_field(segment, 19, f"V{index:08d}")
+            segments.append(segment)
+        messages.append("\r".join(segments))
+    return messages